@@ -0,0 +1,217 @@
+"""
+Benchmark the conversion, preprocessing, chunking and summarisation stages.
+
+Synthetic NOUN-style course documents are generated at each requested size
+and every stage is timed on them. A full ``process_file`` run is timed with
+a stub chat backend in place of Ollama, so only the library's own work is
+measured. Results are written as JSON; pass an earlier results file with
+``--compare`` to report stages that got slower.
+
+Usage::
+
+    python benchmarks/run_benchmarks.py --output bench.json
+    python benchmarks/run_benchmarks.py --sizes 10KB,1MB --compare bench.json
+"""
+
+import argparse
+import copy
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from nounlogic_summariser_lib import __version__, summariser
+from nounlogic_summariser_lib.convert import convert_pdf_to_md, convert_txt_to_pdf
+from nounlogic_summariser_lib.interface import chunk_settings, chunk_text, sanitize_text
+from nounlogic_summariser_lib.preprocessing import (
+    discard_close_sentences,
+    final_process_text,
+    get_text_statistics,
+    preprocess_text,
+    smart_chunk_detection,
+)
+
+# The document generator is shared with the tests
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, 'tests'))
+from course_text import make_course_document  # noqa: E402
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = '10KB,100KB,1MB,10MB,100MB'
+QUICK_SIZES = '10KB,100KB,1MB'
+UNITS = {'KB': 1 << 10, 'MB': 1 << 20, 'GB': 1 << 30, 'B': 1}
+
+
+def parse_size(label):
+    """Convert a size such as ``10KB`` or ``1MB`` to bytes."""
+    label = label.strip().upper()
+    for unit, factor in UNITS.items():
+        if label.endswith(unit):
+            return int(float(label[:-len(unit)]) * factor)
+    return int(label)
+
+
+def stub_chat(model, messages, **kwargs):
+    """Answer like Ollama would, echoing the last words of the prompt."""
+    words = messages[-1]['content'].split()
+    return SimpleNamespace(message=SimpleNamespace(content=' '.join(words[-20:])))
+
+
+def load_package_config():
+    path = os.path.join(os.path.dirname(summariser.__file__), 'config.json')
+    return summariser.load_config(path)
+
+
+def time_call(fn, repeat):
+    """Run ``fn`` ``repeat`` times and return timings and its last result."""
+    walls, cpus = [], []
+    result = None
+    for _ in range(repeat):
+        wall, cpu = time.perf_counter(), time.process_time()
+        result = fn()
+        walls.append(time.perf_counter() - wall)
+        cpus.append(time.process_time() - cpu)
+    return {
+        'wall_s': min(walls),
+        'wall_median_s': statistics.median(walls),
+        'cpu_s': min(cpus),
+    }, result
+
+
+def benchmark_size(size, label, config, workdir, repeat, pdf_max_bytes):
+    """Time every stage on one generated document."""
+    text = make_course_document(size, seed=size)
+    source = os.path.join(workdir, f"course_{label}.txt")
+    with open(source, 'w', encoding='utf-8') as f:
+        f.write(text)
+    input_bytes = len(text.encode('utf-8'))
+    results = []
+
+    def record(stage, fn):
+        timing, result = time_call(fn, repeat)
+        timing.update(stage=stage, size=label, input_bytes=input_bytes)
+        wall = timing['wall_s']
+        timing['throughput_mb_s'] = input_bytes / (1 << 20) / wall if wall else None
+        results.append(timing)
+        _logger.info(f"{label:>6} {stage:<24} {timing['wall_s']:.4f}s")
+        return result
+
+    sanitized = record('sanitize_text', lambda: sanitize_text(text))
+    selected, _ = record('preprocess_text', lambda: preprocess_text(
+        sanitized, copy.deepcopy(config), os.path.basename(source), workdir))
+    threshold = config['preprocessing']['common_words_threshold']
+    backend = config['preprocessing'].get('backend', 'python')
+    record('discard_close_sentences',
+           lambda: discard_close_sentences(selected, threshold, backend))
+    stats = get_text_statistics(sanitized)
+    topic_chunks = smart_chunk_detection(selected)
+    record('final_process_text', lambda: final_process_text(
+        topic_chunks, config, os.path.basename(source), stats))
+    settings = chunk_settings(config)
+    record('chunk_text', lambda: chunk_text(selected, **settings))
+
+    if size <= pdf_max_bytes:
+        pdf_path = os.path.join(workdir, f"course_{label}.pdf")
+        convert_txt_to_pdf(source, pdf_path)
+        workers = config['conversion'].get('pdf_workers', 1)
+        record('convert_pdf_to_md', lambda: convert_pdf_to_md(pdf_path, workers))
+
+    record('process_file',
+           lambda: summariser.process_file(source, copy.deepcopy(config)))
+    return results
+
+
+def compare(results, baseline_path, tolerance):
+    """Return the stages that are more than ``tolerance`` slower than the baseline."""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {(r['stage'], r['size']): r for r in json.load(f)['results']}
+    regressions = []
+    for result in results:
+        before = baseline.get((result['stage'], result['size']))
+        if before and result['wall_s'] > before['wall_s'] * (1 + tolerance):
+            regressions.append({
+                'stage': result['stage'],
+                'size': result['size'],
+                'baseline_s': before['wall_s'],
+                'wall_s': result['wall_s'],
+                'ratio': result['wall_s'] / before['wall_s'],
+            })
+    return regressions
+
+
+def parse_args(args):
+    parser = argparse.ArgumentParser(
+        description="Benchmark the summariser pipeline stages")
+    parser.add_argument('--sizes', default=DEFAULT_SIZES,
+                        help=f"Comma-separated document sizes "
+                             f"(default: {DEFAULT_SIZES})")
+    parser.add_argument('--quick', action='store_true',
+                        help=f"Only run the small sizes ({QUICK_SIZES})")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="Runs per stage; the fastest is kept")
+    parser.add_argument('--pdf-max-size', default='100KB',
+                        help="Largest document to time PDF extraction on "
+                             "(default: 100KB)")
+    parser.add_argument('--output', default='benchmark-results.json',
+                        help="JSON results file")
+    parser.add_argument('--compare',
+                        help="Earlier results file to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="Allowed slowdown against --compare, as a fraction "
+                             "(default: 0.2)")
+    return parser.parse_args(args)
+
+
+def main(args):
+    args = parse_args(args)
+    logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stdout)
+
+    config = load_package_config()
+    config['cache'] = {'enabled': False}
+    config['streaming'] = {'enabled': False}
+    config['reduce'] = {'enabled': False}
+    summariser._chat_function = lambda ollama_config: stub_chat
+    # Library progress messages would swamp the timings
+    logging.getLogger('nounlogic_summariser_lib').setLevel(logging.WARNING)
+
+    sizes = QUICK_SIZES if args.quick else args.sizes
+    labels = [label.strip().upper() for label in sizes.split(',')]
+    results = []
+    with tempfile.TemporaryDirectory(prefix='nounlogic-bench-') as workdir:
+        for label in labels:
+            results.extend(benchmark_size(parse_size(label), label, config, workdir,
+                                          args.repeat, parse_size(args.pdf_max_size)))
+
+    report = {
+        'meta': {
+            'version': __version__,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    _logger.info(f"Wrote {len(results)} results to {args.output}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        for r in regressions:
+            _logger.warning(f"REGRESSION {r['size']} {r['stage']}: "
+                            f"{r['baseline_s']:.4f}s -> {r['wall_s']:.4f}s "
+                            f"({r['ratio']:.2f}x)")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
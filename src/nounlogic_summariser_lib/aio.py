@@ -0,0 +1,442 @@
+"""
+Asyncio API of the summariser.
+
+:func:`aprocess_file`, :func:`asummarize_text` and :func:`asummarize_chunks`
+are the coroutine counterparts of ``process_file``, ``summarize_text`` and
+``summarize_chunks``. Chunk requests go through an
+:class:`client.AsyncOllamaClient` on the running event loop, so one loop
+can summarize many documents at once without a thread per document. Only
+the requests and file access differ from the threaded API: packing,
+checkpoint and reduce bookkeeping are shared with it.
+
+Concurrency is bounded by an ``asyncio.Semaphore``, by default one per
+call allowing ``ollama.max_concurrency`` requests in flight. Pass the same
+semaphore to every call to bound the requests of all documents together.
+``ollama.request_timeout``, when set, limits the seconds a single chunk
+request may take once it holds the semaphore, retries included; a request
+that takes longer raises ``asyncio.TimeoutError``.
+
+Cancelling a call cancels its outstanding chunk requests. Checkpoint
+journals are kept, so an interrupted :func:`aprocess_file` can be resumed.
+CPU-bound work (conversion, preprocessing and chunking) and file access run
+off the event loop, in ``executor`` or in the default thread pool.
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import time
+from collections import deque
+from contextlib import ExitStack
+
+from .autotune import apply_profile
+from .cache import get_cache
+from .checkpoint import CheckpointJournal
+from .client import get_async_client
+from .dispatch import get_async_dispatcher
+from .interface import chunk_settings, chunk_text
+from .packing import DEFAULT_INSTRUCTIONS, PackRequest, pack_chunks, packing_settings
+from .profiling import get_profiler
+from .reduce import _level_texts, _log_level, _non_blank, _reduce_settings
+from .summariser import (
+    _checkpointed,
+    _CheckpointedPack,
+    _OrderedTokens,
+    _pack_callback,
+    _SummaryWriter,
+    _max_concurrency,
+    _output_paths,
+    _write_summary_header,
+    prepare_file,
+    use_streaming,
+)
+
+_logger = logging.getLogger(__name__)
+
+try:
+    from contextlib import aclosing
+except ImportError:  # Python < 3.10
+    class aclosing:
+        """Close an async generator on exit; ``contextlib.aclosing``."""
+
+        def __init__(self, thing):
+            self.thing = thing
+
+        async def __aenter__(self):
+            return self.thing
+
+        async def __aexit__(self, *exc_info):
+            await self.thing.aclose()
+
+async def _to_thread(func, *args, **kwargs):
+    """Run ``func`` in the default thread pool; ``asyncio.to_thread``."""
+    loop = asyncio.get_running_loop()
+    call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+    return await loop.run_in_executor(None, call)
+
+def _async_chat_function(ollama_config):
+    """Async ``summariser._chat_function``; clients belong to the running loop."""
+    if ollama_config.get('endpoints'):
+        return get_async_dispatcher(ollama_config).chat
+    return get_async_client(ollama_config).chat
+
+def _async_chunk_summarizer(config):
+    """Build the coroutine function that summarizes a single chunk.
+
+    Async counterpart of ``summariser._chunk_summarizer``; cache lookups
+    and writes run in a worker thread.
+
+    Returns:
+        Tuple[Callable, SummaryCache]: The coroutine function, taking the
+        chunk, an optional ``on_token(piece)`` callback and ``lookup``, and
+        the cache it consults, which is ``None`` when caching is disabled.
+    """
+    prompt = config['prompt_template']
+    ollama_config = config['ollama']
+    model = ollama_config['model']
+    stream = ollama_config.get('stream', False)
+    profiler = get_profiler()
+    chat_fn = _async_chat_function(ollama_config)
+    cache = get_cache(config)
+
+    async def summarize_chunk(chunk, on_token=None, lookup=True):
+        if cache is not None:
+            key = cache.make_key(model, prompt, chunk)
+            summary = await _to_thread(cache.get, key) if lookup else None
+            if summary is not None:
+                return summary
+        messages = [{"role": "user", "content": f"{prompt}\n\n{chunk}"}]
+        start = time.perf_counter()
+        if stream:
+            pieces = []
+            parts = await chat_fn(model=model, messages=messages, stream=True)
+            async for part in parts:
+                piece = part.message.content
+                if piece:
+                    pieces.append(piece)
+                    if on_token is not None:
+                        on_token(piece)
+            summary = ''.join(pieces)
+        else:
+            response = await chat_fn(model=model, messages=messages)
+            summary = response.message.content
+        profiler.record('chat', time.perf_counter() - start, len(chunk), len(summary))
+        if cache is not None:
+            await _to_thread(cache.put, key, summary)
+        return summary
+
+    return summarize_chunk, cache
+
+def _async_pack_summarizer(config, summarize_chunk, cache):
+    """Async ``summariser._pack_summarizer``."""
+    prompt = config['prompt_template']
+    model = config['ollama']['model']
+    instructions = config.get('packing', {}).get('instructions', DEFAULT_INSTRUCTIONS)
+    profiler = get_profiler()
+    chat_fn = _async_chat_function(config['ollama'])
+
+    async def summarize_pack(chunks, callback=None):
+        request = PackRequest(chunks)
+        if cache is not None:
+            keys = [cache.make_key(model, prompt, chunk) for chunk in chunks]
+            cached = await _to_thread(lambda: [cache.get(key) for key in keys])
+            request = PackRequest(chunks, cached)
+        if request.packed:
+            content = request.prompt(prompt, instructions)
+            messages = [{"role": "user", "content": content}]
+            start = time.perf_counter()
+            response = await chat_fn(model=model, messages=messages)
+            reply = response.message.content
+            profiler.record('chat', time.perf_counter() - start, len(content),
+                            len(reply))
+            filled = request.accept(reply)
+            if cache is not None and filled:
+                await _to_thread(lambda: [cache.put(keys[i], request.summaries[i])
+                                          for i in filled])
+        for i in request.todo:
+            request.summaries[i] = await summarize_chunk(
+                chunks[i], callback(i) if callback else None, lookup=False)
+        return request.summaries
+
+    return summarize_pack
+
+async def _amap_chunks(resolve, resolve_pack, chunks, config, semaphore=None):
+    """Async ``summariser._map_chunks``; see :func:`_amap_ordered`."""
+    items = enumerate(chunks)
+    settings = packing_settings(config)
+    if settings is None:
+        results = _amap_ordered(resolve, items, config, semaphore)
+        async with aclosing(results) as results:
+            async for result in results:
+                yield result
+        return
+    async with aclosing(_amap_ordered(resolve_pack, pack_chunks(items, **settings),
+                                      config, semaphore)) as packs:
+        async for results in packs:
+            for result in results:
+                yield result
+
+async def _amap_ordered(fn, items, config, semaphore=None):
+    """Run ``fn`` on ``items`` as concurrent tasks, yielding results in order.
+
+    Each call holds ``semaphore`` (by default a new one allowing
+    ``ollama.max_concurrency`` calls) and is cut off after
+    ``ollama.request_timeout`` seconds. At most twice the concurrency of
+    tasks are started ahead of the result being waited for. When the
+    generator is closed or a call fails, the remaining tasks are cancelled.
+
+    Args:
+        fn (Callable): Coroutine function to apply to each item.
+        items (Iterable): Items to process.
+        config (dict): Configuration settings.
+        semaphore (asyncio.Semaphore, optional): Shared limit on calls in flight.
+
+    Yields:
+        Result of ``fn`` for each item, in input order.
+    """
+    max_concurrency = _max_concurrency(config)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(max_concurrency)
+    timeout = config['ollama'].get('request_timeout')
+
+    async def run(item):
+        async with semaphore:
+            return await asyncio.wait_for(fn(item), timeout)
+
+    window = 2 * max_concurrency
+    pending = deque()
+    try:
+        for item in items:
+            pending.append(asyncio.ensure_future(run(item)))
+            if len(pending) >= window:
+                yield await pending.popleft()
+        while pending:
+            yield await pending.popleft()
+    finally:
+        for task in pending:
+            task.cancel()
+        # Wait for the cancelled requests to finish unwinding
+        await asyncio.gather(*pending, return_exceptions=True)
+
+async def asummarize_chunks(chunks, config, semaphore=None, on_token=None):
+    """Summarize already chunked text; async ``summarize_chunks``.
+
+    Close the generator (for example with ``contextlib.aclosing``) when
+    stopping early, so that outstanding requests are cancelled at once.
+
+    Args:
+        chunks (Iterable[str]): Text chunks to summarize.
+        config (dict): Configuration settings.
+        semaphore (asyncio.Semaphore, optional): Shared limit on requests in
+            flight; see the module docstring.
+        on_token (Callable[[int, str], None], optional): Called with the
+            chunk index and each piece of its summary, in chunk order.
+
+    Yields:
+        str: Summarized text chunks, in chunk order.
+    """
+    summarize_chunk, cache = _async_chunk_summarizer(config)
+    summarize_pack = _async_pack_summarizer(config, summarize_chunk, cache)
+    tokens = _OrderedTokens(on_token) if on_token is not None else None
+
+    async def summarize(item):
+        index, chunk = item
+        return await summarize_chunk(chunk, tokens.callback(index) if tokens else None)
+
+    async def summarize_packed(pack):
+        callback = _pack_callback(tokens, [index for index, _ in pack])
+        return await summarize_pack([chunk for _, chunk in pack], callback)
+
+    try:
+        index = 0
+        async with aclosing(_amap_chunks(summarize, summarize_packed, chunks, config,
+                                         semaphore)) as results:
+            async for summary in results:
+                if tokens is not None:
+                    tokens.finish(index, summary)
+                index += 1
+                yield summary
+    finally:
+        if cache is not None:
+            cache.log_stats()
+
+async def asummarize_text(text, config, semaphore=None, on_token=None):
+    """Summarize the given text; async ``summarize_text``.
+
+    Args:
+        text (str): Sanitized text.
+        config (dict): Configuration settings.
+        semaphore (asyncio.Semaphore, optional): Shared limit on requests in flight.
+        on_token (Callable[[int, str], None], optional): Called with each
+            piece of the summaries; see :func:`asummarize_chunks`.
+
+    Yields:
+        str: Summarized text chunks.
+    """
+    config = apply_profile(config)
+    chunks = await _to_thread(chunk_text, text, **chunk_settings(config))
+    summaries = asummarize_chunks(chunks, config, semaphore, on_token)
+    async with aclosing(summaries) as summaries:
+        async for summary in summaries:
+            yield summary
+
+async def _asummarize_with_journal(chunks, config, journal, completed,
+                                   semaphore=None, tokens=None):
+    """Async ``summariser._summarize_with_journal``."""
+    summarize_chunk, cache = _async_chunk_summarizer(config)
+    summarize_pack = _async_pack_summarizer(config, summarize_chunk, cache)
+    reused = 0
+
+    async def resolve(item):
+        index, chunk = item
+        digest, summary = _checkpointed(journal, completed, index, chunk)
+        if summary is not None:
+            return index, digest, summary, True
+        on_token = tokens.callback(index) if tokens is not None else None
+        return index, digest, await summarize_chunk(chunk, on_token), False
+
+    async def resolve_pack(pack):
+        pending = _CheckpointedPack(journal, completed, pack)
+        callback = _pack_callback(tokens, pending.indices())
+        return pending.fill(await summarize_pack(pending.chunks(), callback))
+
+    try:
+        async with aclosing(_amap_chunks(resolve, resolve_pack, chunks, config,
+                                         semaphore)) as results:
+            async for index, digest, summary, was_done in results:
+                await _to_thread(journal.record, index, digest, summary)
+                reused += was_done
+                if tokens is not None:
+                    tokens.finish(index, summary)
+                yield summary
+    finally:
+        if completed:
+            _logger.info(f"Reused {reused} of {len(completed)} checkpointed "
+                         f"chunk summaries")
+        if cache is not None:
+            cache.log_stats()
+
+def _flush(outputs):
+    for out in outputs:
+        out.flush()
+
+async def areduce_summaries(summaries, config, semaphore=None):
+    """Reduce chunk summaries to one summary; async ``reduce.reduce_summaries``."""
+    settings = _reduce_settings(config)
+    summarize_batch, cache = _async_chunk_summarizer(settings['config'])
+
+    level = _non_blank(summaries)
+    try:
+        for depth in range(1, settings['max_depth'] + 1):
+            texts = _level_texts(level, settings)
+            if texts is None:
+                break
+            batches = _amap_ordered(summarize_batch, texts, config, semaphore)
+            async with aclosing(batches) as results:
+                level = _non_blank([summary async for summary in results])
+            _log_level(depth, texts, level)
+    finally:
+        if cache is not None:
+            cache.log_stats()
+    return '\n\n'.join(level)
+
+def _write_text(path, text):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+async def awrite_summaries(file_path, selected_text, initial_summaries, config,
+                           semaphore=None, resume=False, on_token=None):
+    """Summarize prepared text and write the summary files; async ``write_summaries``.
+
+    Summary pieces are written to the files in chunk order as they arrive,
+    and the files are flushed from a worker thread after every chunk.
+
+    Args:
+        file_path (str): Path to the input file.
+        selected_text (str): Text returned by ``prepare_file``.
+        initial_summaries (List[str]): Summaries returned by ``prepare_file``.
+        config (dict): Configuration settings.
+        semaphore (asyncio.Semaphore, optional): Shared limit on requests in flight.
+        resume (bool): Reuse summaries from an existing checkpoint journal.
+        on_token (Callable[[int, str], None], optional): Called with each
+            piece of the chunk summaries.
+
+    Returns:
+        str: Path to the final summary file.
+    """
+    config = apply_profile(config)
+    paths = _output_paths(file_path)
+    chunks = await _to_thread(chunk_text, selected_text, **chunk_settings(config))
+
+    journal = CheckpointJournal(paths['checkpoint'], CheckpointJournal.make_fingerprint(
+        config['ollama']['model'], config['prompt_template']))
+    completed = await _to_thread(journal.load) if resume else {}
+    if completed:
+        _logger.info(f"Resuming {file_path} from {len(completed)} checkpointed chunks")
+
+    start = time.perf_counter()
+    with ExitStack() as stack:
+        outputs = [stack.enter_context(open(paths[name], 'w', encoding='utf-8'))
+                   for name in ('final_summary', 'summary')]
+        _write_summary_header(outputs[1], initial_summaries)
+        stack.enter_context(journal.start())
+        writer = _SummaryWriter(outputs, on_token, flush=False)
+        tokens = _OrderedTokens(writer.write, writer.end)
+
+        written = []
+        async with aclosing(_asummarize_with_journal(chunks, config, journal, completed,
+                                                     semaphore, tokens)) as summaries:
+            async for chunk_summary in summaries:
+                await _to_thread(_flush, outputs)
+                if chunk_summary and chunk_summary.strip():
+                    written.append(chunk_summary)
+    get_profiler().record('summarize', time.perf_counter() - start,
+                          output_size=sum(map(len, written)))
+
+    await _to_thread(journal.remove)
+    _logger.info(f"Completed summarization. Files saved in {paths['input_dir']}")
+
+    if config.get('reduce', {}).get('enabled', False):
+        start = time.perf_counter()
+        reduced = await areduce_summaries(written, config, semaphore)
+        get_profiler().record('reduce', time.perf_counter() - start,
+                              sum(map(len, written)), len(reduced))
+        await _to_thread(_write_text, paths['final_summary'], f"{reduced}\n")
+        _logger.info(f"Wrote reduced summary to {paths['final_summary']}")
+    return paths['final_summary']
+
+async def aprocess_file(file_path, config, resume=False, on_token=None, semaphore=None,
+                        executor=None):
+    """Process and summarize the given file; async ``process_file``.
+
+    Conversion and preprocessing run in ``executor`` (a process pool keeps
+    them from competing for the GIL with the event loop), or in the
+    default thread pool. Files that ``use_streaming`` selects go through
+    the synchronous streaming pipeline on a worker thread, since it reads,
+    preprocesses and summarizes at the same time; ``on_token`` is then
+    called from that thread, and cancelling stops waiting for it but not
+    the thread.
+
+    Args:
+        file_path (str): Path to the input file.
+        config (dict): Configuration settings.
+        resume (bool): Skip chunks recorded in an earlier, interrupted run.
+        on_token (Callable[[int, str], None], optional): Called with each
+            piece of the chunk summaries as it is written.
+        semaphore (asyncio.Semaphore, optional): Shared limit on requests in flight.
+        executor (Executor, optional): Pool to run ``prepare_file`` in.
+
+    Returns:
+        str: Path to the final summary file.
+    """
+    if use_streaming(file_path, config):
+        from .pipeline import process_file_streaming
+        return await _to_thread(process_file_streaming, file_path, config,
+                                resume=resume, on_token=on_token)
+
+    loop = asyncio.get_running_loop()
+    selected_text, initial_summaries = await loop.run_in_executor(
+        executor, prepare_file, file_path, config)
+    return await awrite_summaries(file_path, selected_text, initial_summaries, config,
+                                  semaphore=semaphore, resume=resume, on_token=on_token)
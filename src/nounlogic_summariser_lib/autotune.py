@@ -0,0 +1,255 @@
+"""
+Chunk size and concurrency autotuning.
+
+:func:`calibrate` sends chunks of several sizes to the configured model, at
+several concurrency levels, and times them. :func:`choose_settings` picks
+the chunk size and concurrency that would summarize a document of
+``autotune.document_tokens`` tokens fastest, and :func:`save_profile`
+stores the result per model in a JSON profile file. When
+``autotune.use_profile`` is set, :func:`apply_profile` makes
+``summarize_text`` and the other entry points use the stored settings.
+"""
+
+import json
+import logging
+import math
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .interface import chunk_settings
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILE_PATH = '~/.cache/nounlogic_summariser/autotune.json'
+
+# Calibration chunks are drawn from these words in a different random order
+# each, so the server can't reuse the prompt of an earlier chunk
+_CALIBRATION_TEXT = (
+    "Economics studies how households, firms and governments allocate scarce "
+    "resources among competing uses. Demand describes how much of a good buyers "
+    "are willing to purchase at each price, while supply describes how much "
+    "sellers offer. Markets reach equilibrium where the two are equal, and "
+    "prices adjust when either curve shifts. Students should explain the main "
+    "determinants of demand, including income, tastes, the prices of related "
+    "goods and expectations about the future. Inflation is the general rise in "
+    "prices over time, and central banks use interest rates to keep it stable."
+)
+
+def _profile_path(config):
+    path = config.get('autotune', {}).get('profile_path', DEFAULT_PROFILE_PATH)
+    return os.path.abspath(os.path.expanduser(path))
+
+def _calibration_chunks(text, size, count, counter, seed):
+    """Return ``count`` distinct chunks of about ``size`` tokens.
+
+    Chunks are cut by token count alone. Unlike :func:`interface.chunk_text`,
+    questions and headings in the sample don't start new chunks, which
+    would leave every chunk far smaller than ``size``.
+    """
+    words = text.split()
+    rng = random.Random(seed)
+    chunks = []
+    chunk = []
+    tokens = 0
+    while len(chunks) < count:
+        for word in rng.sample(words, len(words)):
+            chunk.append(word)
+            tokens += counter(word)
+            if tokens >= size:
+                chunks.append(' '.join(chunk))
+                chunk = []
+                tokens = 0
+    return chunks[:count]
+
+def calibrate(config, text=None, sizes=None, concurrency=None, samples=None):
+    """Time summarization requests of several sizes and concurrency levels.
+
+    Requests go through the same code as real chunks, streamed or not,
+    but bypass the summary cache. One unmeasured request first makes the
+    server load the model.
+
+    Args:
+        config (dict): Configuration settings.
+        text (str, optional): Sample text to build chunks from; a built-in
+            paragraph when not given.
+        sizes (List[int], optional): Chunk sizes in tokens, as counted by
+            ``chunking.token_counter``; defaults to ``autotune.sizes``.
+        concurrency (List[int], optional): Requests in flight at once;
+            defaults to ``autotune.concurrency``.
+        samples (int, optional): Batches timed per size and concurrency;
+            defaults to ``autotune.samples``.
+
+    Returns:
+        List[dict]: One measurement per batch with the keys ``size``,
+        ``concurrency``, ``tokens`` and ``seconds``.
+    """
+    from .summariser import _chunk_summarizer
+
+    settings = config.get('autotune', {})
+    sizes = sizes or settings.get('sizes', [250, 500, 1000, 2000])
+    levels = concurrency or settings.get('concurrency', [1, 2, 4])
+    samples = samples or settings.get('samples', 2)
+    counter = chunk_settings(config)['token_counter']
+    summarize_chunk, _ = _chunk_summarizer({**config, 'cache': {'enabled': False}})
+    text = text or _CALIBRATION_TEXT
+
+    measurements = []
+    with ThreadPoolExecutor(max_workers=max(levels), thread_name_prefix='autotune') as pool:
+        summarize_chunk(_calibration_chunks(text, min(sizes), 1, counter, seed=0)[0])
+        for size in sizes:
+            chunks = iter(_calibration_chunks(text, size, samples * sum(levels), counter, seed=size))
+            for level in levels:
+                for _ in range(samples):
+                    batch = [next(chunks) for _ in range(level)]
+                    start = time.perf_counter()
+                    list(pool.map(summarize_chunk, batch))
+                    seconds = time.perf_counter() - start
+                    tokens = sum(counter(word) for chunk in batch for word in chunk.split())
+                    measurements.append({'size': size, 'concurrency': level,
+                                         'tokens': tokens, 'seconds': seconds})
+                    _logger.info(f"Calibration: {level} x {size} tokens in {seconds:.2f}s")
+    return measurements
+
+def fit_latency(measurements):
+    """Fit ``seconds = overhead + tokens / tokens_per_s`` to single requests.
+
+    Returns:
+        Tuple[float, float]: Per-call overhead in seconds and tokens per
+        second; the rate is ``None`` if latency does not grow with size.
+    """
+    points = [(m['tokens'], m['seconds']) for m in measurements if m['concurrency'] == 1]
+    if not points:
+        return None, None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    spread = sum((x - mean_x) ** 2 for x, _ in points)
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in points) / spread if spread else 0.0
+    if slope <= 0:
+        return mean_y, None
+    return max(0.0, mean_y - slope * mean_x), 1 / slope
+
+def estimate_seconds(batch_seconds, size, level, document_tokens):
+    """Estimated time to summarize ``document_tokens`` tokens.
+
+    The document is cut into chunks of ``size`` tokens that are sent
+    ``level`` at a time, each batch taking ``batch_seconds``.
+    """
+    chunks = math.ceil(document_tokens / size)
+    return math.ceil(chunks / level) * batch_seconds
+
+def choose_settings(measurements, document_tokens=20000, tolerance=0.05):
+    """Pick the chunk size and concurrency that summarize a document fastest.
+
+    Settings within ``tolerance`` of the fastest are treated as equal, and
+    the one with the fewest requests in flight, then the largest chunks,
+    is chosen, to put the least load on the server.
+
+    Returns:
+        dict: ``token_limit``, ``max_concurrency`` and ``estimated_seconds``.
+    """
+    batches = {}
+    for m in measurements:
+        batches.setdefault((m['size'], m['concurrency']), []).append(m['seconds'])
+    estimates = {
+        (size, level): estimate_seconds(sum(times) / len(times), size, level, document_tokens)
+        for (size, level), times in batches.items()
+    }
+    fastest = min(estimates.values())
+    size, level = min(
+        (key for key, seconds in estimates.items() if seconds <= fastest * (1 + tolerance)),
+        key=lambda key: (key[1], -key[0]))
+    return {'token_limit': size, 'max_concurrency': level,
+            'estimated_seconds': estimates[(size, level)]}
+
+def autotune(config, text=None, sizes=None, concurrency=None, samples=None):
+    """Calibrate the configured model and save the chosen settings.
+
+    Returns:
+        dict: The profile entry stored for the model.
+    """
+    settings = config.get('autotune', {})
+    document_tokens = settings.get('document_tokens', 20000)
+    measurements = calibrate(config, text, sizes, concurrency, samples)
+    overhead, rate = fit_latency(measurements)
+    entry = {
+        **choose_settings(measurements, document_tokens),
+        'token_counter': config.get('chunking', {}).get('token_counter', 'approx'),
+        'document_tokens': document_tokens,
+        'overhead_s': overhead,
+        'tokens_per_s': rate,
+        'tuned_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'measurements': measurements,
+    }
+    save_profile(config, entry)
+    _logger.info(f"Chose chunks of {entry['token_limit']} tokens with {entry['max_concurrency']} "
+                 f"requests in flight for {config['ollama']['model']} "
+                 f"(about {entry['estimated_seconds']:.1f}s per {document_tokens} tokens)")
+    return entry
+
+_profiles = {}
+_profiles_lock = threading.Lock()
+
+def load_profiles(path):
+    """Read a profile file; entries are keyed by model. Missing files are empty."""
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    with _profiles_lock:
+        cached = _profiles.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+    with open(path, 'r', encoding='utf-8') as f:
+        profiles = json.load(f)
+    with _profiles_lock:
+        _profiles[path] = (mtime, profiles)
+    return profiles
+
+def save_profile(config, entry):
+    """Store ``entry`` for the configured model in the profile file."""
+    path = _profile_path(config)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    profiles = dict(load_profiles(path))
+    profiles[config['ollama']['model']] = entry
+    # Write to a temporary file first so readers never see a partial profile
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(profiles, f, indent=2)
+    os.replace(tmp_path, path)
+    _logger.info(f"Saved autotune profile to {path}")
+
+def apply_profile(config):
+    """Return ``config`` with the tuned settings of its model, if any.
+
+    With ``autotune.use_profile`` set and a profile entry for
+    ``ollama.model`` that was tuned with the same ``chunking.token_counter``,
+    ``chunking.token_limit`` and ``ollama.max_concurrency`` are replaced by
+    the tuned values. Otherwise ``config`` is returned unchanged.
+
+    With ``ollama.endpoints`` configured, requests in flight are limited by
+    each endpoint's own ``max_concurrency``, so only the chunk size is
+    applied.
+    """
+    settings = config.get('autotune', {})
+    if not settings.get('use_profile', False):
+        return config
+    model = config['ollama']['model']
+    entry = load_profiles(_profile_path(config)).get(model)
+    if entry is None:
+        return config
+    chunking = config.get('chunking', {})
+    if entry.get('token_counter', 'approx') != chunking.get('token_counter', 'approx'):
+        _logger.debug(f"Ignoring the autotune profile of {model}: tuned for another token counter")
+        return config
+    tuned = {**config, 'chunking': {**chunking, 'token_limit': entry['token_limit']}}
+    if config['ollama'].get('endpoints'):
+        _logger.info(f"Not applying the tuned concurrency of {model} "
+                     f"({entry['max_concurrency']}): ollama.endpoints sets the "
+                     f"concurrency of each endpoint")
+        return tuned
+    tuned['ollama'] = {**config['ollama'], 'max_concurrency': entry['max_concurrency']}
+    return tuned
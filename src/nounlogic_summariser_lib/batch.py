@@ -0,0 +1,144 @@
+import glob
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from .autotune import apply_profile
+from .pipeline import process_file_streaming
+from .summariser import OUTPUT_SUFFIXES, _map_ordered, _max_concurrency, prepare_file, use_streaming, write_summaries
+
+_logger = logging.getLogger(__name__)
+
+def discover_files(target, supported_formats):
+    """Find the input files named by a file, directory or glob pattern.
+
+    Directories are searched recursively. Only files whose extension is in
+    ``supported_formats`` are returned, and files this tool wrote itself
+    (summaries, metadata, questions) are skipped.
+
+    Args:
+        target (str): A file path, a directory, or a glob pattern.
+        supported_formats (List[str]): Extensions to accept, e.g. ``[".pdf"]``.
+
+    Returns:
+        List[str]: Sorted list of matching file paths.
+    """
+    if os.path.isdir(target):
+        candidates = (
+            os.path.join(root, name)
+            for root, _, files in os.walk(target)
+            for name in files
+        )
+    elif os.path.isfile(target):
+        candidates = [target]
+    else:
+        candidates = glob.glob(target, recursive=True)
+
+    formats = {ext.lower() for ext in supported_formats}
+    return sorted(
+        path for path in candidates
+        if os.path.isfile(path)
+        and os.path.splitext(path)[1].lower() in formats
+        and not path.endswith(OUTPUT_SUFFIXES)
+    )
+
+def single_process_config(config):
+    """Return ``config`` with page extraction and preprocessing in one process each.
+
+    Used where whole files are already spread across worker processes, so
+    the per-file process pools would only be nested inside them.
+    """
+    return {
+        **config,
+        'conversion': {**config.get('conversion', {}), 'pdf_workers': 1},
+        'preprocessing': {**config.get('preprocessing', {}), 'workers': 1},
+    }
+
+def summarize_file(path, config, prep_pool, llm_pool, resume=False, on_token=None):
+    """Summarize one file using pools shared with other files.
+
+    The file is converted and preprocessed in ``prep_pool`` (or, in
+    streaming mode, read in the calling thread) and its chunks are sent to
+    the model through ``llm_pool``.
+
+    Args:
+        path (str): Input file.
+        config (dict): Configuration settings.
+        prep_pool (ProcessPoolExecutor): Pool running :func:`prepare_file`.
+        llm_pool (ThreadPoolExecutor): Pool sending the chunk requests.
+        resume (bool): Resume the file from its checkpoint journal.
+        on_token (Callable[[int, str], None], optional): Called with each
+            piece of the chunk summaries as it is written.
+
+    Returns:
+        str: Path to the final summary file.
+    """
+    if use_streaming(path, config):
+        return process_file_streaming(path, config, executor=llm_pool, resume=resume,
+                                      on_token=on_token)
+    selected_text, initial_summaries = prep_pool.submit(prepare_file, path, config).result()
+    return write_summaries(path, selected_text, initial_summaries, config,
+                           executor=llm_pool, resume=resume, on_token=on_token)
+
+def process_batch(paths, config, workers=None, resume=False):
+    """Summarize many files with a shared pipeline.
+
+    Conversion and preprocessing run in a process pool of ``workers``
+    processes (in streaming mode, files are read and preprocessed in the
+    threads that feed the model instead). All chunk requests to Ollama go through one thread pool
+    bounded by ``ollama.max_concurrency``, shared by every file. If
+    ``error_handling.continue_on_error`` is false, the first failure stops
+    the batch: files already started are finished and reported, and the
+    ones not started yet are reported as skipped.
+
+    Args:
+        paths (List[str]): Input files to process.
+        config (dict): Configuration settings.
+        workers (int, optional): Number of preprocessing processes. Defaults
+            to ``batch.workers`` in config, then to the CPU count.
+        resume (bool): Resume each file from its checkpoint journal.
+
+    Returns:
+        List[dict]: One report entry per file, in input order, with the keys
+        ``file``, ``status`` (``"ok"``, ``"failed"`` or ``"skipped"``),
+        ``output`` and ``error``.
+    """
+    config = apply_profile(config)
+    workers = workers or config.get('batch', {}).get('workers') or os.cpu_count() or 1
+    max_concurrency = _max_concurrency(config)
+    continue_on_error = config.get('error_handling', {}).get('continue_on_error', True)
+
+    # Files are already spread across processes; don't nest per-file pools
+    config = single_process_config(config)
+
+    stop = threading.Event()
+    with ProcessPoolExecutor(max_workers=workers) as prep_pool, \
+         ThreadPoolExecutor(max_workers=max_concurrency,
+                            thread_name_prefix='summarise') as llm_pool:
+
+        def run(path):
+            if stop.is_set():
+                return {'file': path, 'status': 'skipped', 'output': None, 'error': None}
+            try:
+                output = summarize_file(path, config, prep_pool, llm_pool, resume=resume)
+            except Exception as e:
+                _logger.error(f"Failed to summarize {path}: {e}")
+                if not continue_on_error:
+                    stop.set()
+                return {'file': path, 'status': 'failed', 'output': None, 'error': str(e)}
+            return {'file': path, 'status': 'ok', 'output': output, 'error': None}
+
+        # Enough files in flight to keep every preprocessing process busy
+        # while earlier files are waiting on the model.
+        return list(_map_ordered(run, paths, workers + max_concurrency))
+
+def log_report(report):
+    """Log a per-file success/failure report for a batch run."""
+    for entry in report:
+        detail = entry['output'] if entry['status'] == 'ok' else entry['error'] or ''
+        _logger.info(f"{entry['status'].upper():8} {entry['file']} {detail}")
+    counts = {status: sum(1 for e in report if e['status'] == status)
+              for status in ('ok', 'failed', 'skipped')}
+    _logger.info(f"Batch finished: {counts['ok']} succeeded, {counts['failed']} failed, "
+                 f"{counts['skipped']} skipped")
@@ -0,0 +1,135 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+_logger = logging.getLogger(__name__)
+
+# One cache per (directory, size limit) so concurrent callers share counters
+_caches = {}
+_caches_lock = threading.Lock()
+
+class SummaryCache:
+    """Persistent, content-addressed store of chunk summaries.
+
+    Entries live as one file per key under ``directory`` and are evicted
+    least-recently-used first once the total size exceeds ``max_bytes``.
+    Recency and sizes are kept in an in-memory index, built from the file
+    modification times when the cache is opened; hits also bump the
+    modification time so the next process starts from the same order.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        # Entry path -> size, least recently used first
+        self._index = OrderedDict()
+        for path, _ in sorted(self._entries(), key=lambda entry: entry[1]):
+            try:
+                self._index[path] = os.path.getsize(path)
+            except OSError:
+                continue
+        self._size = sum(self._index.values())
+
+    @staticmethod
+    def make_key(model, prompt, chunk):
+        """Hash the inputs that determine a summary into a cache key."""
+        payload = json.dumps([model, prompt, chunk], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.txt")
+
+    def _entries(self):
+        """Yield ``(path, mtime)`` for every stored entry."""
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith('.txt'):
+                    path = os.path.join(root, name)
+                    try:
+                        yield path, os.path.getmtime(path)
+                    except OSError:
+                        continue
+
+    def get(self, key):
+        """Return the cached summary for ``key``, or ``None`` on a miss."""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                summary = f.read()
+            os.utime(path)  # Mark as most recently used
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+            if path in self._index:
+                self._index.move_to_end(path)
+        _logger.debug(f"Summary cache hit: {key}")
+        return summary
+
+    def put(self, key, summary):
+        """Store ``summary`` under ``key`` and evict old entries if needed."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first so readers never see partial entries
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(summary)
+        os.replace(tmp_path, path)
+        size = os.path.getsize(path)
+        with self._lock:
+            self._size += size - self._index.pop(path, 0)
+            self._index[path] = size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Delete least recently used entries until under the size limit.
+
+        Call with ``_lock`` held.
+        """
+        while self._size > self.max_bytes and self._index:
+            path, size = self._index.popitem(last=False)
+            self._size -= size
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            _logger.debug(f"Evicted summary cache entry: {path}")
+
+    def log_stats(self):
+        """Log the hit/miss counters."""
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0
+        _logger.info(f"Summary cache {self.directory}: {self.hits} hits, "
+                     f"{self.misses} misses ({rate:.0%} hit rate)")
+
+def get_cache(config):
+    """Return the shared summary cache for ``config``, or ``None`` if disabled.
+
+    Args:
+        config (dict): Configuration settings.
+
+    Returns:
+        SummaryCache: Cache described by the ``cache`` section, if enabled.
+    """
+    cache_config = config.get('cache', {})
+    if not cache_config.get('enabled', False):
+        return None
+    directory = os.path.abspath(os.path.expanduser(
+        cache_config.get('directory', '~/.cache/nounlogic_summariser')))
+    max_bytes = int(cache_config.get('max_size_mb', 256) * 1024 * 1024)
+    with _caches_lock:
+        cache = _caches.get((directory, max_bytes))
+        if cache is None:
+            cache = _caches[(directory, max_bytes)] = SummaryCache(directory, max_bytes)
+    return cache
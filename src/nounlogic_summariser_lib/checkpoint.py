@@ -0,0 +1,94 @@
+import hashlib
+import json
+import logging
+import os
+
+_logger = logging.getLogger(__name__)
+
+class CheckpointJournal:
+    """Append-only record of the chunk summaries finished for one document.
+
+    The journal is a JSON-lines file. The first line holds a fingerprint of
+    the model and prompt, so a journal left behind by a run with different
+    settings is never resumed from. Every following line records one
+    completed chunk as ``{"index": ..., "chunk": ..., "summary": ...}``,
+    where ``chunk`` is a digest of the chunk text. A summary is only reused
+    for a chunk with the same index and digest, so chunks can be checked
+    one by one as they are produced.
+    """
+
+    def __init__(self, path, fingerprint):
+        self.path = path
+        self.fingerprint = fingerprint
+        self._file = None
+
+    @staticmethod
+    def make_fingerprint(model, prompt):
+        """Hash the settings that decide what summary a chunk gets."""
+        return hashlib.sha256(json.dumps([model, prompt]).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def chunk_digest(chunk):
+        """Hash a chunk's text."""
+        return hashlib.sha256(chunk.encode('utf-8')).hexdigest()
+
+    def load(self):
+        """Read the completed chunks from an existing journal.
+
+        Returns:
+            Dict[int, Tuple[str, str]]: Chunk digest and summary by chunk
+            index; empty if there is no journal or it belongs to a run
+            with different settings.
+        """
+        completed = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                lines = iter(f)
+                header = json.loads(next(lines, 'null') or 'null')
+                if not header or header.get('fingerprint') != self.fingerprint:
+                    _logger.warning(f"Ignoring checkpoint {self.path}: it was written with different settings")
+                    return {}
+                for line in lines:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A crash can leave a partly written last line
+                        break
+                    completed[entry['index']] = (entry['chunk'], entry['summary'])
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            _logger.warning(f"Ignoring unreadable checkpoint {self.path}")
+            return {}
+        return completed
+
+    def start(self):
+        """Create a new, empty journal for this run."""
+        self._file = open(self.path, 'w', encoding='utf-8')
+        self._write({'fingerprint': self.fingerprint})
+        return self
+
+    def record(self, index, digest, summary):
+        """Mark chunk ``index`` with content ``digest`` as done with ``summary``."""
+        self._write({'index': index, 'chunk': digest, 'summary': summary})
+
+    def _write(self, entry):
+        self._file.write(json.dumps(entry) + '\n')
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def remove(self):
+        """Delete the journal once the document is fully summarized."""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
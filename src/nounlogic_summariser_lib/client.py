@@ -0,0 +1,313 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+import weakref
+
+from .profiling import mark_first_byte
+
+_logger = logging.getLogger(__name__)
+
+# Statuses worth retrying; -1 is an error reported inside a streamed reply
+RETRY_STATUSES = frozenset({-1, 408, 429, 500, 502, 503, 504})
+
+class CircuitOpenError(ConnectionError):
+    """Raised without contacting the server while the circuit breaker is open."""
+
+class CircuitBreaker:
+    """Stop sending requests to a server that keeps failing.
+
+    After ``failure_threshold`` failed attempts in a row the breaker opens
+    and every call fails at once for ``reset_timeout`` seconds. Then one
+    trial request is let through: success closes the breaker, failure opens
+    it again.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def before_call(self):
+        """Raise :class:`CircuitOpenError` unless a request may be sent now."""
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return
+            if state == 'half-open' and not self._trial:
+                self._trial = True
+                return
+            raise CircuitOpenError("Ollama server unavailable; not retrying until the circuit breaker resets")
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or (self.opened_at is None and self.failures >= self.failure_threshold):
+                _logger.warning(f"Circuit breaker opened after {self.failures} failed requests")
+                self.opened_at = time.monotonic()
+                self._trial = False
+
+def is_retryable(error):
+    """Whether a failed request is worth sending again."""
+    import httpx
+    from ollama import ResponseError
+
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, ResponseError):
+        return error.status_code in RETRY_STATUSES
+    return isinstance(error, (ConnectionError, httpx.TransportError))
+
+class _RetryingClient:
+    """Retry and circuit breaker settings shared by the sync and async clients."""
+
+    def __init__(self, retry_attempts=0, backoff_base=0.5, backoff_max=30.0,
+                 failure_threshold=5, reset_timeout=30.0):
+        self.retry_attempts = retry_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+    def backoff(self, attempt):
+        """Seconds to wait before retry number ``attempt`` (from 0)."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _retry_delay(self, error, attempt):
+        """Record failed attempt number ``attempt`` (from 0).
+
+        Returns:
+            float: Seconds to wait before sending the request again, or
+            ``None`` if it should not be retried.
+        """
+        if not is_retryable(error):
+            # The server answered, so it is up even if the request was bad
+            self.breaker.record_success()
+            return None
+        self.breaker.record_failure()
+        if attempt >= self.retry_attempts:
+            return None
+        delay = self.backoff(attempt)
+        _logger.warning(f"Ollama request failed ({error}); retry {attempt + 1} of "
+                        f"{self.retry_attempts} in {delay:.2f}s")
+        return delay
+
+class OllamaClient(_RetryingClient):
+    """Ollama chat client with timeouts, retries and a circuit breaker.
+
+    One instance keeps a single pooled HTTP client, so connections are kept
+    alive and reused across requests and threads. Use :func:`get_client` to
+    share an instance per process and configuration.
+
+    Failed requests that are worth retrying (connection errors, timeouts,
+    429 and 5xx responses) are sent again up to ``retry_attempts`` times,
+    waiting a random time between zero and ``backoff_base * 2 ** attempt``
+    seconds (at most ``backoff_max``) before each retry. A streamed reply
+    is only retried if it fails before its first part arrives.
+
+    Args:
+        host (str, optional): Ollama server URL; ``OLLAMA_HOST`` when unset.
+        timeout (float, optional): Seconds to wait to connect, to send the
+            request and for a pooled connection; ``None`` waits forever.
+        read_timeout (float, optional): Seconds to wait between bytes of
+            the reply. ``None``, the default, waits forever, since a model
+            may take minutes before its first byte.
+        retry_attempts (int): Retries after the first attempt.
+        backoff_base (float): Upper bound of the first retry delay.
+        backoff_max (float): Largest retry delay.
+        failure_threshold (int): Failed attempts in a row that open the
+            circuit breaker.
+        reset_timeout (float): Seconds the breaker stays open.
+    """
+
+    def __init__(self, host=None, timeout=None, read_timeout=None, retry_attempts=0,
+                 backoff_base=0.5, backoff_max=30.0, failure_threshold=5,
+                 reset_timeout=30.0):
+        # ollama and httpx are only imported once a client is needed
+        from ollama import Client
+
+        super().__init__(retry_attempts, backoff_base, backoff_max, failure_threshold, reset_timeout)
+        self._client = Client(host=host, timeout=_http_timeout(timeout, read_timeout),
+                              event_hooks={'response': [mark_first_byte]})
+
+    def chat(self, stream=False, **kwargs):
+        """Send a chat request; see ``ollama.Client.chat``.
+
+        With ``stream`` set, the request is sent and its first part read
+        before this returns, so connection errors are raised here rather
+        than while iterating over the reply.
+        """
+        if stream:
+            return self._stream(kwargs)
+        return self._call(lambda: self._client.chat(**kwargs))
+
+    def _call(self, request):
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            try:
+                response = request()
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                time.sleep(delay)
+            else:
+                self.breaker.record_success()
+                return response
+
+    def _stream(self, kwargs):
+        def first_part():
+            parts = self._client.chat(stream=True, **kwargs)
+            return next(parts, None), parts
+
+        first, parts = self._call(first_part)
+        return self._chain(first, parts)
+
+    @staticmethod
+    def _chain(first, parts):
+        if first is None:
+            return
+        yield first
+        yield from parts
+
+class AsyncOllamaClient(_RetryingClient):
+    """Asyncio counterpart of :class:`OllamaClient`.
+
+    Takes the same arguments and retries, backs off and trips its circuit
+    breaker the same way, but waits with ``asyncio.sleep`` so the event
+    loop keeps running. A client belongs to the event loop it is first used
+    on; use :func:`get_async_client` to share one per loop.
+    """
+
+    def __init__(self, host=None, timeout=None, read_timeout=None, retry_attempts=0,
+                 backoff_base=0.5, backoff_max=30.0, failure_threshold=5,
+                 reset_timeout=30.0):
+        from ollama import AsyncClient
+
+        super().__init__(retry_attempts, backoff_base, backoff_max, failure_threshold, reset_timeout)
+        self._client = AsyncClient(host=host, timeout=_http_timeout(timeout, read_timeout))
+
+    async def chat(self, stream=False, **kwargs):
+        """Send a chat request; see ``ollama.AsyncClient.chat``.
+
+        With ``stream`` set, returns an async iterator over the reply parts.
+        """
+        if stream:
+            return await self._stream(kwargs)
+        return await self._call(lambda: self._client.chat(**kwargs))
+
+    async def _call(self, request):
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            try:
+                response = await request()
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
+            else:
+                self.breaker.record_success()
+                return response
+
+    async def _stream(self, kwargs):
+        async def first_part():
+            parts = await self._client.chat(stream=True, **kwargs)
+            try:
+                return await parts.__anext__(), parts
+            except StopAsyncIteration:
+                return None, parts
+
+        first, parts = await self._call(first_part)
+        return self._chain(first, parts)
+
+    @staticmethod
+    async def _chain(first, parts):
+        if first is None:
+            return
+        yield first
+        async for part in parts:
+            yield part
+
+    async def aclose(self):
+        """Close the pooled HTTP connections."""
+        await self._client._client.aclose()
+
+def _http_timeout(timeout, read_timeout):
+    """The ``httpx.Timeout`` of a client; only ``read_timeout`` covers the reply."""
+    import httpx
+
+    return httpx.Timeout(timeout, read=read_timeout)
+
+def _client_settings(ollama_config):
+    """Arguments of the client described by an ``ollama`` config section."""
+    host = ollama_config.get('host')
+    if host and ollama_config.get('port'):
+        host = f"{host}:{ollama_config['port']}"
+    breaker = ollama_config.get('circuit_breaker', {})
+    return (
+        host,
+        ollama_config.get('timeout'),
+        ollama_config.get('read_timeout'),
+        ollama_config.get('retry_attempts', 0),
+        ollama_config.get('backoff_base', 0.5),
+        ollama_config.get('backoff_max', 30.0),
+        breaker.get('failure_threshold', 5),
+        breaker.get('reset_timeout', 30.0),
+    )
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_client(ollama_config):
+    """Return the process-wide :class:`OllamaClient` for ``ollama_config``.
+
+    Clients are shared by every thread of a process and rebuilt in a
+    forked child, which must not reuse its parent's connections.
+    """
+    settings = _client_settings(ollama_config)
+    key = (os.getpid(),) + settings
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = OllamaClient(*settings)
+        return client
+
+# Async clients by event loop, then by settings; dropped with their loop
+_async_clients = weakref.WeakKeyDictionary()
+
+def get_async_client(ollama_config):
+    """Return the :class:`AsyncOllamaClient` for ``ollama_config`` on the running loop.
+
+    Must be called from a coroutine. Every coroutine on the loop shares the
+    client and its connection pool.
+    """
+    loop = asyncio.get_running_loop()
+    settings = _client_settings(ollama_config)
+    clients = _async_clients.setdefault(loop, {})
+    client = clients.get(settings)
+    if client is None:
+        client = clients[settings] = AsyncOllamaClient(*settings)
+    return client
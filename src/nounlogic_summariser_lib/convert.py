@@ -1,24 +1,96 @@
-from pdfplumber import open as pdf_open
-from markdownify import markdownify as mdify
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
+from concurrent.futures import ProcessPoolExecutor
 
-def convert_pdf_to_md(pdf_path):
+# pdfplumber, markdownify and reportlab take a long time to import, so each
+# function imports what it needs when it is called; see tests/test_importtime.py
+
+def _extract_page_range(pdf_path, start, stop):
+    """Extract the text of pages ``start`` to ``stop`` in a worker process."""
+    from pdfplumber import open as pdf_open
+
+    texts = []
+    with pdf_open(pdf_path) as pdf:
+        for page in pdf.pages[start:stop]:
+            texts.append(page.extract_text())
+            page.close()  # Release the parsed page objects
+    return texts
+
+def iter_pdf_pages(pdf_path, workers=1):
+    """Yield the text of each non-empty page of a PDF, in page order.
+
+    Every page is extracted exactly once. With more than one worker, the
+    pages are split into contiguous ranges and each worker process opens
+    the PDF and extracts its own range.
+
+    Args:
+        pdf_path (str): Path to the PDF file.
+        workers (int): Number of worker processes to extract pages with.
+
+    Yields:
+        str: Text of a page.
+    """
+    from pdfplumber import open as pdf_open
+
+    if workers <= 1:
+        with pdf_open(pdf_path) as pdf:
+            for page in pdf.pages:
+                text = page.extract_text()
+                page.close()  # Release the parsed page objects
+                if text:
+                    yield text
+        return
+
+    with pdf_open(pdf_path) as pdf:
+        page_count = len(pdf.pages)
+    # Several ranges per worker keeps the pool balanced when some pages
+    # (e.g. scanned or table-heavy ones) are much slower than others.
+    range_size = max(1, -(-page_count // (workers * 4)))
+    starts = range(0, page_count, range_size)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for texts in pool.map(_extract_page_range, [pdf_path] * len(starts), starts,
+                              [start + range_size for start in starts]):
+            for text in texts:
+                if text:
+                    yield text
+
+def iter_pdf_markdown(pdf_path, workers=1):
+    """Yield each non-empty page of a PDF converted to Markdown.
+
+    Unlike :func:`convert_pdf_to_md`, the whole document is never held as
+    one string.
+
+    Args:
+        pdf_path (str): Path to the PDF file.
+        workers (int): Number of worker processes to extract pages with.
+
+    Yields:
+        str: Markdown text of a page.
+    """
+    from markdownify import markdownify as mdify
+
+    for text in iter_pdf_pages(pdf_path, workers):
+        yield mdify(text)
+
+def convert_pdf_to_md(pdf_path, workers=1):
     """Convert a PDF file to Markdown.
     
     Args:
         pdf_path (str): Path to the PDF file.
+        workers (int): Number of worker processes to extract pages with.
     
     Returns:
         str: Converted Markdown text.
     """
-    with pdf_open(pdf_path) as pdf:
-        text = "\n".join(page.extract_text() for page in pdf.pages if page.extract_text())
+    from markdownify import markdownify as mdify
+
+    text = "\n".join(iter_pdf_pages(pdf_path, workers))
     markdown_text = mdify(text)
     return markdown_text
 
 def convert_txt_to_pdf(txt_path, pdf_path):
     """Convert a TXT file to PDF."""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
     with open(txt_path, 'r', encoding='utf-8') as f:
         lines = f.readlines()
     c = canvas.Canvas(pdf_path, pagesize=letter)
@@ -0,0 +1,190 @@
+import logging
+import random
+import string
+import zlib
+from array import array
+from functools import lru_cache
+
+_logger = logging.getLogger(__name__)
+
+# Prime modulus of the permutations; hash values fit in 32 bits
+_PRIME = (1 << 31) - 1
+_PUNCTUATION_TO_SPACE = str.maketrans(string.punctuation, ' ' * len(string.punctuation))
+
+def shingles(sentence, size):
+    """Return the hashed word ``size``-grams of a sentence.
+
+    Words are lowercased and punctuation is treated as a word break, so
+    sentences that differ only in case or punctuation have the same shingles.
+
+    Args:
+        sentence (str): A sentence.
+        size (int): Words per shingle.
+
+    Returns:
+        Set[int]: CRC32 hashes of the shingles; empty if there are no words.
+    """
+    words = sentence.lower().translate(_PUNCTUATION_TO_SPACE).split()
+    if len(words) <= size:
+        return {zlib.crc32(' '.join(words).encode('utf-8'))} if words else set()
+    return {
+        zlib.crc32(' '.join(words[i:i + size]).encode('utf-8'))
+        for i in range(len(words) - size + 1)
+    }
+
+class MinHasher:
+    """Compute MinHash signatures of shingle sets.
+
+    Uses one-permutation hashing: each shingle is hashed once into one of
+    ``num_perm`` bins and every bin keeps its minimum, so a signature costs
+    one hash per shingle instead of one per shingle and permutation. Empty
+    bins, common for short sentences, are filled from other bins in a
+    fixed random order ("optimal densification"), which keeps equal
+    positions of two signatures as likely as the sets' Jaccard similarity.
+
+    The hash and probe order come from a seeded generator, so signatures are
+    the same in every run and process.
+    """
+
+    def __init__(self, num_perm=64, seed=1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self._a = rng.randrange(1, _PRIME)
+        self._b = rng.randrange(0, _PRIME)
+        # Bins each empty bin borrows from, tried in order
+        self._probes = [[rng.randrange(num_perm) for _ in range(4 * num_perm)]
+                        for _ in range(num_perm)]
+
+    def signature(self, hashes):
+        """Return the signature of a non-empty set of shingle hashes."""
+        k = self.num_perm
+        a, b = self._a, self._b
+        bins = [_PRIME] * k
+        for h in hashes:
+            value = (a * h + b) % _PRIME
+            j = value % k
+            value //= k
+            if value < bins[j]:
+                bins[j] = value
+        signature = array('I', bins)
+        for j, value in enumerate(bins):
+            if value == _PRIME:
+                for t in self._probes[j]:
+                    if bins[t] != _PRIME:
+                        signature[j] = bins[t]
+                        break
+                else:
+                    # Fall back to the next filled bin
+                    signature[j] = next(bins[(j + i) % k] for i in range(1, k)
+                                        if bins[(j + i) % k] != _PRIME)
+        return signature
+
+def _probability(s, bands, rows):
+    return 1 - (1 - s ** rows) ** bands
+
+@lru_cache(maxsize=None)
+def lsh_params(threshold, num_perm, recall=0.95):
+    """Choose the number of bands and rows per band for an LSH index.
+
+    Two sentences become candidates when all rows of one band agree, which
+    for Jaccard similarity ``s`` happens with probability
+    ``1 - (1 - s ** rows) ** bands``. This picks the most rows per band (the
+    fewest chance candidates) that still finds a pair at ``threshold`` with
+    probability ``recall``; candidates are checked against the threshold
+    afterwards, so extra ones only cost time.
+
+    Returns:
+        Tuple[int, int]: Bands and rows per band.
+    """
+    for rows in range(num_perm, 0, -1):
+        bands = num_perm // rows
+        if _probability(threshold, bands, rows) >= recall:
+            return bands, rows
+    return num_perm, 1
+
+class NearDuplicateFilter:
+    """Drop sentences that nearly repeat an earlier sentence of the document.
+
+    Each sentence is reduced to a MinHash signature of its word shingles
+    and looked up in an LSH index of the sentences kept so far. Only the
+    sentences that share a band with it are compared, so the work per
+    sentence stays roughly constant and a document is filtered in close to
+    linear time. A sentence whose estimated Jaccard similarity to a kept
+    sentence reaches ``threshold`` is dropped; the first occurrence is kept.
+
+    The filter remembers every kept sentence, so calling :meth:`filter`
+    on consecutive parts of a document removes repeats across parts.
+
+    Args:
+        threshold (float): Similarity from which sentences are duplicates.
+        num_perm (int): Signature length; more is more accurate but slower.
+        shingle_size (int): Words per shingle.
+        min_words (int): Sentences with fewer words are always kept.
+    """
+
+    def __init__(self, threshold=0.8, num_perm=64, shingle_size=2, min_words=4):
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.min_words = min_words
+        self.hasher = MinHasher(num_perm)
+        self.bands, self.rows = lsh_params(threshold, num_perm)
+        self._tables = [{} for _ in range(self.bands)]
+        self._signatures = array('I')
+        self.kept = 0
+        self.dropped = 0
+
+    def _bands(self, signature):
+        rows = self.rows
+        return [hash(tuple(signature[i * rows:(i + 1) * rows])) for i in range(self.bands)]
+
+    def is_duplicate(self, sentence):
+        """Check a sentence and, if it is new, add it to the index."""
+        if len(sentence.split()) < self.min_words:
+            return False
+        hashes = shingles(sentence, self.shingle_size)
+        if not hashes:
+            return False
+        signature = self.hasher.signature(hashes)
+        keys = self._bands(signature)
+
+        num_perm = self.hasher.num_perm
+        needed = self.threshold * num_perm
+        checked = set()
+        for table, key in zip(self._tables, keys):
+            for candidate in table.get(key, ()):
+                if candidate in checked:
+                    continue
+                checked.add(candidate)
+                start = candidate * num_perm
+                other = self._signatures[start:start + num_perm]
+                if sum(x == y for x, y in zip(signature, other)) >= needed:
+                    return True
+
+        index = len(self._signatures) // num_perm
+        self._signatures.extend(signature)
+        for table, key in zip(self._tables, keys):
+            table.setdefault(key, []).append(index)
+        return False
+
+    def filter(self, sentences):
+        """Return the sentences that are not near-duplicates, in order."""
+        kept = [sentence for sentence in sentences if not self.is_duplicate(sentence)]
+        self.dropped += len(sentences) - len(kept)
+        self.kept += len(kept)
+        return kept
+
+def make_deduplicator(config):
+    """Build a :class:`NearDuplicateFilter` from the ``dedup`` config section.
+
+    Returns:
+        NearDuplicateFilter: The filter, or ``None`` when disabled.
+    """
+    dedup = config.get('dedup', {})
+    if not dedup.get('enabled', False):
+        return None
+    return NearDuplicateFilter(
+        threshold=dedup.get('threshold', 0.8),
+        num_perm=dedup.get('num_perm', 64),
+        shingle_size=dedup.get('shingle_size', 2),
+        min_words=dedup.get('min_words', 4),
+    )
@@ -0,0 +1,316 @@
+"""
+Routing of chat requests across several Ollama endpoints.
+
+With an ``ollama.endpoints`` list configured, chunk requests go through a
+:class:`Dispatcher` instead of a single client. Each endpoint allows up to
+its own ``max_concurrency`` requests at once, and every request goes to
+the least-loaded endpoint, the one with the smallest share of its slots in
+use, so faster servers free their slots sooner and take more of the work.
+
+Each endpoint has its own pooled client and circuit breaker. A request that
+fails with a retryable error moves at once to another endpoint; once every
+endpoint has been tried, the dispatcher backs off and starts again, up to
+``ollama.retry_attempts`` times. An endpoint whose breaker opens after
+``circuit_breaker.failure_threshold`` failures in a row is ejected: it gets
+no requests until ``circuit_breaker.reset_timeout`` has passed, and then a
+single trial request decides whether it rejoins.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+import weakref
+
+from .client import (
+    AsyncOllamaClient,
+    CircuitOpenError,
+    _RetryingClient,
+    _client_settings,
+    get_client,
+    is_retryable,
+)
+
+_logger = logging.getLogger(__name__)
+
+def endpoint_configs(ollama_config):
+    """Settings of each configured endpoint, or an empty list if there are none.
+
+    An entry of ``ollama.endpoints`` is either a host string or an object
+    with ``host``, ``port`` and ``max_concurrency``; any other ``ollama``
+    setting, such as ``timeout``, may be overridden per endpoint.
+    """
+    configs = []
+    for endpoint in ollama_config.get('endpoints') or ():
+        if isinstance(endpoint, str):
+            endpoint = {'host': endpoint}
+        # The dispatcher fails over instead of retrying on the same endpoint
+        configs.append({**ollama_config, 'port': None, 'max_concurrency': 1,
+                        **endpoint, 'retry_attempts': 0})
+    return configs
+
+def total_concurrency(ollama_config):
+    """Requests that may be in flight at once over every endpoint, or ``None``."""
+    configs = endpoint_configs(ollama_config)
+    if not configs:
+        return None
+    return sum(max(1, int(config['max_concurrency'])) for config in configs)
+
+class _Endpoint:
+    __slots__ = ('host', 'client', 'limit', 'inflight', 'requests', 'failures')
+
+    def __init__(self, host, client, limit):
+        self.host = host
+        self.client = client
+        self.limit = limit
+        self.inflight = 0
+        self.requests = 0
+        self.failures = 0
+
+    @property
+    def healthy(self):
+        return self.client.breaker.state != 'open'
+
+    def load(self):
+        return self.inflight / self.limit
+
+class _Router(_RetryingClient):
+    """Endpoint selection and failover shared by the sync and async dispatchers.
+
+    The endpoint bookkeeping is guarded by ``_lock``, which is only held
+    for short, non-blocking sections.
+    """
+
+    def __init__(self, endpoints, retry_attempts=0, backoff_base=0.5, backoff_max=30.0):
+        super().__init__(retry_attempts, backoff_base, backoff_max)
+        self.endpoints = endpoints
+        self._lock = threading.Lock()
+
+    def _pick(self, tried):
+        """Take a slot on the least-loaded healthy endpoint not in ``tried``.
+
+        Call with ``_lock`` held.
+
+        Returns:
+            _Endpoint: The endpoint, or ``None`` if all of them are busy.
+
+        Raises:
+            CircuitOpenError: No healthy endpoint is left to try.
+        """
+        candidates = [e for e in self.endpoints if e not in tried and e.healthy]
+        if not candidates:
+            raise CircuitOpenError("No Ollama endpoint available; every endpoint has "
+                                   "failed or been ejected")
+        free = [e for e in candidates if e.inflight < e.limit]
+        if not free:
+            return None
+        endpoint = min(free, key=_Endpoint.load)
+        endpoint.inflight += 1
+        endpoint.requests += 1
+        return endpoint
+
+    def _release(self, endpoint):
+        with self._lock:
+            endpoint.inflight -= 1
+
+    def _failover(self, endpoint, error, tried, attempt):
+        """Handle a failed request on ``endpoint``.
+
+        Returns:
+            float: Seconds to wait before trying the endpoints again, ``0.0``
+            to move to another endpoint at once, or ``None`` if the error
+            should be raised.
+        """
+        if not isinstance(error, CircuitOpenError) and not is_retryable(error):
+            return None
+        if not isinstance(error, CircuitOpenError):
+            endpoint.failures += 1
+        tried.add(endpoint)
+        with self._lock:
+            untried = any(e not in tried and e.healthy for e in self.endpoints)
+        if untried:
+            _logger.warning(f"Ollama request to {endpoint.host} failed ({error}); "
+                            f"moving it to another endpoint")
+            return 0.0
+        if attempt >= self.retry_attempts:
+            return None
+        tried.clear()
+        delay = self.backoff(attempt)
+        _logger.warning(f"Ollama request failed on every endpoint ({error}); retry "
+                        f"{attempt + 1} of {self.retry_attempts} in {delay:.2f}s")
+        return delay
+
+    def stats(self):
+        """Requests, failures and state of each endpoint, keyed by host."""
+        with self._lock:
+            return {e.host: {'requests': e.requests, 'failures': e.failures,
+                             'inflight': e.inflight, 'limit': e.limit,
+                             'state': e.client.breaker.state}
+                    for e in self.endpoints}
+
+class Dispatcher(_Router):
+    """Send chat requests to the least-loaded of several endpoints.
+
+    A drop-in replacement for :meth:`client.OllamaClient.chat` that is
+    safe to share between threads. Use :func:`get_dispatcher` to share one
+    per process.
+    """
+
+    def __init__(self, endpoints, retry_attempts=0, backoff_base=0.5, backoff_max=30.0):
+        super().__init__(endpoints, retry_attempts, backoff_base, backoff_max)
+        self._freed = threading.Condition(self._lock)
+
+    def _acquire(self, tried):
+        with self._freed:
+            while True:
+                endpoint = self._pick(tried)
+                if endpoint is not None:
+                    return endpoint
+                # Wake up now and then: an ejected endpoint rejoins with time
+                self._freed.wait(0.5)
+
+    def _release(self, endpoint):
+        with self._freed:
+            endpoint.inflight -= 1
+            self._freed.notify_all()
+
+    def chat(self, stream=False, **kwargs):
+        """Send a chat request; see ``ollama.Client.chat``.
+
+        With ``stream`` set, the endpoint's slot is held until the reply
+        has been read.
+        """
+        tried = set()
+        attempt = 0
+        while True:
+            endpoint = self._acquire(tried)
+            try:
+                response = endpoint.client.chat(stream=stream, **kwargs)
+            except Exception as e:
+                self._release(endpoint)
+                delay = self._failover(endpoint, e, tried, attempt)
+                if delay is None:
+                    raise
+                if delay:
+                    attempt += 1
+                    time.sleep(delay)
+                continue
+            except BaseException:
+                self._release(endpoint)
+                raise
+            if stream:
+                return self._stream(endpoint, response)
+            self._release(endpoint)
+            return response
+
+    def _stream(self, endpoint, parts):
+        try:
+            yield from parts
+        finally:
+            self._release(endpoint)
+
+class AsyncDispatcher(_Router):
+    """Asyncio counterpart of :class:`Dispatcher`.
+
+    Belongs to the event loop it is first used on; use
+    :func:`get_async_dispatcher` to share one per loop.
+    """
+
+    def __init__(self, endpoints, retry_attempts=0, backoff_base=0.5, backoff_max=30.0):
+        super().__init__(endpoints, retry_attempts, backoff_base, backoff_max)
+        self._freed = asyncio.Event()
+
+    async def _acquire(self, tried):
+        while True:
+            with self._lock:
+                endpoint = self._pick(tried)
+            if endpoint is not None:
+                return endpoint
+            self._freed.clear()
+            try:
+                await asyncio.wait_for(self._freed.wait(), 0.5)
+            except asyncio.TimeoutError:
+                pass
+
+    def _release(self, endpoint):
+        super()._release(endpoint)
+        self._freed.set()
+
+    async def chat(self, stream=False, **kwargs):
+        """Send a chat request; see ``ollama.AsyncClient.chat``."""
+        tried = set()
+        attempt = 0
+        while True:
+            endpoint = await self._acquire(tried)
+            try:
+                response = await endpoint.client.chat(stream=stream, **kwargs)
+            except Exception as e:
+                self._release(endpoint)
+                delay = self._failover(endpoint, e, tried, attempt)
+                if delay is None:
+                    raise
+                if delay:
+                    attempt += 1
+                    await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                # Cancelled while waiting for the reply
+                self._release(endpoint)
+                raise
+            if stream:
+                return self._stream(endpoint, response)
+            self._release(endpoint)
+            return response
+
+    async def _stream(self, endpoint, parts):
+        try:
+            async for part in parts:
+                yield part
+        finally:
+            self._release(endpoint)
+
+def _dispatcher_settings(ollama_config):
+    return (ollama_config.get('retry_attempts', 0), ollama_config.get('backoff_base', 0.5),
+            ollama_config.get('backoff_max', 30.0))
+
+def _endpoints(configs, make_client):
+    return [_Endpoint(_client_settings(config)[0], make_client(config),
+                      max(1, int(config['max_concurrency'])))
+            for config in configs]
+
+_dispatchers = {}
+_dispatchers_lock = threading.Lock()
+
+def get_dispatcher(ollama_config):
+    """Return the process-wide :class:`Dispatcher` for ``ollama_config``.
+
+    Every thread of a process shares the dispatcher, so the load it sees
+    covers every document being summarized. Endpoint clients come from
+    :func:`client.get_client`.
+    """
+    configs = endpoint_configs(ollama_config)
+    key = (os.getpid(), json.dumps(configs, sort_keys=True, default=str))
+    with _dispatchers_lock:
+        dispatcher = _dispatchers.get(key)
+        if dispatcher is None:
+            dispatcher = _dispatchers[key] = Dispatcher(
+                _endpoints(configs, get_client), *_dispatcher_settings(ollama_config))
+        return dispatcher
+
+# Async dispatchers by event loop, then by settings; dropped with their loop
+_async_dispatchers = weakref.WeakKeyDictionary()
+
+def get_async_dispatcher(ollama_config):
+    """Return the :class:`AsyncDispatcher` for ``ollama_config`` on the running loop."""
+    loop = asyncio.get_running_loop()
+    configs = endpoint_configs(ollama_config)
+    key = json.dumps(configs, sort_keys=True, default=str)
+    dispatchers = _async_dispatchers.setdefault(loop, {})
+    dispatcher = dispatchers.get(key)
+    if dispatcher is None:
+        dispatcher = dispatchers[key] = AsyncDispatcher(
+            _endpoints(configs, lambda config: AsyncOllamaClient(*_client_settings(config))),
+            *_dispatcher_settings(ollama_config))
+    return dispatcher
@@ -0,0 +1,112 @@
+"""
+Tokenised text shared by the document-wide preprocessing steps.
+
+A :class:`Document` splits a text into sentences and lower-cased words
+once. Sentences are kept as offsets into the original text and words as
+integer ids in flat arrays, so statistics, topic chunking, scoring and the
+close-sentence filter all work from one tokenisation instead of each
+splitting the text again.
+"""
+
+import re
+from array import array
+from collections import Counter
+
+SENTENCE_SPLIT = re.compile(r'(?<=[.!?]) +')
+# Finds the same runs of spaces as SENTENCE_SPLIT, in group 1, but lets the
+# regex engine scan for the punctuation instead of trying every position
+_SENTENCE_END = re.compile(r'[.!?]( +)')
+
+class Document:
+    """A text split into sentences and words.
+
+    Sentence ``i`` is ``text[bounds[2 * i]:bounds[2 * i + 1]]``, exactly as
+    returned by ``SENTENCE_SPLIT.split(text)``, and its words are
+    ``word_ids[word_bounds[i]:word_bounds[i + 1]]``, the ids of
+    ``sentence.lower().split()``. The id of a word is the position of its
+    first occurrence among all the words of the document, so ids follow
+    the order of first appearance but are not consecutive.
+
+    Build one with :meth:`parse` or :meth:`from_sentences`.
+    """
+
+    __slots__ = ('text', 'bounds', 'word_ids', 'word_bounds', 'vocabulary')
+
+    def __init__(self, text, bounds):
+        self.text = text
+        self.bounds = bounds
+        self.vocabulary = {}
+        self.word_ids = array('i')
+        self.word_bounds = array('q', [0])
+        position = 0
+        for sentence in self._iter_sentences():
+            for word in sentence.lower().split():
+                self.word_ids.append(self.vocabulary.setdefault(word, position))
+                position += 1
+            self.word_bounds.append(position)
+
+    @classmethod
+    def parse(cls, text):
+        """Split ``text`` into sentences on ``SENTENCE_SPLIT`` and tokenise them."""
+        bounds = array('q', [0])
+        for match in _SENTENCE_END.finditer(text):
+            bounds.extend(match.span(1))
+        bounds.append(len(text))
+        return cls(text, bounds)
+
+    @classmethod
+    def from_sentences(cls, sentences):
+        """Tokenise already split sentences, stored joined by single spaces."""
+        bounds = array('q')
+        start = 0
+        for sentence in sentences:
+            bounds.append(start)
+            start += len(sentence)
+            bounds.append(start)
+            start += 1
+        return cls(' '.join(sentences), bounds)
+
+    def __len__(self):
+        return len(self.bounds) // 2
+
+    def sentence(self, i):
+        """Text of sentence ``i``."""
+        return self.text[self.bounds[2 * i]:self.bounds[2 * i + 1]]
+
+    def _iter_sentences(self):
+        bounds = self.bounds
+        return (self.text[start:end] for start, end in zip(bounds[::2], bounds[1::2]))
+
+    def sentences(self):
+        """Text of every sentence, in order."""
+        return list(self._iter_sentences())
+
+    def words(self, i):
+        """Word ids of sentence ``i``, in order."""
+        return self.word_ids[self.word_bounds[i]:self.word_bounds[i + 1]]
+
+    def iter_words(self):
+        """Word ids of every sentence, in order."""
+        bounds = self.word_bounds
+        return (self.word_ids[start:end] for start, end in zip(bounds, bounds[1:]))
+
+    def word_counts(self):
+        """Number of occurrences of each word id."""
+        return Counter(self.word_ids)
+
+    def word_id(self, word):
+        """Id of a lower-cased word, or ``None`` if the document doesn't contain it."""
+        return self.vocabulary.get(word)
+
+    def statistics(self):
+        """Sentence and word counts, as returned by ``get_text_statistics``."""
+        sentence_count = len(self)
+        word_count = len(self.word_ids)
+        unique_words = len(self.vocabulary)
+        return {
+            'sentence_count': sentence_count,
+            'word_count': word_count,
+            'avg_sentence_length': word_count / sentence_count if sentence_count else 0,
+            'unique_words': unique_words,
+            'lexical_density': unique_words / word_count if word_count else 0
+        }
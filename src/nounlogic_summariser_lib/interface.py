@@ -1,4 +1,8 @@
+import os
 import re
+import string
+from collections import deque
+from functools import lru_cache
 
 def sanitize_text(text):
     """Remove non-understandable characters from text.
@@ -12,36 +16,147 @@ def sanitize_text(text):
     sanitized = re.sub(r'[^A-Za-z0-9\s.,;:!?\'"-]', '', text)
     return sanitized
 
-def chunk_text(text, token_limit):
-    """Break text into chunks based on token limit.
+def approx_token_count(word):
+    """Estimate the number of tokens in a word.
+
+    Subword tokenizers keep common words of up to about six letters whole
+    and split longer ones into pieces of about four characters, while
+    punctuation attached to a word is a token of its own. This averages
+    about 1.3 tokens per word of course text, close to BPE tokenizers; a
+    flat four characters per token would overestimate it by half.
 
     Args:
-        text (str): Sanitized text.
-        token_limit (int): Maximum number of tokens per chunk.
+        word (str): A single word.
 
     Returns:
-        list: List of text chunks.
+        float: Estimated token count.
+    """
+    core = word.strip(string.punctuation)
+    tokens = 1 + max(0, len(core) - 6) / 4
+    return tokens + 1 if len(core) < len(word) else tokens
+
+def _one_token(word):
+    return 1
+
+def make_token_counter(spec='approx'):
+    """Build a per-word token counting function.
+
+    Args:
+        spec (str): ``"approx"`` for :func:`approx_token_count`, ``"words"``
+            to count one token per word, ``"tiktoken:<encoding>"`` to use a
+            tiktoken encoding, or ``"huggingface:<name or tokenizer.json>"``
+            to use a Hugging Face ``tokenizers`` tokenizer. The last two need
+            the corresponding optional package.
+
+    Returns:
+        Callable[[str], float]: Function returning the token count of a word.
+    """
+    kind, _, name = spec.partition(':')
+    if kind == 'approx':
+        return approx_token_count
+    if kind == 'words':
+        return _one_token
+    if kind == 'tiktoken':
+        try:
+            import tiktoken
+        except ImportError as e:
+            raise ImportError("The 'tiktoken' token counter requires the tiktoken package") from e
+        encoding = tiktoken.get_encoding(name or 'cl100k_base')
+
+        def count(word):
+            return len(encoding.encode_ordinary(' ' + word))
+    elif kind == 'huggingface':
+        try:
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise ImportError("The 'huggingface' token counter requires the tokenizers package") from e
+        if os.path.isfile(name):
+            tokenizer = Tokenizer.from_file(name)
+        else:
+            tokenizer = Tokenizer.from_pretrained(name)
+
+        def count(word):
+            return len(tokenizer.encode(word, add_special_tokens=False).ids)
+    else:
+        raise ValueError(f"Unknown token counter: {spec}")
+
+    # Course text repeats a small vocabulary, so most words are counted once
+    @lru_cache(maxsize=1 << 16)
+    def count_at_least_one(word):
+        return max(1, count(word))
+
+    return count_at_least_one
+
+def chunk_settings(config):
+    """Read the chunking settings from config.
+
+    Args:
+        config (dict): Configuration settings.
+
+    Returns:
+        dict: ``token_limit``, ``token_counter`` and ``overlap`` keyword
+        arguments for :func:`iter_chunks` and :func:`chunk_text`.
     """
-    words = text.split()
-    chunks = []
-    current_chunk = []
+    chunking = config.get('chunking', {})
+    return {
+        'token_limit': chunking.get('token_limit', config['token_limit']),
+        'token_counter': make_token_counter(chunking.get('token_counter', 'approx')),
+        'overlap': chunking.get('overlap', 0),
+    }
+
+def iter_chunks(words, token_limit, token_counter=approx_token_count, overlap=0):
+    """Group a stream of words into chunks based on token limit.
+
+    A new chunk is started before a word containing a question mark or
+    ending in a colon (a question or heading). When a chunk is closed
+    because it is full, the next one starts with its last words, up to
+    ``overlap`` tokens, for context. Empty chunks are never produced, and
+    each word is counted once, so the time is linear in the input.
+
+    Args:
+        words (Iterable[str]): Words of sanitized text, in order.
+        token_limit (int): Maximum number of tokens per chunk.
+        token_counter (Callable[[str], float]): Token count of a word.
+        overlap (int): Tokens carried over from a full chunk to the next.
+
+    Yields:
+        str: Text chunks.
+    """
+    overlap = min(overlap, token_limit - 1)
+    current_chunk = deque()  # (word, tokens) pairs
     current_tokens = 0
 
     for word in words:
         # Break earlier on question mark or heading
-        if '?' in word or word.strip().endswith(':'):
-            chunks.append(' '.join(current_chunk))
-            current_chunk = []
+        if current_chunk and ('?' in word or word.strip().endswith(':')):
+            yield ' '.join(w for w, _ in current_chunk)
+            current_chunk.clear()
             current_tokens = 0
-        current_tokens += len(word.split())
-        if current_tokens > token_limit:
-            chunks.append(' '.join(current_chunk))
-            current_chunk = [word]
-            current_tokens = len(word.split())
-        else:
-            current_chunk.append(word)
+
+        tokens = token_counter(word)
+        if current_chunk and current_tokens + tokens > token_limit:
+            yield ' '.join(w for w, _ in current_chunk)
+            # Keep the tail of the full chunk as overlap, leaving room for this word
+            keep = min(overlap, token_limit - tokens)
+            while current_chunk and current_tokens > keep:
+                current_tokens -= current_chunk.popleft()[1]
+
+        current_chunk.append((word, tokens))
+        current_tokens += tokens
 
     if current_chunk:
-        chunks.append(' '.join(current_chunk))
+        yield ' '.join(w for w, _ in current_chunk)
+
+def chunk_text(text, token_limit, token_counter=approx_token_count, overlap=0):
+    """Break text into chunks based on token limit.
+
+    Args:
+        text (str): Sanitized text.
+        token_limit (int): Maximum number of tokens per chunk.
+        token_counter (Callable[[str], float]): Token count of a word.
+        overlap (int): Tokens carried over from a full chunk to the next.
 
-    return chunks
+    Returns:
+        list: List of text chunks.
+    """
+    return list(iter_chunks(text.split(), token_limit, token_counter, overlap))
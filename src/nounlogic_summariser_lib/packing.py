@@ -0,0 +1,164 @@
+"""
+Packing of several short chunks into one model request.
+
+Questions and headings start new chunks, so course material yields many
+chunks of a few words, and each one pays the full request and prompt
+overhead. With ``packing.enabled`` set, consecutive chunks are grouped by
+:func:`pack_chunks` up to the chunking token budget, sent as one prompt with
+numbered sections built by :func:`build_packed_prompt`, and the reply is
+split back into one summary per chunk by :func:`parse_packed_reply`. When
+the reply can't be split, the chunks of the pack are sent one by one.
+:class:`PackRequest` keeps this bookkeeping apart from how requests are
+sent, so the threaded and asyncio summarizers share it.
+"""
+
+import logging
+import re
+
+from .interface import approx_token_count, make_token_counter
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_INSTRUCTIONS = (
+    "Each section below starts with a marker line such as '=== 1 ===' and is a "
+    "separate text. Handle every section on its own. Reply with the same marker "
+    "lines, in the same order, each followed by the result for that section, and "
+    "nothing else.")
+
+# A marker line, allowing for the Markdown emphasis or headings models add
+_MARKER = re.compile(r'^[ \t#*]*=+[ \t]*(\d+)[ \t]*=+[ \t*]*$', re.MULTILINE)
+
+def packing_settings(config):
+    """Read the packing settings from config.
+
+    Args:
+        config (dict): Configuration settings.
+
+    Returns:
+        dict: ``token_limit``, ``max_chunks`` and ``token_counter`` keyword
+        arguments for :func:`pack_chunks`, or ``None`` when packing is
+        disabled. The token limit and counter default to the chunking ones.
+    """
+    packing = config.get('packing', {})
+    if not packing.get('enabled', False):
+        return None
+    chunking = config.get('chunking', {})
+    return {
+        'token_limit': (packing.get('token_limit')
+                        or chunking.get('token_limit', config['token_limit'])),
+        'max_chunks': max(1, int(packing.get('max_chunks', 8))),
+        'token_counter': make_token_counter(chunking.get('token_counter', 'approx')),
+    }
+
+def pack_chunks(items, token_limit, max_chunks=8, token_counter=approx_token_count):
+    """Group consecutive chunks into packs that fit one request.
+
+    A pack holds at most ``max_chunks`` chunks and, unless it is a single
+    chunk, at most ``token_limit`` tokens. Packs keep the chunk order.
+
+    Args:
+        items (Iterable[Tuple[int, str]]): Chunk indices and texts, possibly lazy.
+        token_limit (int): Maximum tokens per pack.
+        max_chunks (int): Maximum chunks per pack.
+        token_counter (Callable[[str], float]): Token count of a word.
+
+    Yields:
+        List[Tuple[int, str]]: Consecutive items.
+    """
+    pack = []
+    pack_tokens = 0
+    for index, chunk in items:
+        tokens = sum(map(token_counter, chunk.split()))
+        if pack and (len(pack) >= max_chunks or pack_tokens + tokens > token_limit):
+            yield pack
+            pack = []
+            pack_tokens = 0
+        pack.append((index, chunk))
+        pack_tokens += tokens
+    if pack:
+        yield pack
+
+def build_packed_prompt(prompt, chunks, instructions=DEFAULT_INSTRUCTIONS):
+    """Build the prompt of a packed request.
+
+    Args:
+        prompt (str): The ``prompt_template`` applied to every chunk.
+        chunks (List[str]): Chunks of the pack.
+        instructions (str): How the model should lay out its reply.
+
+    Returns:
+        str: The prompt, with chunk ``i`` under the marker ``=== i + 1 ===``.
+    """
+    sections = ''.join(f"\n\n=== {n} ===\n{chunk}"
+                       for n, chunk in enumerate(chunks, 1))
+    return f"{prompt}\n\n{instructions}{sections}"
+
+def parse_packed_reply(reply, count):
+    """Split the reply to a packed request into per-chunk summaries.
+
+    Args:
+        reply (str): The model's reply.
+        count (int): Number of chunks in the pack.
+
+    Returns:
+        List[str]: One summary per chunk, or ``None`` unless the reply has
+        exactly the markers ``1`` to ``count`` in order, each followed by a
+        non-blank summary. Text before the first marker is ignored.
+    """
+    parts = _MARKER.split(reply)
+    # [text before the first marker, number, summary, number, summary, ...]
+    if len(parts) != 2 * count + 1:
+        return None
+    if [int(number) for number in parts[1::2]] != list(range(1, count + 1)):
+        return None
+    summaries = [summary.strip() for summary in parts[2::2]]
+    if not all(summaries):
+        return None
+    return summaries
+
+class PackRequest:
+    """Bookkeeping of one pack of chunks, independent of how it is sent.
+
+    ``summaries`` starts with the summaries already known, such as cache
+    hits, and ``None`` for the chunks still to summarize, whose positions
+    are in ``todo``. When :attr:`packed` is true, send :meth:`prompt` to the
+    model and pass the reply to :meth:`accept`; the chunks left in ``todo``
+    afterwards are sent one by one.
+
+    Args:
+        chunks (List[str]): Chunks of the pack.
+        summaries (List[str], optional): Known summaries, ``None`` where
+            unknown; by default none are known.
+    """
+
+    def __init__(self, chunks, summaries=None):
+        self.chunks = chunks
+        self.summaries = list(summaries) if summaries is not None else [None] * len(chunks)
+        self.todo = [i for i, summary in enumerate(self.summaries) if summary is None]
+
+    @property
+    def packed(self):
+        """Whether the missing chunks go to the model in one request."""
+        return len(self.todo) > 1
+
+    def prompt(self, prompt, instructions=DEFAULT_INSTRUCTIONS):
+        """Prompt of the packed request; see :func:`build_packed_prompt`."""
+        return build_packed_prompt(prompt, [self.chunks[i] for i in self.todo],
+                                   instructions)
+
+    def accept(self, reply):
+        """Fill in the summaries from the reply to the packed request.
+
+        Returns:
+            List[int]: Positions of the summaries filled in; empty, with
+            ``todo`` unchanged, when the reply can't be split.
+        """
+        parsed = parse_packed_reply(reply, len(self.todo))
+        if parsed is None:
+            _logger.warning(f"Could not split the reply to {len(self.todo)} packed "
+                            f"chunks; sending them one by one")
+            return []
+        filled, self.todo = self.todo, []
+        for i, summary in zip(filled, parsed):
+            self.summaries[i] = summary
+        return filled
@@ -0,0 +1,224 @@
+import logging
+import os
+
+from .autotune import apply_profile
+from .convert import iter_pdf_markdown
+from .interface import chunk_settings, iter_chunks, sanitize_text
+from .dedup import make_deduplicator
+from .reader import iter_text_blocks
+from .document import SENTENCE_SPLIT
+from .preprocessing import (
+    SECTION_SPLIT,
+    drop_near_duplicates,
+    merge_section_results,
+    preprocess_section,
+    select_text,
+)
+from .summariser import (
+    _output_paths,
+    write_chunk_summaries,
+    write_reduced_summary,
+    write_summary_file,
+)
+
+_logger = logging.getLogger(__name__)
+
+def iter_source_blocks(file_path, config, block_size):
+    """Yield the text of a file in blocks of about ``block_size`` characters.
+
+    PDFs are converted page by page when ``conversion.pdf_to_md`` is set;
+    other files are memory-mapped and decoded block by block.
+    """
+    _, ext = os.path.splitext(file_path)
+    if ext.lower() == '.pdf' and config['conversion']['pdf_to_md']:
+        workers = config['conversion'].get('pdf_workers', 1)
+        for i, page in enumerate(iter_pdf_markdown(file_path, workers)):
+            yield page if i == 0 else '\n' + page
+        return
+
+    yield from iter_text_blocks(file_path, block_size)
+
+def iter_sanitized(blocks):
+    """Sanitize each block; sanitisation works character by character."""
+    for block in blocks:
+        yield sanitize_text(block)
+
+def iter_sections(blocks, max_chars):
+    """Split a stream of text blocks into blank-line separated sections.
+
+    Gives the same sections as ``re.split(r'\\n\\s*\\n', text)`` on the
+    joined blocks, except that a section longer than ``max_chars`` is cut
+    at the last whitespace before the limit so the buffer stays bounded.
+
+    Args:
+        blocks (Iterable[str]): Consecutive pieces of the text.
+        max_chars (int): Longest section to buffer before cutting it.
+
+    Yields:
+        str: Sections of the text.
+    """
+    buffer = ''
+    for block in blocks:
+        buffer += block
+        # Only text up to the last non-whitespace character is final: a
+        # separator touching the end of the buffer could still grow.
+        stable_end = len(buffer.rstrip())
+        pieces = SECTION_SPLIT.split(buffer[:stable_end])
+        yield from pieces[:-1]
+        buffer = pieces[-1] + buffer[stable_end:]
+        while len(buffer) > max_chars:
+            cut = buffer.rfind(' ', 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            yield buffer[:cut]
+            buffer = buffer[cut:]
+    yield from SECTION_SPLIT.split(buffer)
+
+class _WindowStatistics:
+    """Statistics of sections joined by blank lines, gathered one section at a time.
+
+    :meth:`result` gives what ``get_text_statistics`` returns for the
+    joined text, without the text or its word list ever existing at once.
+    """
+
+    def __init__(self):
+        self.sections = 0
+        self.sentence_count = 0
+        self.word_count = 0
+        self.vocabulary = set()
+
+    def add(self, section):
+        # The blank lines between sections never end a sentence, so the
+        # last sentence of a section and the first of the next one merge
+        self.sentence_count += len(SENTENCE_SPLIT.split(section)) - (self.sections > 0)
+        self.sections += 1
+        words = section.lower().split()
+        self.word_count += len(words)
+        self.vocabulary.update(words)
+
+    def result(self):
+        sentence_count = self.sentence_count
+        word_count = self.word_count
+        unique_words = len(self.vocabulary)
+        return {
+            'sentence_count': sentence_count,
+            'word_count': word_count,
+            'avg_sentence_length': word_count / sentence_count if sentence_count else 0,
+            'unique_words': unique_words,
+            'lexical_density': unique_words / word_count if word_count else 0
+        }
+
+class StreamingPreprocessor:
+    """Run preprocessing over a stream of sections, one window at a time.
+
+    A window closes once its processed text reaches ``window_words`` words
+    or its source sections reach ``window_chars`` characters, so input that
+    preprocessing mostly drops still goes through in bounded windows.
+    Questions are written to the questions file as they are found, and the
+    summary content is collected for the metadata written at the end.
+    """
+
+    def __init__(self, config, filename, input_dir, window_words, window_chars=1 << 18):
+        self.config = config
+        self.window_words = window_words
+        self.window_chars = window_chars
+        self.questions_path = os.path.join(
+            input_dir, f"{os.path.splitext(filename)[0]}-questions.txt")
+        self.filename = filename
+        self.summary_content = []
+        # One filter for the whole document, so repeats across windows go too
+        self.deduplicator = make_deduplicator(config)
+        self._toc_content = []
+        self._questions_written = False
+
+    def windows(self, sections):
+        """Yield the selected text of each window of sections."""
+        with open(self.questions_path, 'w', encoding='utf-8') as qf:
+            stats = _WindowStatistics()
+            results = []
+            words = 0
+            chars = 0
+            for section in sections:
+                stats.add(section)
+                chars += len(section)
+                result = preprocess_section(section, self.config)
+                results.append(result)
+                words += len(result[0].split())
+                if words >= self.window_words or chars >= self.window_chars:
+                    yield self._select(stats, results, qf)
+                    stats, results, words, chars = _WindowStatistics(), [], 0, 0
+            if results:
+                yield self._select(stats, results, qf)
+
+    def _select(self, stats, results, qf):
+        processed_text, summary_content, questions = merge_section_results(results)
+        # TOC regions come first in summary_content, most recent window first
+        toc_count = sum(len(result[2]) for result in results)
+        self._toc_content[:0] = summary_content[:toc_count]
+        self.summary_content.extend(summary_content[toc_count:])
+        for question in questions:
+            qf.write(('\n' if self._questions_written else '') + question)
+            self._questions_written = True
+        qf.flush()
+
+        # Threshold adjustments must not compound from one window to the next
+        window_config = {**self.config, 'preprocessing': dict(self.config['preprocessing'])}
+        text = select_text(processed_text, stats.result(), window_config, self.filename)
+        if self.deduplicator is not None:
+            text = drop_near_duplicates(text, self.deduplicator)
+        return text
+
+    def initial_summaries(self):
+        """Summary content for the whole document, once it is consumed."""
+        return self._toc_content + self.summary_content
+
+def process_file_streaming(file_path, config, executor=None, resume=False, on_token=None):
+    """Process and summarize a file as a chain of streaming stages.
+
+    Reading, sanitisation, section splitting, filtering, selection, chunking
+    and summarisation are chained generators, so the first chunk reaches the
+    model while the rest of the document is still being read, and memory
+    stays proportional to a window of text rather than to the document.
+
+    The document-wide steps of :func:`preprocess_text` (keeping 60% of the
+    words, topic chunking and sentence ranking) are applied per window of
+    sections, so a document spanning several windows can select slightly
+    different text than the non-streaming path.
+
+    Args:
+        file_path (str): Path to the input file.
+        config (dict): Configuration settings. The ``streaming`` section sets
+            ``block_size`` (characters read at a time), ``window_words``
+            (processed words per selection window), ``window_chars`` (source
+            characters per selection window) and ``max_section_chars``.
+        executor (Executor, optional): Shared worker pool for chunk requests.
+        resume (bool): Reuse summaries from an existing checkpoint journal.
+        on_token (Callable[[int, str], None], optional): Called with each
+            piece of the chunk summaries as it is written.
+
+    Returns:
+        str: Path to the final summary file.
+    """
+    config = apply_profile(config)
+    streaming = config.get('streaming', {})
+    block_size = streaming.get('block_size', 1 << 16)
+    window_words = streaming.get('window_words', 5000)
+    window_chars = streaming.get('window_chars', 1 << 18)
+    max_section_chars = streaming.get('max_section_chars', 1 << 20)
+    paths = _output_paths(file_path)
+
+    preprocessor = StreamingPreprocessor(config, paths['base_name'], paths['input_dir'],
+                                         window_words, window_chars)
+    sections = iter_sections(iter_sanitized(iter_source_blocks(file_path, config, block_size)),
+                             max_section_chars)
+    words = (word for text in preprocessor.windows(sections) for word in text.split())
+    chunks = iter_chunks(words, **chunk_settings(config))
+
+    chunk_summaries = write_chunk_summaries(file_path, chunks, config, executor=executor,
+                                            resume=resume, on_token=on_token)
+
+    initial_summaries = preprocessor.initial_summaries()
+    with open(paths['metadata'], 'w', encoding='utf-8') as f:
+        f.write('\n'.join(initial_summaries))
+    write_summary_file(file_path, initial_summaries)
+    write_reduced_summary(file_path, chunk_summaries, config, executor)
+    return paths['final_summary']
@@ -1,122 +1,272 @@
+import logging
 import re
-from typing import Tuple, List, Dict, Set
+from typing import Tuple, List, Dict, Set, Union
 import os
 import string
-from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 import math
 
-def calculate_sentence_importance(sentence: str, total_sentences: List[str]) -> float:
-    """Calculate sentence importance based on multiple factors."""
-    # Term frequency scoring
-    words = sentence.lower().split()
-    all_words = [w for s in total_sentences for w in s.lower().split()]
-    word_freq = Counter(all_words)
-    
+from . import vectorized
+from .dedup import make_deduplicator
+from .document import SENTENCE_SPLIT, Document
+from .profiling import get_profiler
+
+_logger = logging.getLogger(__name__)
+
+SECTION_SPLIT = re.compile(r'\n\s*\n')
+
+# Synonyms that earn the same bonus as a direct key phrase
+SYNONYMS_MAP = {
+    'important': ['vital', 'pivotal', 'paramount'],
+    'significant': ['noteworthy', 'meaningful'],
+    'main': ['primary', 'principal'],
+    # ...existing synonyms...
+}
+
+# Backends computing sentence scores and similarities; see _use_vectorized
+BACKENDS = ('auto', 'python', 'numpy')
+# Least text, in characters, for which preprocess_sections starts a process
+# pool; shorter documents are preprocessed faster than the workers start
+PARALLEL_MIN_CHARS = 1 << 18
+# Fewest sentences for which 'auto' picks NumPy; below it the matrix setup
+# costs more than the interpreted loop
+VECTORIZE_MIN_SENTENCES = 200
+
+def _use_vectorized(backend: str, count: int) -> bool:
+    """Whether to score ``count`` sentences with the NumPy backend.
+
+    ``'python'`` always uses the interpreted loop and ``'numpy'`` always
+    uses :mod:`vectorized`, raising ImportError if NumPy or SciPy is
+    missing. ``'auto'`` uses NumPy when it is installed and there are at
+    least :data:`VECTORIZE_MIN_SENTENCES` sentences. Both give the same
+    results.
+    """
+    if backend == 'python':
+        return False
+    if backend == 'numpy':
+        if not vectorized.available():
+            raise ImportError("The numpy preprocessing backend needs numpy and scipy installed")
+        return True
+    if backend == 'auto':
+        return count >= VECTORIZE_MIN_SENTENCES and vectorized.available()
+    raise ValueError(f"Unknown preprocessing backend {backend!r}; expected one of {', '.join(BACKENDS)}")
+
+def _synonym_words() -> List[str]:
+    """Every synonym in ``SYNONYMS_MAP``, in order."""
+    return [word for synonyms in SYNONYMS_MAP.values() for word in synonyms]
+
+def _importance_score(words, log_freq, position: int, total: int, synonyms) -> float:
+    """Score one tokenised sentence against precomputed corpus statistics.
+
+    ``words`` are the words of the sentence, either as strings or as
+    :class:`Document` word ids, and ``log_freq`` and ``synonyms`` use the
+    same keys.
+    """
     # Calculate TF-IDF like score
-    score = sum(math.log(1 + word_freq[word]) for word in words)
-    
-    # Bonus for key phrases
-    key_phrases = ['important', 'significant', 'key', 'main', 'crucial', 'essential']
-    synonyms_map = {
-        'important': ['vital', 'pivotal', 'paramount'],
-        'significant': ['noteworthy', 'meaningful'],
-        'main': ['primary', 'principal'],
-        # ...existing synonyms...
-    }
+    score = sum(map(log_freq.__getitem__, words))
+
     # Check for synonyms
-    for phrase, synonyms in synonyms_map.items():
-        for word in synonyms:
-            if word in words:
-                score += 2  # Same bonus as direct key phrase
-    
+    for word in synonyms:
+        if word in words:
+            score += 2  # Same bonus as direct key phrase
+
     # Length normalization
     score = score / (len(words) + 1)  # Avoid division by zero
-    
+
     # Position bonus (sentences at start/end of sections often more important)
-    if len(total_sentences) > 0:
-        position = total_sentences.index(sentence)
-        if position < len(total_sentences) * 0.2 or position > len(total_sentences) * 0.8:
+    if total > 0:
+        if position < total * 0.2 or position > total * 0.8:
             score *= 1.2
-    
+
     return score
 
-def get_text_statistics(text: str) -> Dict:
-    """Get statistical information about the text."""
-    sentences = re.split(r'(?<=[.!?]) +', text)
+def score_sentences(sentences: Union[List[str], Document], backend: str = 'python') -> List[float]:
+    """Score every sentence of a document in a single pass.
+
+    Gives the same scores as calling :func:`calculate_sentence_importance`
+    for each sentence, but the corpus word frequencies and the sentence
+    positions are built once per document instead of once per sentence.
+
+    Args:
+        sentences (Union[List[str], Document]): All sentences of the
+            document, in order, or the tokenised document.
+        backend (str): ``'python'``, ``'numpy'`` or ``'auto'``; see
+            :func:`_use_vectorized`.
+
+    Returns:
+        List[float]: Importance score of each sentence.
+    """
+    document = sentences if isinstance(sentences, Document) else Document.from_sentences(sentences)
+    if _use_vectorized(backend, len(document)):
+        return vectorized.score_sentences(document, SYNONYMS_MAP)
+    log_freq = {word_id: math.log(1 + count) for word_id, count in document.word_counts().items()}
+    synonyms = [document.word_id(word) for word in _synonym_words()]
+    synonyms = [word_id for word_id in synonyms if word_id is not None]
+
+    # Repeated sentences take the position of their first occurrence
+    sentences = document.sentences()
+    first_position = {}
+    for i, sentence in enumerate(sentences):
+        first_position.setdefault(sentence, i)
+
+    total = len(sentences)
+    return [
+        _importance_score(words, log_freq, first_position[sentence], total, synonyms)
+        for sentence, words in zip(sentences, document.iter_words())
+    ]
+
+def calculate_sentence_importance(sentence: str, total_sentences: Union[List[str], Document]) -> float:
+    """Calculate sentence importance based on multiple factors.
+
+    Scoring a whole document this way is quadratic; use
+    :func:`score_sentences` when every sentence needs a score.
+    """
+    document = (total_sentences if isinstance(total_sentences, Document)
+                else Document.from_sentences(total_sentences))
+    words = sentence.lower().split()
+    word_freq = document.word_counts()
+    log_freq = {word: math.log(1 + word_freq[document.word_id(word)]) for word in words}
+    position = document.sentences().index(sentence) if len(document) else 0
+    return _importance_score(words, log_freq, position, len(document), _synonym_words())
+
+def get_text_statistics(text: Union[str, Document]) -> Dict:
+    """Get statistical information about the text, or about a tokenised document."""
+    if isinstance(text, Document):
+        return text.statistics()
+    sentences = SENTENCE_SPLIT.split(text)
     words = text.lower().split()
-    
+    unique_words = len(set(words))
+
     return {
         'sentence_count': len(sentences),
         'word_count': len(words),
         'avg_sentence_length': len(words) / len(sentences) if sentences else 0,
-        'unique_words': len(set(words)),
-        'lexical_density': len(set(words)) / len(words) if words else 0
+        'unique_words': unique_words,
+        'lexical_density': unique_words / len(words) if words else 0
     }
 
-def smart_chunk_detection(text: str) -> List[str]:
-    """Intelligently detect text chunks based on content similarity."""
-    sentences = re.split(r'(?<=[.!?]) +', text)
-    chunks = []
-    current_chunk = []
+def _topic_spans(document: Document) -> List[Tuple[int, int]]:
+    """Start and end sentence of each chunk found by :func:`smart_chunk_detection`."""
+    spans = []
+    chunk_start = 0
     current_topic_words = set()
-    
-    for sentence in sentences:
-        words = set(sentence.lower().split())
-        
+
+    for i, words in enumerate(map(set, document.iter_words())):
+
         # If there's significant topic shift, start new chunk
         if len(current_topic_words) > 0 and len(words & current_topic_words) / len(words) < 0.3:
-            chunks.append(' '.join(current_chunk))
-            current_chunk = []
+            spans.append((chunk_start, i))
+            chunk_start = i
             current_topic_words = words
         else:
             current_topic_words |= words
-        
-        current_chunk.append(sentence)
-    
-    if current_chunk:
-        chunks.append(' '.join(current_chunk))
-    
-    return chunks
 
-def preprocess_text(text: str, config: Dict, filename: str, input_dir: str) -> Tuple[str, List[str]]:
-    """
-    Preprocess the text to filter out non-summarisable content and handle specific sections.
+    if len(document):
+        spans.append((chunk_start, len(document)))
+    return spans
+
+def smart_chunk_detection(text: Union[str, Document]) -> List[str]:
+    """Intelligently detect text chunks based on content similarity.
 
     Args:
-        text (str): Sanitized original text.
-        config (Dict): Configuration settings.
-        filename (str): Name of the file being processed.
-        input_dir (str): Directory of the input file.
+        text (Union[str, Document]): The text, or the tokenised text.
 
     Returns:
-        Tuple[str, List[str]]: Tuple containing the processed text and appended summary content.
+        List[str]: Consecutive chunks of whole sentences.
     """
-    processed_text = []
-    summary_content = []
-    questions_content = []
-    output_suffix = config['output']['suffix']
+    document = text if isinstance(text, Document) else Document.parse(text)
+    sentences = document.sentences()
+    return [' '.join(sentences[start:end]) for start, end in _topic_spans(document)]
 
-    # 1. Break text into sections based on common academic headings
-    sections = re.split(r'\n\s*\n', text)
-    
-    for section in sections:
+class PreprocessRules:
+    """
+    Compiled form of the section rules of :func:`preprocess_text`.
+
+    Every pattern that depends on the ``preprocessing`` config is compiled
+    once here instead of being rebuilt for every section. Use
+    :func:`get_rules` to share one instance per configuration.
+
+    Removals in steps 3, 4, 10 and 11 keep their replace-all behaviour
+    (repeated occurrences elsewhere in the section go too, and later matches
+    are looked up in the already shortened text), so the output is identical
+    to applying the rules one by one.
+    """
+
+    def __init__(self, tutor_marked_proximity: int, tutor_marked_max_words: int,
+                 summary_max_words: int, number_proximity: int,
+                 common_words_threshold: int, capital_proximity: int, toc_max_words: int,
+                 backend: str = 'python'):
+        self.tutor_marked_max_words = tutor_marked_max_words
+        self.summary_max_words = summary_max_words
+        self.common_words_threshold = common_words_threshold
+        self.backend = backend
+        self.toc_max_words = toc_max_words
+
+        self.tutor_marked = re.compile(r'\bTUTOR\b.*?\bMARKED\b(?:.*?\bASSIGNMENT\b)?', re.IGNORECASE)
+        self.assessment = re.compile(
+            rf'(\bTUTOR\b\W+(?:\w+\W+){{0,{tutor_marked_proximity}}}\bMARKED\b(?:\W+\bASSIGNMENT\b)?)',
+            re.IGNORECASE)
+        self.conclusion_summary = re.compile(r'\b(conclusion|summary)\b(?!\w)', re.IGNORECASE)
+        # Matching is case-insensitive, so one pattern per term covers every spelling
+        self.term = {
+            term: re.compile(rf'\b{term}\b\s*[^A-Za-z]', re.IGNORECASE)
+            for term in ('conclusion', 'summary')
+        }
+        self.term_section = {
+            term: re.compile(rf'\b{term}\b\s*:?\s*(.*?)(?=\n|$)', re.IGNORECASE | re.DOTALL)
+            for term in ('conclusion', 'summary')
+        }
+        self.numbers = re.compile(r'\b\d+\b(?:\W+\b\d+\b){0,' + str(number_proximity) + '}')
+        self.capitals = re.compile(rf'[A-Z]{{2,}}(?:\s+[A-Z]{{2,}}){{0,{capital_proximity}}}')
+        self.toc = re.compile(r'(\.{5,})')
+        self.course_objectives = re.compile(r'\bcourse objectives\b\s*(.*?)\s*(?=\n|$)',
+                                            re.IGNORECASE | re.DOTALL)
+
+        # Steps in order as (name, step) pairs. Each step takes the section
+        # text and the summary, table of contents and question lists, appends
+        # to the lists and returns the new text.
+        self.steps = (
+            ('2_short_sentences', self._short_sentences),
+            ('3_tutor_marked', self._tutor_marked),
+            ('4_conclusion_summary', self._conclusion_summary),
+            ('5_whitespace', self._whitespace),
+            ('6_numbers', self._numbers),
+            ('7_close_sentences', self._close_sentences),
+            ('9_capitals', self._capitals),
+            ('10_table_of_contents', self._table_of_contents),
+            ('11_course_objectives', self._course_objectives),
+        )
+
+    def apply(self, section: str) -> Tuple[str, List[str], List[str], List[str]]:
+        """Apply steps 2 to 11 to one section; see :func:`preprocess_section`."""
+        summary_items = []
+        toc_items = []
+        questions = []
+        filtered_section = section
+        profiler = get_profiler()
+        if profiler.enabled:
+            for name, step in self.steps:
+                with profiler.stage(f"preprocess.{name}", len(filtered_section)) as stage:
+                    filtered_section = step(filtered_section, summary_items, toc_items, questions)
+                    stage.output(len(filtered_section))
+        else:
+            for _, step in self.steps:
+                filtered_section = step(filtered_section, summary_items, toc_items, questions)
+        return filtered_section, summary_items, toc_items, questions
+
+    def _short_sentences(self, filtered_section, summary_items, toc_items, questions):
         # 2. Filter out sentences with 5 words or less
-        sentences = re.split(r'(?<=[.!?]) +', section)
+        sentences = SENTENCE_SPLIT.split(filtered_section)
         filtered_sentences = [s for s in sentences if len(s.split()) > 5]
-        
+
         # Reconstruct the section
-        filtered_section = ' '.join(filtered_sentences)
-        
+        return ' '.join(filtered_sentences)
+
+    def _tutor_marked(self, filtered_section, summary_items, toc_items, questions):
         # 3. Filter out tutor marked assessments and append to questions file
-        tutor_marks = re.finditer(r'\bTUTOR\b.*?\bMARKED\b(?:.*?\bASSIGNMENT\b)?', filtered_section, re.IGNORECASE)
-        for match in tutor_marks:
-            proximity = config['preprocessing']['tutor_marked_proximity']
-            max_words = config['preprocessing']['tutor_marked_max_words']
-            
-            pattern = rf'(\bTUTOR\b\W+(?:\w+\W+){{0,{proximity}}}\bMARKED\b(?:\W+\bASSIGNMENT\b)?)'
-            assessments = re.findall(pattern, filtered_section, re.IGNORECASE)
-            
-            for assessment in assessments:
+        for _ in self.tutor_marked.finditer(filtered_section):
+            for assessment in self.assessment.findall(filtered_section):
                 # Find text between assessment and last question mark before it
                 start = filtered_section.find(assessment)
                 preceding_text = filtered_section[:start]
@@ -125,19 +275,18 @@ def preprocess_text(text: str, config: Dict, filename: str, input_dir: str) -> T
                     relevant_text = preceding_text[last_qm+1:start]
                 else:
                     relevant_text = preceding_text[:start]
-                
-                words = relevant_text.split()
-                if len(words) <= max_words:
-                    questions_content.append(relevant_text)
+
+                if len(relevant_text.split()) <= self.tutor_marked_max_words:
+                    questions.append(relevant_text)
                     # Remove the relevant text from the section
                     filtered_section = filtered_section.replace(relevant_text, '')
-        
+        return filtered_section
+
+    def _conclusion_summary(self, filtered_section, summary_items, toc_items, questions):
         # 4. Extract 'conclusion' and 'summary' sections
-        conclusion_summary = re.findall(r'\b(conclusion|summary)\b(?!\w)', filtered_section, re.IGNORECASE)
-        for term in conclusion_summary:
-            pattern = rf'\b{term}\b\s*[^A-Za-z]'
-            matches = re.finditer(pattern, filtered_section, re.IGNORECASE)
-            for match in matches:
+        for term in self.conclusion_summary.findall(filtered_section):
+            term = term.lower()
+            for match in self.term[term].finditer(filtered_section):
                 # Ensure 'conclusion' or 'summary' is not part of another word
                 term_start = match.start()
                 term_end = match.end()
@@ -145,132 +294,335 @@ def preprocess_text(text: str, config: Dict, filename: str, input_dir: str) -> T
                 following_char = filtered_section[term_end] if term_end < len(filtered_section) else ' '
                 if not preceding_char.isalpha() and not following_char.isalpha():
                     # Extract the section
-                    section_pattern = rf'\b{term}\b\s*:?\s*(.*?)(?=\n|$)'
-                    section_match = re.search(section_pattern, filtered_section, re.IGNORECASE | re.DOTALL)
+                    section_match = self.term_section[term].search(filtered_section)
                     if section_match:
                         section_text = section_match.group(1).strip()
-                        if len(section_text.split()) <= config['preprocessing']['summary_max_words']:
-                            summary_content.append(section_text)
+                        if len(section_text.split()) <= self.summary_max_words:
+                            summary_items.append(section_text)
                             # Remove from main text
                             filtered_section = filtered_section.replace(section_match.group(0), '')
-        
+        return filtered_section
+
+    def _whitespace(self, filtered_section, summary_items, toc_items, questions):
         # 5. Discard unnecessary spaces and empty lines
-        filtered_section = re.sub(r'\s+', ' ', filtered_section).strip()
-        
+        return ' '.join(filtered_section.split())
+
+    def _numbers(self, filtered_section, summary_items, toc_items, questions):
         # 6. Discard numbers in close proximity
-        num_proximity = config['preprocessing']['number_proximity']
-        filtered_section = re.sub(r'\b\d+\b(?:\W+\b\d+\b){0,' + str(num_proximity) + '}', '', filtered_section)
-        
+        return self.numbers.sub('', filtered_section)
+
+    def _close_sentences(self, filtered_section, summary_items, toc_items, questions):
         # 7. Discard sentences in close proximity
-        common_words_threshold = config['preprocessing']['common_words_threshold']
-        filtered_section = discard_close_sentences(filtered_section, common_words_threshold)
-        
-        # 8. Prioritize chunks of text closer to each other
-        # Assuming headers are already removed by section splitting
-        
-        # 9. Append capitalized word groups to summary
-        capital_pattern = rf'([A-Z]{{2,}}(?:\s+[A-Z]{{2,}}){{0,{config["preprocessing"]["capital_proximity"]}}})'
-        capital_matches = re.findall(capital_pattern, filtered_section)
-        summary_content.extend(capital_matches)
-        # Remove from main text
-        filtered_section = re.sub(capital_pattern, '', filtered_section)
-        
+        # (8. Prioritize chunks of text closer to each other: headers are
+        # already removed by section splitting)
+        return discard_close_sentences(filtered_section, self.common_words_threshold, self.backend)
+
+    def _capitals(self, filtered_section, summary_items, toc_items, questions):
+        # 9. Append capitalized word groups to summary and remove them from
+        # the main text, collecting the spans in one pass
+        kept = []
+        position = 0
+        for match in self.capitals.finditer(filtered_section):
+            summary_items.append(match.group())
+            kept.append(filtered_section[position:match.start()])
+            position = match.end()
+        if kept:
+            kept.append(filtered_section[position:])
+            filtered_section = ''.join(kept)
+        return filtered_section
+
+    def _table_of_contents(self, filtered_section, summary_items, toc_items, questions):
         # 10. Scan for table of contents regions
-        toc_pattern = r'(\.{5,})'
-        toc_matches = re.finditer(toc_pattern, filtered_section)
-        for match in toc_matches:
-            toc_start = match.start()
-            toc_end = toc_start
-            while toc_end < len(filtered_section) and filtered_section[toc_end] == '.':
-                toc_end += 1
-            toc_region = filtered_section[toc_start:toc_end]
-            if len(toc_region.split()) <= config['preprocessing']['toc_max_words']:
-                summary_content.insert(0, toc_region)
-                # Remove from main text
-                filtered_section = filtered_section.replace(toc_region, '')
-        
+        if '.....' in filtered_section:
+            for match in self.toc.finditer(filtered_section):
+                toc_start = match.start()
+                toc_end = toc_start
+                while toc_end < len(filtered_section) and filtered_section[toc_end] == '.':
+                    toc_end += 1
+                toc_region = filtered_section[toc_start:toc_end]
+                if len(toc_region.split()) <= self.toc_max_words:
+                    toc_items.append(toc_region)
+                    # Remove from main text
+                    filtered_section = filtered_section.replace(toc_region, '')
+        return filtered_section
+
+    def _course_objectives(self, filtered_section, summary_items, toc_items, questions):
         # 11. Prioritize texts after 'course objectives'
-        course_obj_pattern = r'\bcourse objectives\b\s*(.*?)\s*(?=\n|$)'
-        course_obj_matches = re.findall(course_obj_pattern, filtered_section, re.IGNORECASE | re.DOTALL)
-        for obj in course_obj_matches:
-            summary_content.append(obj.strip())
+        for obj in self.course_objectives.findall(filtered_section):
+            summary_items.append(obj.strip())
             # Remove from main text
             filtered_section = filtered_section.replace(obj, '')
-        
+        return filtered_section
+
+@lru_cache(maxsize=32)
+def _compile_rules(*settings) -> PreprocessRules:
+    return PreprocessRules(*settings)
+
+def get_rules(config: Dict) -> PreprocessRules:
+    """Return the compiled preprocessing rules for ``config``, built once per settings."""
+    preprocessing = config['preprocessing']
+    return _compile_rules(
+        preprocessing['tutor_marked_proximity'],
+        preprocessing['tutor_marked_max_words'],
+        preprocessing['summary_max_words'],
+        preprocessing['number_proximity'],
+        preprocessing['common_words_threshold'],
+        preprocessing['capital_proximity'],
+        preprocessing['toc_max_words'],
+        preprocessing.get('backend', 'python'),
+    )
+
+def preprocess_section(section: str, config: Dict) -> Tuple[str, List[str], List[str], List[str]]:
+    """
+    Apply steps 2 to 11 of :func:`preprocess_text` to a single section.
+
+    Args:
+        section (str): One blank-line separated section of sanitized text.
+        config (Dict): Configuration settings.
+
+    Returns:
+        Tuple[str, List[str], List[str], List[str]]: The filtered section, the
+        summary content it contributes, its table of contents regions (which
+        go to the front of the summary content) and its questions.
+    """
+    return get_rules(config).apply(section)
+
+def _preprocess_batch(sections: List[str], config: Dict) -> List[Tuple]:
+    """Run :func:`preprocess_section` over a batch of sections in a worker process."""
+    return [preprocess_section(section, config) for section in sections]
+
+def _section_batches(sections: List[str], batch_chars: int) -> List[List[str]]:
+    """Split ``sections`` into consecutive batches of about ``batch_chars`` characters."""
+    batches = []
+    batch = []
+    chars = 0
+    for section in sections:
+        batch.append(section)
+        chars += len(section)
+        if chars >= batch_chars:
+            batches.append(batch)
+            batch, chars = [], 0
+    if batch:
+        batches.append(batch)
+    return batches
+
+def preprocess_sections(sections: List[str], config: Dict, workers: int = 1) -> List[Tuple]:
+    """
+    Apply :func:`preprocess_section` to every section, in document order.
+
+    With more than one worker and at least ``PARALLEL_MIN_CHARS`` characters
+    of text, the sections are split into consecutive batches of about the
+    same length, several per worker so that slow sections don't leave the
+    other workers idle, and the batches are preprocessed in a process pool.
+    Each section is handled on its own either way, so the results are the
+    same as with one worker.
+
+    Args:
+        sections (List[str]): Sections of sanitized text.
+        config (Dict): Configuration settings.
+        workers (int): Number of worker processes.
+
+    Returns:
+        List[Tuple]: One :func:`preprocess_section` result per section.
+    """
+    total_chars = sum(map(len, sections))
+    if workers <= 1 or len(sections) < 2 or total_chars < PARALLEL_MIN_CHARS:
+        return [preprocess_section(section, config) for section in sections]
+
+    batches = _section_batches(sections, max(1, total_chars // (workers * 4)))
+    _logger.debug(f"Preprocessing {len(sections)} sections in {len(batches)} batches "
+                  f"across {workers} processes")
+    results = []
+    with ProcessPoolExecutor(max_workers=min(workers, len(batches))) as pool:
+        for batch_results in pool.map(_preprocess_batch, batches, [config] * len(batches)):
+            results.extend(batch_results)
+    return results
+
+def preprocessing_workers(config: Dict) -> int:
+    """Number of processes ``preprocessing.workers`` asks for; ``None`` means the CPU count."""
+    workers = config['preprocessing'].get('workers', 1)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    return max(1, int(workers))
+
+def merge_section_results(results) -> Tuple[List[str], List[str], List[str]]:
+    """
+    Combine :func:`preprocess_section` results in document order.
+
+    Table of contents regions are placed at the front of the summary content,
+    latest first, as if each had been inserted at the front when found.
+
+    Args:
+        results (Iterable[Tuple]): Results of :func:`preprocess_section`.
+
+    Returns:
+        Tuple[List[str], List[str], List[str]]: The processed sections, the
+        summary content and the questions.
+    """
+    processed_text = []
+    summary_content = []
+    toc_content = []
+    questions_content = []
+    for filtered_section, summary_items, toc_items, questions in results:
         processed_text.append(filtered_section)
-    
-    # Write questions to {filename}-questions file
+        summary_content.extend(summary_items)
+        toc_content.extend(toc_items)
+        questions_content.extend(questions)
+    toc_content.reverse()
+    return processed_text, toc_content + summary_content, questions_content
+
+def write_questions(questions_content: List[str], filename: str, input_dir: str) -> None:
+    """Write extracted questions to the {filename}-questions file."""
     questions_file = os.path.join(input_dir, f"{os.path.splitext(filename)[0]}-questions.txt")
     with open(questions_file, 'w', encoding='utf-8') as qf:
         qf.write('\n'.join(questions_content))
-    
+
+def _leading_words(text: str, fraction: float) -> str:
+    """The first ``fraction`` of the words of ``text``, joined by single spaces."""
+    words = text.split()
+    return ' '.join(words[:int(len(words) * fraction)])
+
+def select_text(processed_text: List[str], stats: Dict, config: Dict, filename: str) -> str:
+    """
+    Select and rank the processed sections into the text sent for summarisation.
+
+    Args:
+        processed_text (List[str]): Sections returned by :func:`preprocess_section`.
+        stats (Dict): Statistics of the source text, from :func:`get_text_statistics`.
+        config (Dict): Configuration settings.
+        filename (str): Name of the file being processed.
+
+    Returns:
+        str: The final preprocessed text.
+    """
     # Combine processed text ensuring only 60% is selected
-    combined_text = ' '.join(processed_text)
-    selected_length = int(len(combined_text.split()) * 0.6)
-    selected_text = ' '.join(combined_text.split()[:selected_length])
+    selected_text = _leading_words(' '.join(processed_text), 0.6)
 
-    # Get text statistics for smart processing
-    stats = get_text_statistics(text)
-    
     # Adjust thresholds based on text statistics
     if stats['lexical_density'] > 0.7:  # High unique word ratio indicates complex text
         config['preprocessing']['summary_max_words'] = int(config['preprocessing']['summary_max_words'] * 1.2)
     
+    # Tokenise once for chunk detection and scoring
+    document = Document.parse(selected_text)
+
     # Add intelligent chunk detection
-    processed_chunks = smart_chunk_detection(selected_text)
+    processed_chunks = smart_chunk_detection(document)
     
     # Enhanced final processing
-    final_text = final_process_text(processed_chunks, config, filename, stats)
+    return final_process_text(processed_chunks, config, filename, stats, document)
+
+def preprocess_text(text: str, config: Dict, filename: str, input_dir: str) -> Tuple[str, List[str]]:
+    """
+    Preprocess the text to filter out non-summarisable content and handle specific sections.
+
+    Args:
+        text (str): Sanitized original text.
+        config (Dict): Configuration settings.
+        filename (str): Name of the file being processed.
+        input_dir (str): Directory of the input file.
+
+    Returns:
+        Tuple[str, List[str]]: Tuple containing the processed text and appended summary content.
+    """
+    profiler = get_profiler()
+
+    # 1. Break text into sections based on common academic headings
+    with profiler.stage('preprocess.1_sections', len(text)) as stage:
+        sections = SECTION_SPLIT.split(text)
+        stage.output(len(sections))
+
+    # 2-11. Filter each section and collect summary content and questions
+    processed_text, summary_content, questions_content = merge_section_results(
+        preprocess_sections(sections, config, preprocessing_workers(config)))
+
+    # Write questions to {filename}-questions file
+    write_questions(questions_content, filename, input_dir)
+
+    # Get text statistics for smart processing
+    with profiler.stage('preprocess.statistics', len(text)):
+        stats = get_text_statistics(text)
+
+    with profiler.stage('preprocess.select_text', sum(map(len, processed_text))) as stage:
+        final_text = select_text(processed_text, stats, config, filename)
+        stage.output(len(final_text))
+
+    # Drop sentences repeated elsewhere in the document, if enabled
+    deduplicator = make_deduplicator(config)
+    if deduplicator is not None:
+        with profiler.stage('preprocess.dedup', len(final_text)) as stage:
+            final_text = drop_near_duplicates(final_text, deduplicator)
+            stage.output(len(final_text))
 
     return final_text, summary_content
 
-def discard_close_sentences(text: str, common_words_threshold: int) -> str:
+def drop_near_duplicates(text: str, deduplicator) -> str:
+    """
+    Remove the sentences of ``text`` that nearly repeat an earlier sentence.
+
+    Args:
+        text (str): Selected text.
+        deduplicator (NearDuplicateFilter): Filter holding the sentences kept
+            so far in the document.
+
+    Returns:
+        str: The text without its near-duplicate sentences.
+    """
+    sentences = SENTENCE_SPLIT.split(text)
+    kept = deduplicator.filter(sentences)
+    if len(kept) < len(sentences):
+        _logger.info(f"Dropped {len(sentences) - len(kept)} near-duplicate sentences of {len(sentences)}")
+    return ' '.join(kept)
+
+def discard_close_sentences(text: str, common_words_threshold: int, backend: str = 'python') -> str:
     """Enhanced sentence proximity detection."""
-    sentences = re.split(r'(?<=[.!?]) +', text)
-    filtered_sentences = []
-    sentence_vectors = {}
-    
-    # Create simple vector representation for each sentence
-    for sentence in sentences:
-        words = sentence.lower().split()
-        vector = Counter(words)
-        sentence_vectors[sentence] = vector
-    
-    # Compare sentences using cosine similarity
-    for i, sentence in enumerate(sentences):
-        if i == 0:
-            filtered_sentences.append(sentence)
-            continue
-            
-        prev_vector = sentence_vectors.get(filtered_sentences[-1], Counter())
-        curr_vector = sentence_vectors.get(sentence, Counter())
-        
+    document = Document.parse(text)
+    if _use_vectorized(backend, len(document)):
+        return ' '.join(vectorized.discard_close_sentences(document, common_words_threshold))
+
+    # Each sentence is compared with the last sentence kept, as sets of words
+    sentences = document.sentences()
+    word_sets = map(set, document.iter_words())
+    filtered_sentences = [sentences[0]]
+    prev_words = next(word_sets)
+    for sentence, curr_words in zip(sentences[1:], word_sets):
+
         # Check for empty vectors to prevent division by zero
-        if len(prev_vector) == 0 or len(curr_vector) == 0:
+        if len(prev_words) == 0 or len(curr_words) == 0:
             similarity = 0
         else:
-            common_words = set(prev_vector.keys()) & set(curr_vector.keys())
-            similarity = len(common_words) / (math.sqrt(len(prev_vector)) * math.sqrt(len(curr_vector)))
-        
+            common_words = prev_words & curr_words
+            similarity = len(common_words) / (math.sqrt(len(prev_words)) * math.sqrt(len(curr_words)))
+
         if similarity < common_words_threshold / 10:  # Normalize threshold
             filtered_sentences.append(sentence)
-        # Optionally, else:
-            # _logger.debug(f"Discarded sentence due to high similarity: {sentence}")
-    
+            prev_words = curr_words
+
     return ' '.join(filtered_sentences)
 
-def final_process_text(chunks: List[str], config: Dict, filename: str, stats: Dict) -> str:
-    """Enhanced final processing with improved intelligence."""
-    all_sentences = []
-    for chunk in chunks:
-        sentences = re.split(r'(?<=[.!?]) +', chunk)
-        all_sentences.extend(sentences)
+def final_process_text(chunks: List[str], config: Dict, filename: str, stats: Dict,
+                       document: Document = None) -> str:
+    """Enhanced final processing with improved intelligence.
+
+    Args:
+        chunks (List[str]): Chunks of whole sentences, in order.
+        config (Dict): Configuration settings.
+        filename (str): Name of the file being processed.
+        stats (Dict): Statistics of the source text.
+        document (Document, optional): The tokenised text the chunks were
+            cut from, whose sentences are the sentences of the chunks. When
+            given, the chunks are not split and tokenised again.
+
+    Returns:
+        str: The kept sentences.
+    """
+    if document is None:
+        document = Document.from_sentences(
+            [sentence for chunk in chunks for sentence in SENTENCE_SPLIT.split(chunk)])
+    all_sentences = document.sentences()
     
     # Calculate importance scores for all sentences
-    sentence_scores = [
-        (i, calculate_sentence_importance(s, all_sentences))
-        for i, s in enumerate(all_sentences)
-    ]
+    sentence_scores = list(enumerate(score_sentences(
+        document, config['preprocessing'].get('backend', 'python'))))
     
     # Dynamic batch size based on text statistics
     avg_batch_size = min(50, max(10, int(stats['sentence_count'] / 10)))
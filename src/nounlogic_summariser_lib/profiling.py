@@ -0,0 +1,266 @@
+import cProfile
+import json
+import logging
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+_logger = logging.getLogger(__name__)
+
+class _NullStage:
+    """Stage that records nothing; shared by every call when profiling is off."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+    def output(self, size):
+        pass
+
+class NullProfiler:
+    """Profiler used when profiling is off; every method is a no-op."""
+
+    enabled = False
+    _stage = _NullStage()
+
+    def stage(self, name, input_size=None, memory=True):
+        return self._stage
+
+    def record(self, name, wall, input_size=None, output_size=None):
+        pass
+
+    def first_byte(self):
+        pass
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+class _Stage:
+    __slots__ = ('profiler', 'name', 'input_size', 'output_size', 'memory',
+                 'first_byte', '_wall', '_cpu')
+
+    def __init__(self, profiler, name, input_size, memory):
+        self.profiler = profiler
+        self.name = name
+        self.input_size = input_size
+        self.output_size = None
+        self.memory = memory and profiler.trace_memory
+        self.first_byte = None
+
+    def output(self, size):
+        """Record the size of what the stage produced."""
+        self.output_size = size
+
+    def __enter__(self):
+        self.profiler._push(self)
+        self._wall = time.perf_counter()
+        self._cpu = time.thread_time()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        wall = time.perf_counter() - self._wall
+        cpu = time.thread_time() - self._cpu
+        peak = self.profiler._pop(self)
+        self.profiler._record(self, wall, cpu, peak)
+        return False
+
+class Profiler:
+    """Record the time, sizes and memory of each pipeline stage.
+
+    Stages are timed with :meth:`stage` and aggregated by name, so a step
+    run once per section or a request sent once per chunk shows up as one
+    entry with a call count. For each stage the report holds wall time, CPU
+    time of the calling thread, the summed input and output sizes (in
+    characters), the largest peak of traced memory above the level at the
+    start of the stage and, for model requests, the time to first byte.
+
+    Install a profiler with :func:`profiling`; the pipeline looks it up
+    with :func:`get_profiler`. When none is installed a :class:`NullProfiler`
+    is used, which costs one no-op context manager per stage.
+
+    Args:
+        trace_memory (bool): Track peak memory with :mod:`tracemalloc`. This
+            slows Python code down noticeably, so timings taken with it on
+            are inflated.
+        cprofile_path (str, optional): Also run :mod:`cProfile` on the
+            thread that installs the profiler and dump its stats here.
+    """
+
+    enabled = True
+
+    def __init__(self, trace_memory=True, cprofile_path=None):
+        self.trace_memory = trace_memory
+        self.cprofile_path = cprofile_path
+        self.stages = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._cprofile = None
+        self._started_tracing = False
+        self._wall = None
+        self.total_wall = None
+
+    def stage(self, name, input_size=None, memory=True):
+        """Context manager timing one run of stage ``name``.
+
+        Args:
+            name (str): Stage name; runs with the same name are aggregated.
+            input_size (int, optional): Size of the stage input.
+            memory (bool): Track peak memory; turn off for stages that run
+                on worker threads, where the shared tracer mixes threads.
+
+        Returns:
+            Context manager whose value has an ``output(size)`` method.
+        """
+        return _Stage(self, name, input_size, memory)
+
+    def record(self, name, wall, input_size=None, output_size=None):
+        """Record one run of stage ``name`` that the caller timed itself.
+
+        For coroutines, which interleave on one thread and so can't nest
+        :meth:`stage` blocks. Neither CPU time nor memory is recorded.
+
+        Args:
+            name (str): Stage name; runs with the same name are aggregated.
+            wall (float): Wall time of the run in seconds.
+            input_size (int, optional): Size of the stage input.
+            output_size (int, optional): Size of what the stage produced.
+        """
+        stage = _Stage(self, name, input_size, memory=False)
+        stage.output(output_size)
+        self._record(stage, wall, 0.0, None)
+
+    def first_byte(self):
+        """Mark that the first byte of a response arrived for the current stage."""
+        stack = getattr(self._local, 'stack', None)
+        if stack:
+            stage = stack[-1][0]
+            stage.first_byte = time.perf_counter() - stage._wall
+
+    def _push(self, stage):
+        stack = self._local.__dict__.setdefault('stack', [])
+        start = 0
+        if stage.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            # Credit the peak so far to the enclosing stages before resetting it
+            for entry in stack:
+                entry[2] = max(entry[2], peak)
+            tracemalloc.reset_peak()
+            start = current
+        stack.append([stage, start, start])
+
+    def _pop(self, stage):
+        stage, start, peak = self._local.stack.pop()
+        if not stage.memory:
+            return None
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        for entry in self._local.stack:
+            entry[2] = max(entry[2], peak)
+        tracemalloc.reset_peak()
+        return peak - start
+
+    def _record(self, stage, wall, cpu, peak):
+        with self._lock:
+            entry = self.stages.get(stage.name)
+            if entry is None:
+                entry = self.stages[stage.name] = {
+                    'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0,
+                    'input_size': None, 'output_size': None,
+                    'peak_memory_bytes': None, 'first_byte_s': None, 'max_first_byte_s': None,
+                }
+            entry['calls'] += 1
+            entry['wall_s'] += wall
+            entry['cpu_s'] += cpu
+            if stage.input_size is not None:
+                entry['input_size'] = (entry['input_size'] or 0) + stage.input_size
+            if stage.output_size is not None:
+                entry['output_size'] = (entry['output_size'] or 0) + stage.output_size
+            if peak is not None:
+                entry['peak_memory_bytes'] = max(entry['peak_memory_bytes'] or 0, peak)
+            if stage.first_byte is not None:
+                entry['first_byte_s'] = (entry['first_byte_s'] or 0.0) + stage.first_byte
+                entry['max_first_byte_s'] = max(entry['max_first_byte_s'] or 0.0, stage.first_byte)
+
+    def start(self):
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        if self.cprofile_path:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        self._wall = time.perf_counter()
+
+    def stop(self):
+        self.total_wall = time.perf_counter() - self._wall
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            self._cprofile.dump_stats(self.cprofile_path)
+            _logger.info(f"Wrote cProfile stats to {self.cprofile_path}")
+            self._cprofile = None
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def report(self):
+        """Return the recorded stages as a JSON-serialisable dict.
+
+        ``first_byte_s`` is the mean time to first byte over the calls.
+        """
+        stages = []
+        with self._lock:
+            for name, entry in self.stages.items():
+                entry = dict(entry, name=name)
+                if entry['first_byte_s'] is not None:
+                    entry['first_byte_s'] /= entry['calls']
+                stages.append(entry)
+        return {
+            'total_wall_s': self.total_wall,
+            'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else None,
+            'stages': stages,
+        }
+
+    def write_report(self, path):
+        """Write :meth:`report` as JSON to ``path``."""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2)
+        _logger.info(f"Wrote profile report to {path}")
+
+NULL_PROFILER = NullProfiler()
+_active = NULL_PROFILER
+
+def get_profiler():
+    """Return the installed profiler, or the no-op :data:`NULL_PROFILER`."""
+    return _active
+
+def mark_first_byte(response):
+    """HTTP response hook recording the time to first byte of a request."""
+    _active.first_byte()
+
+@contextmanager
+def profiling(profiler):
+    """Install ``profiler`` for the pipeline while the block runs.
+
+    The profiler is process-wide, so stages run on worker threads are
+    recorded too; stages run in worker processes are not.
+    """
+    global _active
+    previous = _active
+    _active = profiler
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        _active = previous
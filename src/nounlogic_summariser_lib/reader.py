@@ -0,0 +1,86 @@
+"""
+Incremental reading of large text inputs.
+
+:func:`iter_text_blocks` memory-maps a file and decodes it a block at a
+time, so a multi-hundred-MB input never exists as one Python string. The
+mapped pages belong to the OS page cache and are not counted against the
+Python heap; the kernel is told the file is read sequentially so it can
+drop pages behind the reader.
+
+Together with sanitisation, section splitting and the windowed
+preprocessing in :mod:`pipeline`, peak memory stays under
+:func:`peak_memory_target`, which depends only on the block, section and
+window sizes and not on the size of the file.
+"""
+
+import codecs
+import io
+import mmap
+
+def peak_memory_target(block_size, max_section_chars, window_chars=0):
+    """Bytes of Python memory that streaming a file stays under.
+
+    The section splitter holds at most one unfinished section of
+    ``max_section_chars`` plus one block, and works on up to four copies
+    of that window at a time. A character takes at most four bytes.
+    Preprocessing a section also stays within this, as its words and
+    sentences take less than sixteen bytes per character.
+
+    A :class:`pipeline.StreamingPreprocessor` window additionally keeps
+    the preprocessing results of up to ``window_chars`` characters of
+    sections, again less than sixteen bytes per character. Leave
+    ``window_chars`` at 0 for the bound of reading, sanitising and
+    splitting alone.
+
+    Args:
+        block_size (int): Characters decoded at a time.
+        max_section_chars (int): Longest section kept in memory.
+        window_chars (int): Characters of sections per preprocessing window.
+
+    Returns:
+        int: The target in bytes.
+    """
+    return 4 * 4 * (block_size + max_section_chars) + 16 * window_chars
+
+def _iter_bytes(f, block_size):
+    try:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (ValueError, OSError):
+        # Empty files and pipes can't be mapped; read them in blocks
+        while True:
+            data = f.read(block_size)
+            if not data:
+                return
+            yield data
+    with mapped:
+        if hasattr(mmap, 'MADV_SEQUENTIAL'):
+            mapped.madvise(mmap.MADV_SEQUENTIAL)
+        for start in range(0, len(mapped), block_size):
+            yield mapped[start:start + block_size]
+
+def iter_text_blocks(path, block_size=1 << 16, encoding='utf-8', errors='strict'):
+    """Yield the text of a file in blocks of about ``block_size`` bytes.
+
+    Characters split across blocks are decoded whole, and line endings are
+    translated as in text mode, so joining the blocks gives exactly what
+    ``open(path, encoding=encoding).read()`` returns.
+
+    Args:
+        path (str): Path to the file.
+        block_size (int): Bytes decoded at a time.
+        encoding (str): Text encoding of the file.
+        errors (str): How decoding errors are handled, as for ``open``.
+
+    Yields:
+        str: Consecutive pieces of the text; never empty.
+    """
+    decoder = io.IncrementalNewlineDecoder(
+        codecs.getincrementaldecoder(encoding)(errors), translate=True)
+    with open(path, 'rb') as f:
+        for data in _iter_bytes(f, block_size):
+            text = decoder.decode(data)
+            if text:
+                yield text
+    text = decoder.decode(b'', final=True)
+    if text:
+        yield text
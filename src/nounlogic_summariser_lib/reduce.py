@@ -0,0 +1,106 @@
+import logging
+
+from .summariser import _chunk_summarizer, _map_ordered, _max_concurrency
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_PROMPT = 'Combine the following summaries into one concise summary, and nothing else:'
+
+def _word_count(texts):
+    return sum(len(text.split()) for text in texts)
+
+def group_summaries(summaries, batch_size, word_limit):
+    """Group consecutive summaries into batches for the next reduce level.
+
+    A batch holds at most ``batch_size`` summaries and, unless a single
+    pair is already over the limit, at most ``word_limit`` words. Every
+    batch except possibly the last holds at least two summaries so each
+    level is smaller than the one before.
+
+    Args:
+        summaries (List[str]): Summaries of the current level.
+        batch_size (int): Maximum summaries per batch.
+        word_limit (int): Maximum words per batch.
+
+    Returns:
+        List[List[str]]: Batches in document order.
+    """
+    batches = []
+    current = []
+    current_words = 0
+    for summary in summaries:
+        words = len(summary.split())
+        if len(current) >= 2 and (len(current) >= batch_size or current_words + words > word_limit):
+            batches.append(current)
+            current = []
+            current_words = 0
+        current.append(summary)
+        current_words += words
+    if current:
+        batches.append(current)
+    return batches
+
+def _reduce_settings(config):
+    """Read the ``reduce`` settings, shared by the threaded and asyncio reducers.
+
+    Returns:
+        dict: ``batch_size``, ``target_words``, ``max_depth`` and
+        ``word_limit``, and ``config``, the configuration to summarize
+        batches with, which has the reduce prompt.
+    """
+    reduce_config = config.get('reduce', {})
+    return {
+        'batch_size': max(2, reduce_config.get('batch_size', 8)),
+        'target_words': reduce_config.get('target_words', 400),
+        'max_depth': reduce_config.get('max_depth', 10),
+        'word_limit': reduce_config.get('token_limit', config['token_limit']),
+        'config': {**config,
+                   'prompt_template': reduce_config.get('prompt_template', DEFAULT_PROMPT)},
+    }
+
+def _non_blank(summaries):
+    return [summary.strip() for summary in summaries if summary and summary.strip()]
+
+def _level_texts(level, settings):
+    """Texts to summarize for the next reduce level, or ``None`` once done."""
+    if len(level) <= 1 or _word_count(level) <= settings['target_words']:
+        return None
+    batches = group_summaries(level, settings['batch_size'], settings['word_limit'])
+    return ['\n\n'.join(batch) for batch in batches]
+
+def _log_level(depth, texts, level):
+    _logger.info(f"Reduce level {depth}: {len(texts)} batches, {_word_count(level)} words")
+
+def reduce_summaries(summaries, config, executor=None):
+    """Summarize chunk summaries recursively until they fit the target length.
+
+    Each level groups the summaries with :func:`group_summaries` and
+    summarizes every batch with ``reduce.prompt_template``. Batches of a
+    level are independent and run concurrently, bounded by
+    ``ollama.max_concurrency``. They go through the same summary cache as
+    chunks, so unchanged branches are not recomputed on re-runs.
+
+    Args:
+        summaries (List[str]): Chunk summaries in document order.
+        config (dict): Configuration settings; see the ``reduce`` section.
+        executor (Executor, optional): Shared worker pool for requests.
+
+    Returns:
+        str: The reduced summary.
+    """
+    settings = _reduce_settings(config)
+    summarize_batch, cache = _chunk_summarizer(settings['config'])
+
+    level = _non_blank(summaries)
+    try:
+        for depth in range(1, settings['max_depth'] + 1):
+            texts = _level_texts(level, settings)
+            if texts is None:
+                break
+            level = _non_blank(_map_ordered(summarize_batch, texts,
+                                            _max_concurrency(config), executor))
+            _log_level(depth, texts, level)
+    finally:
+        if cache is not None:
+            cache.log_stats()
+    return '\n\n'.join(level)
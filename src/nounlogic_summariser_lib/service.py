@@ -0,0 +1,474 @@
+"""
+Long-running summarisation service.
+
+``summariser serve`` keeps the libraries, the Ollama connection pool and a
+fixed set of workers loaded, and accepts jobs over HTTP on a TCP port or a
+Unix socket:
+
+- ``POST /jobs`` with a JSON body ``{"file": "<path>", "resume": false}``
+  queues a file that is already on the server, if it is under one of the
+  ``serve.allowed_dirs``. Any other body is taken as the document itself
+  and needs a ``?filename=`` query parameter.
+- ``GET /jobs`` and ``GET /jobs/<id>`` report status and progress.
+- ``GET /jobs/<id>/summary`` returns the summary of a finished job.
+- ``DELETE /jobs/<id>`` cancels a job that has not started.
+- ``GET /health`` reports the queue and worker counts.
+
+When ``serve.max_queue`` jobs are waiting, new jobs are refused with
+``429 Too Many Requests`` and a ``Retry-After`` header. Uploaded files
+and their summaries are deleted once their job is forgotten.
+"""
+
+import json
+import logging
+import os
+import queue
+import shutil
+import signal
+import socketserver
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from .autotune import apply_profile
+from .batch import single_process_config, summarize_file
+from .summariser import _chat_function, _max_concurrency
+
+_logger = logging.getLogger(__name__)
+
+class QueueFullError(RuntimeError):
+    """Raised when a job is submitted while the job queue is full."""
+
+class Job:
+    """A file to summarize and what has happened to it so far.
+
+    ``status`` moves from ``queued`` to ``running`` and then to ``done`` or
+    ``failed``; a queued job can also be ``cancelled``.
+    """
+
+    def __init__(self, path, resume=False, upload_dir=None):
+        self.id = uuid.uuid4().hex
+        self.file = path
+        self.resume = resume
+        # Directory made for an uploaded file, deleted with the job
+        self.upload_dir = upload_dir
+        self.status = 'queued'
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.output = None
+        self.error = None
+        # Chunk summaries started and characters of summary written so far
+        self.chunks = 0
+        self.characters = 0
+        self.finished = threading.Event()
+
+    def on_token(self, index, piece):
+        """Record progress; used as the ``on_token`` callback of the job."""
+        self.chunks = max(self.chunks, index + 1)
+        self.characters += len(piece)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'file': self.file,
+            'status': self.status,
+            'submitted_at': self.submitted_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'progress': {'chunks': self.chunks, 'characters': self.characters},
+            'output': self.output,
+            'error': self.error,
+        }
+
+def _warm_up():
+    return os.getpid()
+
+class JobQueue:
+    """Run summarization jobs on a fixed pool of warm workers.
+
+    ``workers`` threads take jobs from a queue of at most ``max_queue``
+    waiting jobs. As in :func:`batch.process_batch`, files are preprocessed
+    in a pool of ``workers`` processes and every chunk request goes through
+    one thread pool of ``ollama.max_concurrency`` threads, so the load on
+    the model is capped for all jobs together. The pools and the Ollama
+    client are created once, in :meth:`start`.
+
+    Only the last ``keep_jobs`` finished jobs are remembered; the upload
+    directories of the others are deleted.
+
+    Args:
+        config (dict): Configuration settings.
+        workers (int, optional): Jobs run at once; defaults to ``serve.workers``.
+        max_queue (int, optional): Jobs that may wait; defaults to ``serve.max_queue``.
+        keep_jobs (int, optional): Finished jobs to remember; defaults to
+            ``serve.keep_jobs``.
+    """
+
+    def __init__(self, config, workers=None, max_queue=None, keep_jobs=None):
+        settings = config.get('serve', {})
+        self.workers = workers or settings.get('workers', 2)
+        self.max_queue = max_queue or settings.get('max_queue', 16)
+        self.keep_jobs = keep_jobs or settings.get('keep_jobs', 1000)
+        # Jobs already run in parallel; don't nest per-file pools
+        self.config = single_process_config(apply_profile(config))
+        # Cancelled jobs stay in the queue until a worker skips them, so the
+        # queue is unbounded and the jobs still waiting are counted here
+        self._queue = queue.Queue()
+        self._waiting = 0
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._closed = False
+        self._prep_pool = None
+        self._llm_pool = None
+
+    def start(self):
+        """Start the pools and worker threads."""
+        self._prep_pool = ProcessPoolExecutor(max_workers=self.workers)
+        # Start the preprocessing processes now rather than on the first job
+        for future in [self._prep_pool.submit(_warm_up) for _ in range(self.workers)]:
+            future.result()
+        self._llm_pool = ThreadPoolExecutor(max_workers=_max_concurrency(self.config),
+                                            thread_name_prefix='summarise')
+        _chat_function(self.config['ollama'])
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, path, resume=False, upload_dir=None):
+        """Queue a file for summarization.
+
+        Args:
+            path (str): File to summarize.
+            resume (bool): Reuse the checkpoint of an interrupted run.
+            upload_dir (str, optional): Directory holding an uploaded
+                ``path``, deleted once the job is forgotten.
+
+        Raises:
+            QueueFullError: If ``max_queue`` jobs are already waiting.
+            RuntimeError: If the queue has been closed.
+
+        Returns:
+            Job: The queued job.
+        """
+        job = Job(path, resume, upload_dir)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("The job queue is shut down")
+            if self._waiting >= self.max_queue:
+                raise QueueFullError(f"Job queue is full ({self.max_queue} jobs waiting)")
+            self._queue.put_nowait(job)
+            self._waiting += 1
+            self._jobs[job.id] = job
+            forgotten = self._forget_finished()
+        _logger.info(f"Queued job {job.id} for {path}")
+        for old in forgotten:
+            if old.upload_dir is not None:
+                shutil.rmtree(old.upload_dir, ignore_errors=True)
+        return job
+
+    def _forget_finished(self):
+        """Forget the oldest finished jobs beyond ``keep_jobs`` and return them."""
+        excess = len(self._jobs) - self.keep_jobs
+        if excess <= 0:
+            return []
+        finished = [job for job in self._jobs.values() if job.finished.is_set()]
+        for job in finished[:excess]:
+            del self._jobs[job.id]
+        return finished[:excess]
+
+    def get(self, job_id):
+        """Return the job with id ``job_id``, or ``None``."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        """Return the remembered jobs, oldest first."""
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id):
+        """Cancel a queued job, freeing its place in the queue.
+
+        Returns:
+            bool: False if the job is unknown or has already started.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != 'queued':
+                return False
+            self._finish(job, 'cancelled')
+            self._waiting -= 1
+            return True
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            waiting = self._waiting
+        return {
+            'workers': self.workers,
+            'max_queue': self.max_queue,
+            'waiting': waiting,
+            'jobs': counts,
+        }
+
+    def _finish(self, job, status, output=None, error=None):
+        job.status = status
+        job.output = output
+        job.error = error
+        job.finished_at = time.time()
+        job.finished.set()
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            with self._lock:
+                if job.status != 'queued':
+                    continue
+                self._waiting -= 1
+                job.status = 'running'
+                job.started_at = time.time()
+            _logger.info(f"Starting job {job.id} for {job.file}")
+            try:
+                output = summarize_file(job.file, self.config, self._prep_pool, self._llm_pool,
+                                        resume=job.resume, on_token=job.on_token)
+            except Exception as e:
+                _logger.error(f"Job {job.id} failed to summarize {job.file}: {e}")
+                with self._lock:
+                    self._finish(job, 'failed', error=str(e))
+            else:
+                _logger.info(f"Finished job {job.id}: {output}")
+                with self._lock:
+                    self._finish(job, 'done', output=output)
+
+    def close(self, wait=True):
+        """Stop accepting jobs, cancel waiting ones and stop the workers.
+
+        Args:
+            wait (bool): Wait for running jobs to finish.
+        """
+        with self._lock:
+            self._closed = True
+            while True:
+                try:
+                    job = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is not None and job.status == 'queued':
+                    self._finish(job, 'cancelled')
+            self._waiting = 0
+        for _ in self._threads:
+            self._queue.put(None)
+        if wait:
+            for thread in self._threads:
+                thread.join()
+        if self._llm_pool is not None:
+            self._llm_pool.shutdown(wait=wait)
+        if self._prep_pool is not None:
+            self._prep_pool.shutdown(wait=wait)
+
+def _is_allowed(path, allowed_dirs):
+    """Whether ``path``, symbolic links resolved, is under one of ``allowed_dirs``."""
+    path = os.path.realpath(path)
+    return any(os.path.commonpath([path, allowed]) == allowed for allowed in allowed_dirs)
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'nounlogic-summariser'
+
+    def log_message(self, format, *args):
+        _logger.debug(f"{self.command} {self.path}: {format % args}")
+
+    def _send(self, status, body, content_type, headers=()):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _json(self, status, body, headers=()):
+        self._send(status, json.dumps(body).encode('utf-8'), 'application/json', headers)
+
+    def _error(self, status, message, headers=()):
+        self._json(status, {'error': message}, headers)
+
+    def _parts(self):
+        return [part for part in urlsplit(self.path).path.split('/') if part]
+
+    def _job(self, job_id):
+        job = self.server.job_queue.get(job_id)
+        if job is None:
+            self._error(404, f"No job {job_id}")
+        return job
+
+    def do_GET(self):
+        parts = self._parts()
+        job_queue = self.server.job_queue
+        if parts == ['health']:
+            self._json(200, {'status': 'ok', **job_queue.stats()})
+        elif parts == ['jobs']:
+            self._json(200, {'jobs': [job.to_dict() for job in job_queue.jobs()]})
+        elif len(parts) == 2 and parts[0] == 'jobs':
+            job = self._job(parts[1])
+            if job is not None:
+                self._json(200, job.to_dict())
+        elif len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'summary':
+            job = self._job(parts[1])
+            if job is None:
+                return
+            if job.status != 'done':
+                self._error(409, f"Job {job.id} is {job.status}")
+                return
+            with open(job.output, 'rb') as f:
+                self._send(200, f.read(), 'text/plain; charset=utf-8')
+        else:
+            self._error(404, f"Unknown path {self.path}")
+
+    def do_DELETE(self):
+        parts = self._parts()
+        if len(parts) != 2 or parts[0] != 'jobs':
+            self._error(404, f"Unknown path {self.path}")
+            return
+        job = self._job(parts[1])
+        if job is None:
+            return
+        if self.server.job_queue.cancel(job.id):
+            self._json(200, job.to_dict())
+        else:
+            self._error(409, f"Job {job.id} is {job.status}")
+
+    def do_POST(self):
+        if self._parts() != ['jobs']:
+            self._error(404, f"Unknown path {self.path}")
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > self.server.max_upload_bytes:
+            # The body is not read, so the connection can't be reused
+            self.close_connection = True
+            self._error(413, f"Uploads are limited to {self.server.max_upload_bytes} bytes")
+            return
+        body = self.rfile.read(length)
+
+        if self.headers.get_content_type() == 'application/json':
+            try:
+                request = json.loads(body)
+                path = request['file']
+                if not isinstance(path, str):
+                    raise TypeError(path)
+            except (ValueError, TypeError, KeyError):
+                self._error(400, 'Expected a JSON object with a "file" path')
+                return
+            if not _is_allowed(path, self.server.allowed_dirs):
+                self._error(403, f"{path} is not under any of serve.allowed_dirs")
+                return
+            if not os.path.isfile(path):
+                self._error(400, f"No such file: {path}")
+                return
+            resume = bool(request.get('resume', False))
+            upload_dir = None
+        else:
+            filename = os.path.basename(parse_qs(urlsplit(self.path).query).get('filename', [''])[0])
+            if not filename:
+                self._error(400, 'Uploads need a ?filename= parameter')
+                return
+            if os.path.splitext(filename)[1].lower() not in self.server.supported_formats:
+                self._error(415, f"Unsupported file type: {filename}")
+                return
+            # Each upload gets its own directory, as outputs are written next to it
+            upload_dir = os.path.join(self.server.upload_dir, uuid.uuid4().hex)
+            os.makedirs(upload_dir)
+            path = os.path.join(upload_dir, filename)
+            with open(path, 'wb') as f:
+                f.write(body)
+            resume = False
+
+        try:
+            job = self.server.job_queue.submit(path, resume, upload_dir)
+        except QueueFullError as e:
+            self._error(429, str(e), [('Retry-After', str(self.server.retry_after))])
+        except RuntimeError as e:
+            self._error(503, str(e))
+        else:
+            self._json(202, job.to_dict(), [('Location', f"/jobs/{job.id}")])
+            return
+        if upload_dir is not None:
+            shutil.rmtree(upload_dir, ignore_errors=True)
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        # A socket file left behind by an earlier run would make bind fail
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+        super().server_bind()
+
+def make_server(job_queue, config, host=None, port=None, socket_path=None):
+    """Create the HTTP server for a started :class:`JobQueue`.
+
+    Listens on ``socket_path`` if given, else on ``host`` and ``port``; the
+    defaults come from the ``serve`` config section. Port 0 picks a free port.
+    Files on the server can only be submitted by path from the directories
+    in ``serve.allowed_dirs``; with none configured, only uploads are taken.
+
+    Returns:
+        socketserver.BaseServer: The server; call ``serve_forever`` on it.
+    """
+    settings = config.get('serve', {})
+    socket_path = socket_path or settings.get('socket')
+    if socket_path:
+        server = _UnixHTTPServer(socket_path, _Handler)
+    else:
+        host = host or settings.get('host', '127.0.0.1')
+        port = settings.get('port', 8765) if port is None else port
+        server = ThreadingHTTPServer((host, port), _Handler)
+        server.daemon_threads = True
+    server.job_queue = job_queue
+    server.allowed_dirs = [os.path.realpath(os.path.expanduser(path))
+                           for path in settings.get('allowed_dirs') or ()]
+    server.upload_dir = os.path.abspath(os.path.expanduser(settings.get('upload_dir', 'uploads')))
+    server.max_upload_bytes = int(settings.get('max_upload_mb', 100) * 1024 * 1024)
+    server.retry_after = settings.get('retry_after', 5)
+    server.supported_formats = {ext.lower() for ext in config.get('supported_formats', ['.txt', '.pdf'])}
+    return server
+
+def serve(config, host=None, port=None, socket_path=None, workers=None, max_queue=None):
+    """Run the summarization service until interrupted or sent SIGTERM.
+
+    On shutdown, waiting jobs are cancelled and running ones are finished.
+    """
+    job_queue = JobQueue(config, workers=workers, max_queue=max_queue)
+    job_queue.start()
+    server = make_server(job_queue, config, host, port, socket_path)
+    address = server.server_address
+    where = address if isinstance(address, str) else f"http://{address[0]}:{address[1]}"
+    _logger.info(f"Serving on {where} with {job_queue.workers} workers")
+
+    def stop(signum, frame):
+        # shutdown() waits for serve_forever, which runs in this thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    previous = signal.signal(signal.SIGTERM, stop)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        signal.signal(signal.SIGTERM, previous)
+        _logger.info("Shutting down; waiting for running jobs")
+        server.server_close()
+        job_queue.close()
+        if isinstance(address, str) and os.path.exists(address):
+            os.remove(address)
@@ -21,12 +21,17 @@ References:
 """
 
 import argparse
+import json
 import logging
+import os
 import sys
 
 from nounlogic_summariser_lib import __version__
+from nounlogic_summariser_lib.autotune import autotune
 from nounlogic_summariser_lib.summariser import process_file, load_config
+from nounlogic_summariser_lib.batch import discover_files, process_batch, log_report
 from nounlogic_summariser_lib.convert import convert_pdf_to_md, convert_txt_to_pdf, extract_to_markdown
+from nounlogic_summariser_lib.profiling import NULL_PROFILER, Profiler, profiling
 
 __author__ = "nathfavour"
 __copyright__ = "nathfavour"
@@ -64,6 +69,10 @@ def fib(n):
 # executable/script.
 
 
+def _int_list(value):
+    return [int(item) for item in value.split(',')]
+
+
 def parse_args(args):
     """Parse command line parameters
 
@@ -80,8 +89,18 @@ def parse_args(args):
 
     # Summarize command
     summarize_parser = subparsers.add_parser('summarize', help='Summarize a text file')
-    summarize_parser.add_argument('file', help='Path to the input file')
+    summarize_parser.add_argument('file', help='Path to the input file, a directory or a glob pattern')
     summarize_parser.add_argument('--config', help='Path to config file', default='config.json')
+    summarize_parser.add_argument('--stream', action='store_true', help='Summarize while the file is still being read')
+    summarize_parser.add_argument('--stream-tokens', action='store_true',
+                                  help='Write summaries to the output files while the model generates them')
+    summarize_parser.add_argument('--resume', action='store_true', help='Skip chunks finished by an interrupted run')
+    summarize_parser.add_argument('--workers', type=int, help='Number of preprocessing processes in batch mode')
+    summarize_parser.add_argument('--report', help='Write the batch report as JSON to this path')
+    summarize_parser.add_argument('--profile', help='Write per-stage timings and memory as JSON to this path')
+    summarize_parser.add_argument('--cprofile', help='Write cProfile stats of the run to this path')
+    summarize_parser.add_argument('--no-profile-memory', action='store_true',
+                                  help='Do not trace memory while profiling; it slows the run down')
 
     # Convert command
     convert_parser = subparsers.add_parser('convert', help='Convert files to other formats')
@@ -90,6 +109,24 @@ def parse_args(args):
     convert_parser.add_argument('--markitdown', action='store_true', help='Extract text to Markdown')
     convert_parser.add_argument('--config', help='Path to config file', default='config.json')
 
+    # Serve command
+    serve_parser = subparsers.add_parser('serve', help='Run a summarization service with a job queue')
+    serve_parser.add_argument('--config', help='Path to config file', default='config.json')
+    serve_parser.add_argument('--host', help='Address to listen on')
+    serve_parser.add_argument('--port', type=int, help='Port to listen on')
+    serve_parser.add_argument('--socket', help='Listen on this Unix socket instead of a port')
+    serve_parser.add_argument('--workers', type=int, help='Number of jobs to run at once')
+    serve_parser.add_argument('--max-queue', type=int, help='Number of jobs that may wait before new ones are refused')
+
+    # Autotune command
+    autotune_parser = subparsers.add_parser(
+        'autotune', help='Measure the model and store the fastest chunk size and concurrency')
+    autotune_parser.add_argument('--config', help='Path to config file', default='config.json')
+    autotune_parser.add_argument('--sample', help='Text file to build calibration chunks from')
+    autotune_parser.add_argument('--sizes', type=_int_list, help='Chunk sizes in tokens to try, e.g. 500,1000')
+    autotune_parser.add_argument('--concurrency', type=_int_list, help='Concurrency levels to try, e.g. 1,2,4')
+    autotune_parser.add_argument('--samples', type=int, help='Timed batches per size and concurrency')
+
     return parser.parse_args(args)
 
 
@@ -106,6 +143,60 @@ def setup_logging(verbose):
     )
 
 
+def convert_summary(summary_path, config):
+    """Convert a summary file to the formats listed in config, if enabled
+
+    Args:
+      summary_path (str): Path to the ``_summarised.txt`` file
+      config (dict): Configuration settings
+    """
+    if not config.get("enable_output_conversion", False):
+        return
+    outputs = config.get("convert_outputs", [".pdf"])
+    for ext in outputs:
+        if ext == ".pdf":
+            pdf_path = summary_path.replace(".txt", ".pdf")
+            convert_txt_to_pdf(summary_path, pdf_path)
+            _logger.info(f"Converted summary to PDF: {pdf_path}")
+        if ext == ".md":
+            md_path = summary_path.replace(".txt", ".md")
+            extract_to_markdown(summary_path, md_path)
+            _logger.info(f"Converted summary to Markdown: {md_path}")
+
+
+def summarize(args, config):
+    """Run the summarize command on a file or a batch of files
+
+    Args:
+      args (:obj:`argparse.Namespace`): parsed command line parameters
+      config (dict): Configuration settings
+
+    Returns:
+      bool: True if any file in a batch failed or no file was found
+    """
+    if os.path.isfile(args.file):
+        _logger.info(f"Processing file: {args.file}")
+        summary_path = process_file(args.file, config, resume=args.resume)
+        _logger.info("Summarization completed.")
+        convert_summary(summary_path, config)
+        return False
+
+    paths = discover_files(args.file, config['supported_formats'])
+    if not paths:
+        _logger.error(f"No supported files found at {args.file}")
+        return True
+    _logger.info(f"Processing {len(paths)} files from {args.file}")
+    report = process_batch(paths, config, workers=args.workers, resume=args.resume)
+    for entry in report:
+        if entry['status'] == 'ok':
+            convert_summary(entry['output'], config)
+    log_report(report)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    return any(entry['status'] != 'ok' for entry in report)
+
+
 def main(args):
     """Wrapper for CLI commands
 
@@ -116,23 +207,21 @@ def main(args):
     setup_logging(args.verbose)
 
     if args.command == 'summarize':
-        _logger.info(f"Processing file: {args.file}")
         config = load_config(args.config)
-        summary_path = process_file(args.file, config)
-        _logger.info("Summarization completed.")
-
-        # Optional: auto-convert outputs if enabled in config
-        if config.get("enable_output_conversion", False):
-            outputs = config.get("convert_outputs", [".pdf"])
-            for ext in outputs:
-                if ext == ".pdf":
-                    pdf_path = summary_path.replace(".txt", ".pdf")
-                    convert_txt_to_pdf(summary_path, pdf_path)
-                    _logger.info(f"Converted summary to PDF: {pdf_path}")
-                if ext == ".md":
-                    md_path = summary_path.replace(".txt", ".md")
-                    extract_to_markdown(summary_path, md_path)
-                    _logger.info(f"Converted summary to Markdown: {md_path}")
+        if args.stream:
+            config.setdefault('streaming', {})['enabled'] = True
+        if args.stream_tokens:
+            config['ollama']['stream'] = True
+        if args.profile or args.cprofile:
+            profiler = Profiler(trace_memory=not args.no_profile_memory, cprofile_path=args.cprofile)
+        else:
+            profiler = NULL_PROFILER
+        with profiling(profiler):
+            failed = summarize(args, config)
+        if args.profile:
+            profiler.write_report(args.profile)
+        if failed:
+            sys.exit(1)
 
     elif args.command == 'convert':
         config = load_config(args.config)
@@ -145,6 +234,22 @@ def main(args):
             extract_to_markdown(args.file, output_md)
             _logger.info(f"Extracted {args.file} to Markdown: {output_md}")
 
+    elif args.command == 'serve':
+        # Imported here so the other commands don't load the HTTP server
+        from nounlogic_summariser_lib.service import serve
+
+        config = load_config(args.config)
+        serve(config, host=args.host, port=args.port, socket_path=args.socket,
+              workers=args.workers, max_queue=args.max_queue)
+
+    elif args.command == 'autotune':
+        config = load_config(args.config)
+        text = None
+        if args.sample:
+            with open(args.sample, 'r', encoding='utf-8') as f:
+                text = f.read()
+        autotune(config, text, sizes=args.sizes, concurrency=args.concurrency, samples=args.samples)
+
 
 def run():
     """Calls :func:`main` passing the CLI arguments extracted from :obj:`sys.argv`
@@ -1,10 +1,22 @@
 import json
 import os
+import shutil
 import logging  # Added import for logging
-from .interface import sanitize_text, chunk_text
+import queue
+import threading
+from collections import deque
+from contextlib import ExitStack
+from concurrent.futures import ThreadPoolExecutor
+from .autotune import apply_profile
+from .cache import get_cache
+from .client import get_client
+from .dispatch import get_dispatcher, total_concurrency
+from .checkpoint import CheckpointJournal
+from .interface import sanitize_text, chunk_text, chunk_settings
+from .packing import DEFAULT_INSTRUCTIONS, PackRequest, pack_chunks, packing_settings
 from .convert import convert_pdf_to_md
-from ollama import chat
 from .preprocessing import preprocess_text, final_process_text
+from .profiling import get_profiler
 
 _logger = logging.getLogger(__name__)  # Initialize the logger
 
@@ -21,78 +33,724 @@ def load_config(config_path='config.json'):
         config = json.load(f)
     return config
 
-def summarize_text(text, config):
+def _chat_function(ollama_config):
+    """Return the chat callable for the configured Ollama host.
+
+    Requests go through the process-wide :class:`client.OllamaClient` for
+    these settings, which applies ``timeout`` and ``retry_attempts``. Without
+    a ``host`` entry the ``OLLAMA_HOST`` environment variable is honoured.
+    With an ``endpoints`` list they go through the process-wide
+    :class:`dispatch.Dispatcher` instead.
+    """
+    if ollama_config.get('endpoints'):
+        return get_dispatcher(ollama_config).chat
+    return get_client(ollama_config).chat
+
+def _map_ordered(fn, items, max_concurrency, executor=None):
+    """Apply ``fn`` to ``items`` on a bounded pool, yielding results in order.
+
+    Args:
+        fn (Callable): Function to apply to each item.
+        items (Iterable): Items to process.
+        max_concurrency (int): Number of workers when no executor is given.
+        executor (Executor, optional): Shared worker pool to submit to.
+
+    Yields:
+        Result of ``fn`` for each item, in input order.
+    """
+    if executor is None and max_concurrency == 1:
+        for item in items:
+            yield fn(item)
+        return
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ThreadPoolExecutor(max_workers=max_concurrency,
+                                      thread_name_prefix='summarise')
+    # Keep a bounded window of submitted requests so a long document never
+    # queues all of its chunks at once, while the pool always has work ready.
+    window = 2 * max_concurrency
+    pending = deque()
+    try:
+        for item in items:
+            pending.append(executor.submit(fn, item))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+        if own_executor:
+            executor.shutdown(wait=True)
+
+def _max_concurrency(config):
+    """Requests in flight at once: ``ollama.max_concurrency``, or the sum over ``ollama.endpoints``."""
+    total = total_concurrency(config['ollama'])
+    if total is not None:
+        return total
+    return max(1, int(config['ollama'].get('max_concurrency', 1)))
+
+class _OrderedTokens:
+    """Pass streamed summary pieces on in chunk order.
+
+    Pieces of the chunk whose turn it is are passed to ``emit(index, piece)``
+    as they arrive, from whichever thread receives them; pieces of later
+    chunks are held until the chunks before them are finished. Calls to
+    ``emit`` and ``end(index, summary)`` are serialised and in order. Once
+    ``emit`` raises, every later piece raises the same error, so the
+    requests still streaming stop at their next piece.
+    """
+
+    def __init__(self, emit, end=None):
+        self._emit = emit
+        self._end = end
+        self._lock = threading.Lock()
+        self._next = 0
+        self._sent = 0
+        self._pending = {}
+        self._error = None
+
+    def callback(self, index):
+        """Return the ``on_token`` callback for chunk ``index``."""
+        return lambda piece: self.token(index, piece)
+
+    def token(self, index, piece):
+        with self._lock:
+            if self._error is not None:
+                raise self._error
+            if index == self._next:
+                self._send(index, piece)
+            else:
+                self._pending.setdefault(index, []).append(piece)
+
+    def _send(self, index, piece):
+        self._sent += len(piece)
+        try:
+            self._emit(index, piece)
+        except Exception as e:
+            self._error = e
+            raise
+
+    def finish(self, index, summary):
+        """Mark chunk ``index`` done; chunks must be finished in order.
+
+        Whatever part of ``summary`` was not streamed (all of it for cached
+        or checkpointed chunks) is emitted first.
+        """
+        with self._lock:
+            if self._error is not None:
+                raise self._error
+            if summary[self._sent:]:
+                self._send(index, summary[self._sent:])
+            if self._end is not None:
+                self._end(index, summary)
+            self._next = index + 1
+            self._sent = 0
+            for piece in self._pending.pop(self._next, ()):
+                self._send(self._next, piece)
+
+def _chunk_summarizer(config):
+    """Build the function that summarizes a single chunk.
+
+    The function takes the chunk and an optional ``on_token(piece)``
+    callback. With ``ollama.stream`` set the response is streamed and the
+    callback gets each piece as it arrives; otherwise it is not called.
+    With ``lookup`` false the cache is not consulted, only updated.
+
+    Returns:
+        Tuple[Callable, SummaryCache]: The function and the cache it
+        consults, which is ``None`` when caching is disabled.
+    """
+    prompt = config['prompt_template']
+    ollama_config = config['ollama']
+    model = ollama_config['model']
+    stream = ollama_config.get('stream', False)
+    profiler = get_profiler()
+    chat_fn = _chat_function(ollama_config)
+    cache = get_cache(config)
+
+    def summarize_chunk(chunk, on_token=None, lookup=True):
+        if cache is not None:
+            key = cache.make_key(model, prompt, chunk)
+            summary = cache.get(key) if lookup else None
+            if summary is not None:
+                return summary
+        messages = [{"role": "user", "content": f"{prompt}\n\n{chunk}"}]
+        with profiler.stage('chat', len(chunk), memory=False) as stage:
+            if stream:
+                pieces = []
+                for part in chat_fn(model=model, messages=messages, stream=True):
+                    piece = part.message.content
+                    if piece:
+                        pieces.append(piece)
+                        if on_token is not None:
+                            on_token(piece)
+                summary = ''.join(pieces)
+            else:
+                response = chat_fn(model=model, messages=messages)
+                # Access the content of the response
+                summary = response.message.content
+            stage.output(len(summary))
+        if cache is not None:
+            cache.put(key, summary)
+        return summary
+
+    return summarize_chunk, cache
+
+def _pack_summarizer(config, summarize_chunk, cache):
+    """Build the function that summarizes a pack of chunks in one request.
+
+    Chunks found in the cache are not sent. When more than one is left,
+    they go to the model together in a prompt from
+    :func:`packing.build_packed_prompt`. If the reply can't be split back
+    into one summary per chunk, each chunk is sent on its own with
+    ``summarize_chunk``. A single chunk is always sent on its own, so it is
+    still streamed.
+
+    Returns:
+        Callable: Takes the chunks of a pack and an optional
+        ``callback(position)`` giving the ``on_token`` callback of the chunk
+        at that position, and returns their summaries in order.
+    """
+    prompt = config['prompt_template']
+    model = config['ollama']['model']
+    instructions = config.get('packing', {}).get('instructions', DEFAULT_INSTRUCTIONS)
+    profiler = get_profiler()
+    chat_fn = _chat_function(config['ollama'])
+
+    def summarize_pack(chunks, callback=None):
+        request = PackRequest(chunks)
+        if cache is not None:
+            keys = [cache.make_key(model, prompt, chunk) for chunk in chunks]
+            request = PackRequest(chunks, [cache.get(key) for key in keys])
+        if request.packed:
+            content = request.prompt(prompt, instructions)
+            with profiler.stage('chat', len(content), memory=False) as stage:
+                response = chat_fn(model=model, messages=[{"role": "user", "content": content}])
+                stage.output(len(response.message.content))
+            for i in request.accept(response.message.content):
+                if cache is not None:
+                    cache.put(keys[i], request.summaries[i])
+        for i in request.todo:
+            request.summaries[i] = summarize_chunk(
+                chunks[i], callback(i) if callback else None, lookup=False)
+        return request.summaries
+
+    return summarize_pack
+
+def _map_chunks(resolve, resolve_pack, chunks, config, executor=None):
+    """Apply ``resolve`` to each ``(index, chunk)`` on the request pool, in order.
+
+    With ``packing.enabled`` set, consecutive chunks are grouped by
+    :func:`packing.pack_chunks` and ``resolve_pack`` is applied to each
+    pack instead, returning one result per chunk.
+
+    Yields:
+        The result for each chunk, in chunk order.
+    """
+    items = enumerate(chunks)
+    settings = packing_settings(config)
+    if settings is None:
+        yield from _map_ordered(resolve, items, _max_concurrency(config), executor)
+        return
+    packs = _map_ordered(resolve_pack, pack_chunks(items, **settings),
+                         _max_concurrency(config), executor)
+    try:
+        for results in packs:
+            yield from results
+    finally:
+        packs.close()
+
+def summarize_chunks(chunks, config, executor=None, on_token=None):
+    """Summarize already chunked text using Ollama.
+
+    Up to ``ollama.max_concurrency`` chunk requests are in flight at once;
+    summaries are still yielded in the original chunk order. When the
+    ``cache`` section is enabled, chunks summarized before with the same
+    model and prompt are served from the on-disk cache. With
+    ``packing.enabled`` set, short consecutive chunks share one request.
+
+    Args:
+        chunks (Iterable[str]): Text chunks to summarize.
+        config (dict): Configuration settings.
+        executor (Executor, optional): Shared worker pool to submit requests
+            to instead of creating one for this call.
+        on_token (Callable[[int, str], None], optional): Called with the
+            chunk index and each piece of its summary, in chunk order. With
+            ``ollama.stream`` set, pieces arrive while the model generates;
+            otherwise each summary is passed whole once it is done.
+
+    Yields:
+        str: Summarized text chunks.
+    """
+    summarize_chunk, cache = _chunk_summarizer(config)
+    summarize_pack = _pack_summarizer(config, summarize_chunk, cache)
+    tokens = _OrderedTokens(on_token) if on_token is not None else None
+
+    def summarize(item):
+        index, chunk = item
+        return summarize_chunk(chunk, tokens.callback(index) if tokens else None)
+
+    def summarize_packed(pack):
+        callback = _pack_callback(tokens, [index for index, _ in pack])
+        return summarize_pack([chunk for _, chunk in pack], callback)
+
+    try:
+        for index, summary in enumerate(_map_chunks(
+                summarize, summarize_packed, chunks, config, executor)):
+            if tokens is not None:
+                tokens.finish(index, summary)
+            yield summary
+    finally:
+        if cache is not None:
+            cache.log_stats()
+
+def _pack_callback(tokens, indices):
+    """The ``callback(position)`` of a pack summarizer for chunks ``indices``."""
+    if tokens is None:
+        return None
+    return lambda position: tokens.callback(indices[position])
+
+def _checkpointed(journal, completed, index, chunk):
+    """Digest of chunk ``index`` and its summary in ``completed``, if still valid.
+
+    Returns:
+        Tuple[str, str]: The digest, and the checkpointed summary or
+        ``None`` when the chunk has to be summarized.
+    """
+    digest = journal.chunk_digest(chunk)
+    done = completed.get(index)
+    if done is not None and done[0] == digest:
+        return digest, done[1]
+    return digest, None
+
+class _CheckpointedPack:
+    """Checkpoint bookkeeping of a pack of ``(index, chunk)`` items.
+
+    ``results`` holds an ``(index, digest, summary, was_done)`` entry per
+    item; the chunks that are not checkpointed are summarized together and
+    passed to :meth:`fill`.
+    """
+
+    def __init__(self, journal, completed, pack):
+        self.results = []
+        self._todo = []
+        for index, chunk in pack:
+            digest, summary = _checkpointed(journal, completed, index, chunk)
+            if summary is not None:
+                self.results.append((index, digest, summary, True))
+            else:
+                self._todo.append((len(self.results), chunk))
+                self.results.append((index, digest, None, False))
+
+    def indices(self):
+        """Indices of the chunks to summarize."""
+        return [self.results[i][0] for i, _ in self._todo]
+
+    def chunks(self):
+        """The chunks to summarize."""
+        return [chunk for _, chunk in self._todo]
+
+    def fill(self, summaries):
+        """Record the summaries of :meth:`chunks` and return ``results``."""
+        for (i, _), summary in zip(self._todo, summaries):
+            index, digest, _, _ = self.results[i]
+            self.results[i] = (index, digest, summary, False)
+        return self.results
+
+def _summarize_with_journal(chunks, config, journal, completed, executor=None, tokens=None):
+    """Summarize chunks, recording each one in a checkpoint journal.
+
+    A chunk whose index and content match an entry in ``completed`` reuses
+    the recorded summary instead of calling the model. Streamed pieces go
+    to ``tokens``, an :class:`_OrderedTokens`, if given.
+
+    Yields:
+        str: Summarized text chunks, in chunk order.
+    """
+    summarize_chunk, cache = _chunk_summarizer(config)
+    summarize_pack = _pack_summarizer(config, summarize_chunk, cache)
+    reused = 0
+
+    def resolve(item):
+        index, chunk = item
+        digest, summary = _checkpointed(journal, completed, index, chunk)
+        if summary is not None:
+            return index, digest, summary, True
+        on_token = tokens.callback(index) if tokens is not None else None
+        return index, digest, summarize_chunk(chunk, on_token), False
+
+    def resolve_pack(pack):
+        pending = _CheckpointedPack(journal, completed, pack)
+        callback = _pack_callback(tokens, pending.indices())
+        return pending.fill(summarize_pack(pending.chunks(), callback))
+
+    try:
+        for index, digest, summary, was_done in _map_chunks(
+                resolve, resolve_pack, chunks, config, executor):
+            journal.record(index, digest, summary)
+            reused += was_done
+            if tokens is not None:
+                tokens.finish(index, summary)
+            yield summary
+    finally:
+        if completed:
+            _logger.info(f"Reused {reused} of {len(completed)} checkpointed chunk summaries")
+        if cache is not None:
+            cache.log_stats()
+
+def summarize_text(text, config, executor=None, on_token=None):
     """Summarize the given text using Ollama.
 
     Args:
         text (str): Sanitized text.
         config (dict): Configuration settings.
+        executor (Executor, optional): Shared worker pool for chunk requests.
+        on_token (Callable[[int, str], None], optional): Called with each
+            piece of the summaries; see :func:`summarize_chunks`.
 
     Yields:
         str: Summarized text chunks.
     """
-    tokens = config['token_limit']
-    prompt = config['prompt_template']
-    ollama_config = config['ollama']
+    config = apply_profile(config)
+    chunks = chunk_text(text, **chunk_settings(config))
+    yield from summarize_chunks(chunks, config, executor, on_token)
 
-    chunks = chunk_text(text, tokens)
+_DONE = object()
 
-    for chunk in chunks:
-        response = chat(
-            model=ollama_config['model'],
-            messages=[{"role": "user", "content": f"{prompt}\n\n{chunk}"}]
-        )
-        # Access the content of the response
-        yield response.message.content
+# Pieces that may wait for the consumer of iter_summary_tokens
+_MAX_PENDING_PIECES = 1024
 
-def process_file(file_path, config):
-    """Process and summarize the given file.
+class _Stopped(Exception):
+    """The consumer of :func:`iter_summary_tokens` has stopped reading."""
+
+def iter_summary_tokens(text, config, executor=None):
+    """Summarize text, yielding the pieces of each summary as they arrive.
+
+    With ``ollama.stream`` set this yields pieces while the model is still
+    generating, so the first output appears within seconds. Summarization
+    runs on a background thread, which waits when the consumer falls
+    behind. Closing the generator early cancels the chunks not yet sent,
+    and requests still streaming stop at their next piece.
 
     Args:
-        file_path (str): Path to the input file.
+        text (str): Sanitized text.
         config (dict): Configuration settings.
+        executor (Executor, optional): Shared worker pool for chunk requests.
+
+    Yields:
+        Tuple[int, str]: The chunk index and a piece of its summary, in
+        chunk order.
     """
-    _, ext = os.path.splitext(file_path)
+    pieces = queue.Queue(maxsize=_MAX_PENDING_PIECES)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                pieces.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+        raise _Stopped()
+
+    def run():
+        try:
+            for _ in summarize_text(text, config, executor,
+                                    on_token=lambda index, piece: put((index, piece))):
+                pass
+            put(_DONE)
+        except _Stopped:
+            _logger.debug("Token consumer stopped; summarization cancelled")
+        except BaseException as e:
+            try:
+                put(e)
+            except _Stopped:
+                pass
+
+    threading.Thread(target=run, name='summarise-tokens', daemon=True).start()
+    try:
+        while True:
+            item = pieces.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+# Suffixes of the files written next to each input; never treated as inputs
+OUTPUT_SUFFIXES = ('-metadata.txt', '-summary.txt', '_summarised.txt',
+                   '-questions.txt', '-preprocessed.txt', '-checkpoint.jsonl')
+
+def _output_paths(file_path):
+    """Return the input directory, base name and output paths for a file."""
     input_dir = os.path.dirname(os.path.abspath(file_path))
     base_name = os.path.splitext(os.path.basename(file_path))[0]
+    return {
+        'input_dir': input_dir,
+        'base_name': base_name,
+        'metadata': os.path.join(input_dir, f"{base_name}-metadata.txt"),
+        'summary': os.path.join(input_dir, f"{base_name}-summary.txt"),
+        'final_summary': os.path.join(input_dir, f"{base_name}_summarised.txt"),
+        'checkpoint': os.path.join(input_dir, f"{base_name}-checkpoint.jsonl"),
+    }
 
-    # Create output paths
-    metadata_path = os.path.join(input_dir, f"{base_name}-metadata.txt")
-    summary_path = os.path.join(input_dir, f"{base_name}-summary.txt")
-    final_summary_path = os.path.join(input_dir, f"{base_name}_summarised.txt")
+def prepare_file(file_path, config):
+    """Convert, sanitize and preprocess a file ahead of summarization.
+
+    Writes the metadata file and returns what :func:`write_summaries` needs.
+    This is the CPU-bound half of :func:`process_file` and is safe to run in
+    a worker process.
+
+    Args:
+        file_path (str): Path to the input file.
+        config (dict): Configuration settings.
+
+    Returns:
+        Tuple[str, List[str]]: The selected text and initial summaries.
+    """
+    _, ext = os.path.splitext(file_path)
+    paths = _output_paths(file_path)
+    profiler = get_profiler()
 
     if ext.lower() == '.pdf' and config['conversion']['pdf_to_md']:
-        text = convert_pdf_to_md(file_path)
+        with profiler.stage('convert_pdf_to_md', os.path.getsize(file_path)) as stage:
+            text = convert_pdf_to_md(file_path, config['conversion'].get('pdf_workers', 1))
+            stage.output(len(text))
     else:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            text = f.read()
+        with profiler.stage('read_file', os.path.getsize(file_path)) as stage:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                text = f.read()
+            stage.output(len(text))
 
-    sanitized = sanitize_text(text)
+    with profiler.stage('sanitize_text', len(text)) as stage:
+        sanitized = sanitize_text(text)
+        stage.output(len(sanitized))
     
     # Preprocess the text and get initial metadata/summaries
-    selected_text, initial_summaries = preprocess_text(sanitized, config, base_name, input_dir)
+    with profiler.stage('preprocess_text', len(sanitized)) as stage:
+        selected_text, initial_summaries = preprocess_text(
+            sanitized, config, paths['base_name'], paths['input_dir'])
+        stage.output(len(selected_text))
     
     # Save metadata separately
-    with open(metadata_path, 'w', encoding='utf-8') as f:
+    with open(paths['metadata'], 'w', encoding='utf-8') as f:
         f.write('\n'.join(initial_summaries))
-    
+
+    return selected_text, initial_summaries
+
+def _write_summary_header(f, initial_summaries):
+    """Write the metadata part of the ``-summary.txt`` file."""
+    f.write('\n\n=== Initial Metadata and Key Points ===\n\n')
+    f.write('\n'.join(initial_summaries))
+    f.write('\n\n=== Generated Summaries ===\n\n')
+
+class _SummaryWriter:
+    """Write summary pieces to the output files, one chunk after another.
+
+    Blank summaries are skipped, so leading whitespace is held back until
+    a chunk's first visible piece. Unless ``flush`` is false, every write
+    is flushed to disk at once.
+    """
+
+    def __init__(self, outputs, on_token=None, flush=True):
+        self.outputs = outputs
+        self.on_token = on_token
+        self.flush = flush
+        self._held = ''
+        self._started = False
+
+    def write(self, index, piece):
+        if self.on_token is not None:
+            self.on_token(index, piece)
+        if not self._started:
+            if not piece.strip():
+                self._held += piece
+                return
+            piece, self._held, self._started = self._held + piece, '', True
+        for out in self.outputs:
+            out.write(piece)
+            if self.flush:
+                out.flush()  # Ensure immediate writing
+
+    def end(self, index, summary):
+        if self._started:
+            for out in self.outputs:
+                out.write("\n\n")
+                if self.flush:
+                    out.flush()
+        self._held = ''
+        self._started = False
+
+def write_chunk_summaries(file_path, chunks, config, initial_summaries=None,
+                          executor=None, resume=False, on_token=None):
+    """Summarize chunks and write the summary files for a file.
+
+    Each finished chunk is recorded in a ``-checkpoint.jsonl`` journal next
+    to the outputs, which is removed once the document is complete. With
+    ``resume``, chunks whose summary is already in the journal are not sent
+    to the model again.
+
+    When ``initial_summaries`` is ``None`` (they are not known yet, as in
+    streaming mode), only the final summary file is written; call
+    :func:`write_summary_file` once they are.
+
+    With ``ollama.stream`` set, summaries are written to the files piece
+    by piece as the model generates them, still in chunk order.
+
+    Args:
+        file_path (str): Path to the input file.
+        chunks (Iterable[str]): Text chunks to summarize, possibly lazy.
+        config (dict): Configuration settings.
+        initial_summaries (List[str], optional): Metadata for the summary file.
+        executor (Executor, optional): Shared worker pool for chunk requests.
+        resume (bool): Reuse summaries from an existing checkpoint journal.
+        on_token (Callable[[int, str], None], optional): Also called with
+            each piece written; see :func:`summarize_chunks`.
+
+    Returns:
+        List[str]: The non-empty chunk summaries that were written.
+    """
+    paths = _output_paths(file_path)
+    summary_path = paths['summary']
+
+    journal = CheckpointJournal(paths['checkpoint'], CheckpointJournal.make_fingerprint(
+        config['ollama']['model'], config['prompt_template']))
+    completed = journal.load() if resume else {}
+    if completed:
+        _logger.info(f"Resuming {file_path} from {len(completed)} checkpointed chunks")
+
     # Process chunks with Ollama
-    with open(summary_path, 'w', encoding='utf-8') as f, \
-         open(final_summary_path, 'w', encoding='utf-8') as final_f:
-        
-        # Write initial summaries first
-        f.write('\n\n=== Initial Metadata and Key Points ===\n\n')
-        f.write('\n'.join(initial_summaries))
-        f.write('\n\n=== Generated Summaries ===\n\n')
-        
+    with ExitStack() as stack:
+        stage = stack.enter_context(get_profiler().stage('summarize'))
+        outputs = [stack.enter_context(open(paths['final_summary'], 'w', encoding='utf-8'))]
+        if initial_summaries is not None:
+            f = stack.enter_context(open(summary_path, 'w', encoding='utf-8'))
+            # Write initial summaries first
+            _write_summary_header(f, initial_summaries)
+            outputs.append(f)
+        stack.enter_context(journal.start())
+        writer = _SummaryWriter(outputs, on_token)
+        tokens = _OrderedTokens(writer.write, writer.end)
+
         # Process text chunks with Ollama
-        for chunk_summary in summarize_text(selected_text, config):
+        written = []
+        for chunk_summary in _summarize_with_journal(chunks, config, journal, completed,
+                                                     executor, tokens):
             if chunk_summary and chunk_summary.strip():
-                f.write(f"{chunk_summary}\n\n")
-                final_f.write(f"{chunk_summary}\n\n")
-                _logger.info(f"Wrote summary chunk to {summary_path}")
-                final_f.flush()  # Ensure immediate writing
-                f.flush()
-
-    _logger.info(f"Completed summarization. Files saved in {input_dir}")
-    return final_summary_path
+                written.append(chunk_summary)
+                _logger.info(f"Wrote summary chunk to {paths['final_summary']}")
+        stage.output(sum(map(len, written)))
+
+    journal.remove()
+    _logger.info(f"Completed summarization. Files saved in {paths['input_dir']}")
+    return written
+
+def write_summary_file(file_path, initial_summaries):
+    """Write the ``-summary.txt`` file from metadata and the final summary.
+
+    Args:
+        file_path (str): Path to the input file.
+        initial_summaries (List[str]): Metadata and key points.
+    """
+    paths = _output_paths(file_path)
+    with open(paths['summary'], 'w', encoding='utf-8') as f, \
+         open(paths['final_summary'], 'r', encoding='utf-8') as final_f:
+        _write_summary_header(f, initial_summaries)
+        shutil.copyfileobj(final_f, f)
+
+def write_reduced_summary(file_path, chunk_summaries, config, executor=None):
+    """Replace the final summary with a hierarchical reduction, if enabled.
+
+    With ``reduce.enabled`` set, the chunk summaries stay in the
+    ``-summary.txt`` file and the ``_summarised.txt`` file is rewritten with
+    the output of :func:`reduce.reduce_summaries`.
+
+    Args:
+        file_path (str): Path to the input file.
+        chunk_summaries (List[str]): Chunk summaries in document order.
+        config (dict): Configuration settings.
+        executor (Executor, optional): Shared worker pool for requests.
+    """
+    if not config.get('reduce', {}).get('enabled', False):
+        return
+    from .reduce import reduce_summaries
+    with get_profiler().stage('reduce', sum(map(len, chunk_summaries))) as stage:
+        reduced = reduce_summaries(chunk_summaries, config, executor)
+        stage.output(len(reduced))
+    final_summary_path = _output_paths(file_path)['final_summary']
+    with open(final_summary_path, 'w', encoding='utf-8') as f:
+        f.write(f"{reduced}\n")
+    _logger.info(f"Wrote reduced summary to {final_summary_path}")
+
+def write_summaries(file_path, selected_text, initial_summaries, config,
+                    executor=None, resume=False, on_token=None):
+    """Summarize prepared text and write the summary files for a file.
+
+    Args:
+        file_path (str): Path to the input file.
+        selected_text (str): Text returned by :func:`prepare_file`.
+        initial_summaries (List[str]): Summaries returned by :func:`prepare_file`.
+        config (dict): Configuration settings.
+        executor (Executor, optional): Shared worker pool for chunk requests.
+        resume (bool): Reuse summaries from an existing checkpoint journal.
+        on_token (Callable[[int, str], None], optional): Called with each
+            piece of the chunk summaries; see :func:`summarize_chunks`.
+
+    Returns:
+        str: Path to the final summary file.
+    """
+    config = apply_profile(config)
+    with get_profiler().stage('chunk_text', len(selected_text)) as stage:
+        chunks = chunk_text(selected_text, **chunk_settings(config))
+        stage.output(len(chunks))
+    chunk_summaries = write_chunk_summaries(file_path, chunks, config, initial_summaries,
+                                            executor=executor, resume=resume,
+                                            on_token=on_token)
+    write_reduced_summary(file_path, chunk_summaries, config, executor)
+    return _output_paths(file_path)['final_summary']
+
+def use_streaming(file_path, config):
+    """Whether a file should go through :func:`pipeline.process_file_streaming`.
+
+    True when ``streaming.enabled`` is set, or when the file is at least
+    ``streaming.auto_threshold_mb`` large: reading such a file whole, with
+    the copies sanitisation and preprocessing make, can exhaust memory.
+    """
+    streaming = config.get('streaming', {})
+    if streaming.get('enabled', False):
+        return True
+    threshold_mb = streaming.get('auto_threshold_mb')
+    if threshold_mb is not None and os.path.getsize(file_path) >= threshold_mb * 1024 * 1024:
+        _logger.info(f"{file_path} is larger than {threshold_mb} MB; summarizing it in streaming mode")
+        return True
+    return False
+
+def process_file(file_path, config, resume=False, on_token=None):
+    """Process and summarize the given file.
+
+    With ``streaming.enabled`` set, or for files of at least
+    ``streaming.auto_threshold_mb``, the file goes through
+    :func:`pipeline.process_file_streaming` instead.
+
+    Args:
+        file_path (str): Path to the input file.
+        config (dict): Configuration settings.
+        resume (bool): Skip chunks recorded in an earlier, interrupted run.
+        on_token (Callable[[int, str], None], optional): Called with each
+            piece of the chunk summaries as it is written; with
+            ``ollama.stream`` set, pieces arrive while the model generates.
+
+    Returns:
+        str: Path to the final summary file.
+    """
+    if use_streaming(file_path, config):
+        from .pipeline import process_file_streaming
+        return process_file_streaming(file_path, config, resume=resume, on_token=on_token)
+
+    selected_text, initial_summaries = prepare_file(file_path, config)
+    return write_summaries(file_path, selected_text, initial_summaries, config,
+                           resume=resume, on_token=on_token)
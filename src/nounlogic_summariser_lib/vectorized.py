@@ -0,0 +1,137 @@
+"""
+NumPy/SciPy implementations of the document-wide scoring steps.
+
+Each :class:`document.Document` gets a dense vocabulary index and a sparse
+sentence-by-term matrix, and similarities and scores are computed as array operations on
+it. The results are the same as those of the pure-Python functions in
+:mod:`preprocessing`, which remain the fallback when NumPy or SciPy is not
+installed; see :func:`preprocessing.score_sentences` for how a backend is
+chosen.
+"""
+
+import importlib.util
+import math
+from functools import lru_cache
+
+@lru_cache(maxsize=None)
+def available():
+    """Whether NumPy and SciPy can be imported."""
+    return all(importlib.util.find_spec(name) is not None for name in ('numpy', 'scipy'))
+
+def _index(document):
+    """Number the words of a document 0, 1, ... in order of first appearance.
+
+    Returns:
+        Tuple[ndarray, ndarray, ndarray, ndarray]: The document word id of
+        each dense id, the dense id of every token in order, the sentence
+        of every token and the number of tokens per sentence.
+    """
+    import numpy as np
+
+    # Document ids are first-token positions, so sorting them keeps the order
+    positions = np.frombuffer(document.word_ids, dtype=np.int32)
+    word_ids, ids = np.unique(positions, return_inverse=True)
+    lengths = np.diff(np.frombuffer(document.word_bounds, dtype=np.int64))
+    rows = np.repeat(np.arange(len(document)), lengths)
+    return word_ids, ids.reshape(-1), rows, lengths
+
+def term_matrix(document):
+    """Build the binary sentence-by-term matrix of a document.
+
+    Returns:
+        scipy.sparse.csr_matrix: Entry ``(i, j)`` is 1 when sentence ``i``
+        contains the ``j``-th distinct word.
+    """
+    import numpy as np
+    from scipy import sparse
+
+    word_ids, ids, rows, _ = _index(document)
+    matrix = sparse.csr_matrix((np.ones(len(ids), dtype=np.int32), (rows, ids)),
+                               shape=(len(document), len(word_ids)))
+    matrix.sum_duplicates()
+    matrix.data[:] = 1
+    return matrix
+
+def score_sentences(document, synonyms):
+    """Vectorised :func:`preprocessing.score_sentences`.
+
+    Args:
+        document (Document): The tokenised document.
+        synonyms (Dict[str, List[str]]): Synonyms earning a key phrase bonus.
+
+    Returns:
+        List[float]: Importance score of each sentence.
+    """
+    import numpy as np
+
+    word_ids, ids, rows, lengths = _index(document)
+    total = len(document)
+
+    # The log is taken once per distinct word with math.log, and bincount
+    # adds each sentence's terms in order, so scores match the Python path
+    counts = np.bincount(ids, minlength=len(word_ids))
+    log_freq = np.array([math.log(1 + count) for count in counts.tolist()], dtype=np.float64)
+    scores = np.bincount(rows, weights=log_freq[ids], minlength=total).astype(np.float64)
+
+    for words in synonyms.values():
+        for word in words:
+            word_id = document.word_id(word)
+            if word_id is not None:
+                present = np.zeros(total, dtype=bool)
+                present[rows[ids == np.searchsorted(word_ids, word_id)]] = True
+                scores[present] += 2
+
+    scores /= lengths + 1
+
+    # Repeated sentences take the position of their first occurrence
+    first_position = {}
+    sentences = document.sentences()
+    positions = np.fromiter(map(first_position.setdefault, sentences, range(total)),
+                            dtype=np.int64, count=total)
+    if total > 0:
+        scores[(positions < total * 0.2) | (positions > total * 0.8)] *= 1.2
+    return scores.tolist()
+
+def discard_close_sentences(document, common_words_threshold):
+    """Vectorised sentence filter of :func:`preprocessing.discard_close_sentences`.
+
+    The overlap of every sentence with the one before it is computed in one
+    sparse product. A sentence is still compared with the last *kept*
+    sentence, so after a sentence is dropped the next overlap is computed
+    from the two rows of the matrix.
+
+    Args:
+        document (Document): The tokenised text.
+        common_words_threshold (int): Similarity threshold times ten.
+
+    Returns:
+        List[str]: The kept sentences.
+    """
+    import numpy as np
+
+    if not len(document):
+        return []
+    sentences = document.sentences()
+    matrix = term_matrix(document)
+    sizes = np.diff(matrix.indptr).tolist()
+    adjacent = np.asarray(matrix[1:].multiply(matrix[:-1]).sum(axis=1)).ravel().tolist()
+    threshold = common_words_threshold / 10
+
+    kept = [sentences[0]]
+    last = 0
+    for i in range(1, len(sentences)):
+        if sizes[last] == 0 or sizes[i] == 0:
+            similarity = 0
+        else:
+            if last == i - 1:
+                common = adjacent[i - 1]
+            else:
+                common = len(np.intersect1d(
+                    matrix.indices[matrix.indptr[last]:matrix.indptr[last + 1]],
+                    matrix.indices[matrix.indptr[i]:matrix.indptr[i + 1]],
+                    assume_unique=True))
+            similarity = common / (math.sqrt(sizes[last]) * math.sqrt(sizes[i]))
+        if similarity < threshold:
+            kept.append(sentences[i])
+            last = i
+    return kept
@@ -1,10 +1,225 @@
 """
-    Dummy conftest.py for nounlogic_summariser_lib.
+    Shared fixtures for nounlogic_summariser_lib.
+
+    ``fake_ollama`` starts a local HTTP server that speaks enough of the Ollama
+    ``/api/chat`` protocol for the summariser to talk to it, including streamed
+    replies, with configurable artificial latency so concurrency can be
+    measured without a real model. ``fake_ollama_servers`` starts several,
+    for multi-endpoint tests.
+
+    ``course_text`` returns the generator of synthetic NOUN-style course
+    material from ``course_text.py``, which exercises every preprocessing
+    step. ``make_config`` builds minimal configurations pointing at a fake
+    server, and ``shipped_config`` copies of the ``config.json`` shipped
+    with the package.
 
-    If you don't know what this is for, just leave it empty.
     Read more about conftest.py under:
     - https://docs.pytest.org/en/stable/fixture.html
     - https://docs.pytest.org/en/stable/writing_plugins.html
 """
 
-# import pytest
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from course_text import make_course_text
+
+
+PREPROCESSING = {
+    'tutor_marked_proximity': 3,
+    'tutor_marked_max_words': 100,
+    'summary_max_words': 100,
+    'number_proximity': 2,
+    'common_words_threshold': 5,
+    'capital_proximity': 2,
+    'toc_max_words': 500,
+}
+
+
+def make_config(host=None, ollama=None, files=False, **sections):
+    """Build a minimal configuration for the model ``fake-model`` at ``host``.
+
+    Args:
+        host (str, optional): URL of the fake server.
+        ollama (dict, optional): Settings added to the ``ollama`` section.
+        files (bool): Add the supported formats and preprocessing settings
+            needed to summarize whole files.
+        **sections: Top-level settings and sections, replacing the defaults.
+    """
+    config = {
+        'token_limit': 1000,
+        'prompt_template': 'Summarise:',
+        'ollama': {'model': 'fake-model', 'host': host, **(ollama or {})},
+        'conversion': {'pdf_to_md': True},
+    }
+    if files:
+        config['supported_formats'] = ['.txt', '.md', '.pdf']
+        config['preprocessing'] = dict(PREPROCESSING)
+    config.update(sections)
+    return config
+
+
+SHIPPED_CONFIG_PATH = os.path.join(os.path.dirname(__file__), '..', 'config.json')
+
+
+def shipped_config(host=None, **sections):
+    """Load a fresh copy of the shipped ``config.json``.
+
+    Args:
+        host (str, optional): URL of the fake server, set as ``ollama.host``.
+        **sections: Top-level settings and sections, replacing the shipped ones.
+    """
+    with open(SHIPPED_CONFIG_PATH, encoding='utf-8') as f:
+        config = json.load(f)
+    if host is not None:
+        config['ollama']['host'] = host
+    config.update(sections)
+    return config
+
+
+class FakeOllama:
+    """A minimal in-process stand-in for an Ollama server."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        # Seconds between streamed reply parts, when the client asks to stream
+        self.token_latency = 0.0
+        self.requests = []
+        # Client port of each request; repeats show reused connections
+        self.client_ports = []
+        self.inflight = 0
+        self.max_inflight = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def host(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def reply(self, content):
+        """Build the assistant reply for a prompt; tests may replace this."""
+        return f"summary: {content.split()[-1] if content.split() else ''}"
+
+    def status(self, content):
+        """HTTP status to answer with; tests may replace this to inject errors."""
+        return 200
+
+    def delay(self, content):
+        """Seconds to wait before answering; ``latency`` may be a callable."""
+        return self.latency(content) if callable(self.latency) else self.latency
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body are separate writes; avoid delayed-ACK stalls on kept-alive connections
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                content = body['messages'][-1]['content']
+                with fake._lock:
+                    fake.requests.append(body)
+                    fake.client_ports.append(self.client_address[1])
+                    fake.inflight += 1
+                    fake.max_inflight = max(fake.max_inflight, fake.inflight)
+                try:
+                    time.sleep(fake.delay(content))
+                    status = fake.status(content)
+                    if status == 200 and body.get('stream'):
+                        self._stream(body, fake.reply(content))
+                        return
+                    if status != 200:
+                        payload = json.dumps({'error': f"injected error {status}"}).encode('utf-8')
+                    else:
+                        payload = json.dumps({
+                            'model': body['model'],
+                            'created_at': '2024-01-01T00:00:00Z',
+                            'message': {'role': 'assistant', 'content': fake.reply(content)},
+                            'done': True,
+                        }).encode('utf-8')
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                finally:
+                    with fake._lock:
+                        fake.inflight -= 1
+
+            def _stream(self, body, reply):
+                """Send the reply word by word as newline-delimited JSON."""
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/x-ndjson')
+                # No length is known up front, so the reply ends with the connection
+                self.send_header('Connection', 'close')
+                self.close_connection = True
+                self.end_headers()
+                pieces = [word + ' ' for word in reply.split(' ')]
+                pieces[-1] = pieces[-1][:-1]
+                for piece in pieces + ['']:
+                    self.wfile.write(json.dumps({
+                        'model': body['model'],
+                        'created_at': '2024-01-01T00:00:00Z',
+                        'message': {'role': 'assistant', 'content': piece},
+                        'done': piece == '',
+                    }).encode('utf-8') + b'\n')
+                    self.wfile.flush()
+                    time.sleep(fake.token_latency)
+
+        return Handler
+
+
+@pytest.fixture
+def course_text():
+    return make_course_text
+
+
+@pytest.fixture(name='make_config')
+def make_config_fixture():
+    return make_config
+
+
+@pytest.fixture(name='shipped_config')
+def shipped_config_fixture():
+    return shipped_config
+
+
+@pytest.fixture
+def fake_ollama():
+    server = FakeOllama().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def fake_ollama_servers():
+    """Start ``n`` independent fake servers: ``fake_ollama_servers(n)``."""
+    servers = []
+
+    def start(n):
+        started = [FakeOllama().start() for _ in range(n)]
+        servers.extend(started)
+        return started
+
+    yield start
+    for server in servers:
+        server.stop()
@@ -0,0 +1,72 @@
+"""
+    Synthetic NOUN-style course material, shared by the tests and
+    ``benchmarks/run_benchmarks.py``.
+
+    Sections include headings, tutor-marked assignments, summaries, table of
+    contents lines and number runs, so every preprocessing step has work.
+"""
+
+import itertools
+import random
+
+__author__ = "nathfavour"
+__copyright__ = "nathfavour"
+__license__ = "MIT"
+
+
+VOCABULARY = (
+    "economics market price demand supply inflation policy government student "
+    "course unit module study theory analysis vital primary income trade money "
+    "bank interest growth labour capital production consumer firm cost"
+).split()
+
+
+def course_sections(seed=0):
+    """Yield the sections of an endless generated course.
+
+    Each section is a list of paragraphs: its text, now and then preceded
+    by a unit heading.
+    """
+    rng = random.Random(seed)
+    for i in itertools.count():
+        kind = rng.random()
+        sentences = [
+            ' '.join(rng.choice(VOCABULARY)
+                     for _ in range(rng.randint(2, 16))).capitalize()
+            + rng.choice(['.', '.', '.', '?', '!'])
+            for _ in range(rng.randint(1, 8))
+        ]
+        if kind < 0.1:
+            sentences.append("What is demand in the market economy today? Explain the "
+                             "law of demand with examples TUTOR MARKED ASSIGNMENT for "
+                             "this unit.")
+        if kind > 0.85:
+            sentences.append("Summary: the unit covered price theory and the role of "
+                             "the market in the economy.")
+        if 0.5 < kind < 0.6:
+            sentences.append(f"Contents of unit {i} for the course ........ then the "
+                             "COURSE OBJECTIVES include learning the theory of price.")
+        if 0.6 < kind < 0.65:
+            sentences.append("In conclusion, the course reviewed 1990 2000 2010 data "
+                             "on NATIONAL INCOME ACCOUNTS for the economy.")
+        paragraphs = [f"UNIT {i}: INTRODUCTION"] if kind > 0.95 else []
+        paragraphs.append(' '.join(sentences))
+        yield paragraphs
+
+
+def make_course_text(seed=0, n_sections=60):
+    """Generate a course document of ``n_sections`` sections."""
+    sections = itertools.islice(course_sections(seed), n_sections)
+    return '\n\n'.join(itertools.chain.from_iterable(sections))
+
+
+def make_course_document(size, seed=0):
+    """Generate a course document of at least ``size`` bytes."""
+    paragraphs = []
+    length = 0
+    for section in course_sections(seed):
+        if length >= size:
+            break
+        paragraphs.extend(section)
+        length += sum(len(paragraph) + 2 for paragraph in section)
+    return '\n\n'.join(paragraphs)
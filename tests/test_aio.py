@@ -0,0 +1,174 @@
+import asyncio
+import os
+import random
+import time
+
+import pytest
+from ollama import ResponseError
+
+from nounlogic_summariser_lib import summariser
+from nounlogic_summariser_lib.aio import aprocess_file, asummarize_chunks, asummarize_text
+from nounlogic_summariser_lib.summariser import process_file
+
+__author__ = "nathfavour"
+__copyright__ = "nathfavour"
+__license__ = "MIT"
+
+
+def question_text(n):
+    # Every '?' starts a new chunk, so this yields n + 1 chunks
+    return 'Intro ' + ' '.join(f"question{i}?" for i in range(n))
+
+
+def expected_summaries(n):
+    return ['summary: Intro'] + [f"summary: question{i}?" for i in range(n)]
+
+
+async def collect(summaries):
+    return [summary async for summary in summaries]
+
+
+def write_source(tmp_path, monkeypatch, n):
+    monkeypatch.setattr(summariser, 'preprocess_text',
+                        lambda text, config, name, input_dir: (question_text(n), ['META']))
+    source = tmp_path / 'module.txt'
+    source.write_text('placeholder', encoding='utf-8')
+    return str(source)
+
+
+def test_asummarize_text_keeps_order(fake_ollama, make_config):
+    rng = random.Random(3)
+    fake_ollama.latency = lambda content: rng.uniform(0.0, 0.05)
+    config = make_config(fake_ollama.host, {'max_concurrency': 4})
+    summaries = asyncio.run(collect(asummarize_text(question_text(20), config)))
+    assert summaries == expected_summaries(20)
+    assert 1 < fake_ollama.max_inflight <= 4
+
+
+def test_shared_semaphore_bounds_all_documents(fake_ollama, make_config):
+    fake_ollama.latency = 0.05
+    config = make_config(fake_ollama.host, {'max_concurrency': 4})
+
+    async def main():
+        semaphore = asyncio.Semaphore(3)
+        return await asyncio.gather(*(
+            collect(asummarize_text(question_text(n), config, semaphore)) for n in range(2, 8)))
+
+    start = time.perf_counter()
+    results = asyncio.run(main())
+    elapsed = time.perf_counter() - start
+
+    assert results == [expected_summaries(n) for n in range(2, 8)]
+    assert fake_ollama.max_inflight == 3
+    # 39 requests, three at a time
+    assert elapsed < 39 * 0.05 / 2
+
+
+def test_streamed_tokens_arrive_in_order(fake_ollama, make_config):
+    rng = random.Random(7)
+    fake_ollama.latency = lambda content: rng.uniform(0.0, 0.03)
+    fake_ollama.token_latency = 0.002
+    fake_ollama.reply = lambda content: f"summary of {content.split()[-1]} ok"
+    config = make_config(fake_ollama.host, {'max_concurrency': 3, 'stream': True})
+    pieces = []
+
+    summaries = asyncio.run(collect(asummarize_text(
+        question_text(10), config, on_token=lambda i, piece: pieces.append((i, piece)))))
+
+    assert all(body['stream'] for body in fake_ollama.requests)
+    assert len(pieces) > 11
+    assert [i for i, _ in pieces] == sorted(i for i, _ in pieces)
+    for i, summary in enumerate(summaries):
+        assert ''.join(piece for j, piece in pieces if j == i) == summary
+
+
+def test_request_timeout(fake_ollama, make_config):
+    fake_ollama.latency = lambda content: 1.0 if 'question1?' in content else 0.0
+    config = make_config(fake_ollama.host, {'max_concurrency': 2, 'request_timeout': 0.2})
+    start = time.perf_counter()
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(collect(asummarize_text(question_text(3), config)))
+    assert time.perf_counter() - start < 0.8
+
+
+def test_cancel_stops_outstanding_requests(fake_ollama, make_config):
+    fake_ollama.latency = 0.3
+    config = make_config(fake_ollama.host, {'max_concurrency': 2})
+
+    async def main():
+        task = asyncio.create_task(collect(asummarize_chunks(
+            [f"chunk {i}" for i in range(10)], config)))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    time.sleep(0.4)
+    # Only the requests in flight when the task was cancelled were sent
+    assert len(fake_ollama.requests) == 2
+
+
+def test_errors_propagate(fake_ollama, make_config):
+    fake_ollama.status = lambda content: 404 if 'question2?' in content else 200
+    with pytest.raises(ResponseError):
+        asyncio.run(collect(asummarize_text(question_text(4), make_config(fake_ollama.host))))
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_aprocess_file_matches_process_file(fake_ollama, make_config, tmp_path, monkeypatch,
+                                            stream):
+    source = write_source(tmp_path, monkeypatch, 12)
+    config = make_config(fake_ollama.host, {'max_concurrency': 3, 'stream': stream})
+    with open(process_file(source, config), encoding='utf-8') as f:
+        expected = f.read()
+    expected_summary = (tmp_path / 'module-summary.txt').read_text(encoding='utf-8')
+    os.remove(tmp_path / 'module-summary.txt')
+
+    final_path = asyncio.run(aprocess_file(source, config))
+
+    with open(final_path, encoding='utf-8') as f:
+        assert f.read() == expected
+    assert (tmp_path / 'module-summary.txt').read_text(encoding='utf-8') == expected_summary
+    assert not os.path.exists(tmp_path / 'module-checkpoint.jsonl')
+
+
+def test_aprocess_file_reduces(fake_ollama, make_config, tmp_path, monkeypatch):
+    source = write_source(tmp_path, monkeypatch, 12)
+    config = make_config(fake_ollama.host, {'max_concurrency': 3})
+    config['reduce'] = {'enabled': True, 'batch_size': 4, 'target_words': 5}
+    with open(process_file(source, config), encoding='utf-8') as f:
+        expected = f.read()
+    sync_requests = len(fake_ollama.requests)
+
+    with open(asyncio.run(aprocess_file(source, config)), encoding='utf-8') as f:
+        assert f.read() == expected
+    assert len(fake_ollama.requests) == 2 * sync_requests
+
+
+def test_aprocess_file_resume_after_cancel(fake_ollama, make_config, tmp_path, monkeypatch):
+    source = write_source(tmp_path, monkeypatch, 6)
+    config = make_config(fake_ollama.host)
+    checkpoint = tmp_path / 'module-checkpoint.jsonl'
+    fake_ollama.latency = lambda content: 5.0 if 'question3?' in content else 0.0
+
+    async def cancel_when_stuck():
+        task = asyncio.create_task(aprocess_file(source, config))
+        while len(fake_ollama.requests) < 5:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_when_stuck())
+    assert checkpoint.exists()
+
+    fake_ollama.latency = 0.0
+    final_path = asyncio.run(aprocess_file(source, config, resume=True))
+
+    # Only the interrupted chunk and the ones after it go back to the model
+    assert len(fake_ollama.requests) == 8
+    expected = ''.join(f"{summary}\n\n" for summary in expected_summaries(6))
+    with open(final_path, encoding='utf-8') as f:
+        assert f.read() == expected
+    assert not os.path.exists(checkpoint)
@@ -0,0 +1,163 @@
+import json
+import logging
+import threading
+import time
+
+import pytest
+
+from nounlogic_summariser_lib.autotune import (
+    _calibration_chunks,
+    apply_profile,
+    autotune,
+    choose_settings,
+    estimate_seconds,
+    fit_latency,
+    load_profiles,
+    save_profile,
+)
+from nounlogic_summariser_lib.interface import approx_token_count
+from nounlogic_summariser_lib.summariser import _max_concurrency, summarize_text
+
+__author__ = "nathfavour"
+__copyright__ = "nathfavour"
+__license__ = "MIT"
+
+
+OLLAMA = {'max_concurrency': 1}
+
+
+def autotune_section(profile_path, **settings):
+    """``autotune`` section using the profiles in ``profile_path``."""
+    return {'use_profile': True, 'profile_path': str(profile_path), **settings}
+
+
+def simulated_model(slots=2, overhead=0.04, quadratic=0.04):
+    """Latency of a server that runs ``slots`` requests at once.
+
+    A request of ``n`` thousand tokens takes ``overhead + quadratic * n**2``
+    seconds, so chunks of about 1000 tokens are the most efficient.
+    """
+    semaphore = threading.Semaphore(slots)
+
+    def latency(content):
+        thousands = sum(map(approx_token_count, content.split())) / 1000
+        with semaphore:
+            time.sleep(overhead + quadratic * thousands ** 2)
+        return 0.0
+    return latency
+
+
+def measurement(size, level, seconds):
+    return {'size': size, 'concurrency': level, 'tokens': size * level, 'seconds': seconds}
+
+
+def test_fit_latency():
+    measurements = [measurement(size, 1, 0.5 + size / 200) for size in (250, 500, 1000, 2000)]
+    overhead, rate = fit_latency(measurements + [measurement(1000, 4, 100.0)])
+    assert overhead == pytest.approx(0.5)
+    assert rate == pytest.approx(200)
+    assert fit_latency([measurement(500, 1, 1.0), measurement(1000, 1, 1.0)])[1] is None
+
+
+def test_estimate_seconds():
+    # 10 chunks sent 4 at a time take 3 rounds
+    assert estimate_seconds(2.0, 1000, 4, 10000) == 6.0
+
+
+def test_choose_settings_prefers_fewer_requests_in_flight():
+    measurements = [
+        measurement(500, 1, 1.0), measurement(1000, 1, 1.5),
+        measurement(500, 2, 1.0), measurement(1000, 2, 1.5),
+        # No faster than two at a time, so two is chosen
+        measurement(500, 4, 2.0), measurement(1000, 4, 3.0),
+    ]
+    chosen = choose_settings(measurements, document_tokens=20000)
+    assert chosen == {'token_limit': 1000, 'max_concurrency': 2, 'estimated_seconds': 15.0}
+
+
+@pytest.mark.parametrize('size', [250, 500, 1000, 2000])
+def test_calibration_chunks_have_the_requested_size(size):
+    # Questions and headings would start a new chunk in chunk_text
+    sample = ' '.join(f"What is demand{i}? Unit {i}: prices rise." for i in range(40))
+
+    def count(chunk):
+        return sum(map(approx_token_count, chunk.split()))
+
+    chunks = _calibration_chunks(sample, size, 4, approx_token_count, seed=size)
+    assert len(set(chunks)) == 4
+    assert all(size <= count(chunk) < size + 3 for chunk in chunks)
+
+
+def test_autotune_finds_best_settings_and_saves_profile(fake_ollama, make_config, tmp_path):
+    fake_ollama.latency = simulated_model()
+    profile_path = tmp_path / 'profiles' / 'autotune.json'
+    config = make_config(fake_ollama.host, OLLAMA, autotune=autotune_section(
+        profile_path, sizes=[250, 500, 1000, 2000], concurrency=[1, 2, 4], samples=1))
+
+    entry = autotune(config)
+
+    assert entry['token_limit'] == 1000
+    # The server runs two requests at once; more in flight only hides client overhead
+    assert entry['max_concurrency'] in (2, 4)
+    assert entry['overhead_s'] > 0
+    assert len(entry['measurements']) == 12
+    # A warm-up request plus one request per chunk of every batch
+    assert len(fake_ollama.requests) == 1 + 4 * (1 + 2 + 4)
+    saved = json.loads(profile_path.read_text(encoding='utf-8'))
+    assert saved['fake-model']['token_limit'] == 1000
+
+
+def test_summarize_text_uses_profile(fake_ollama, make_config, tmp_path):
+    profile_path = tmp_path / 'autotune.json'
+    config = make_config(fake_ollama.host, OLLAMA, autotune=autotune_section(profile_path))
+    save_profile(config, {'token_limit': 50, 'max_concurrency': 3, 'token_counter': 'approx'})
+    text = ' '.join(f"w{i}." for i in range(300))
+
+    summaries = list(summarize_text(text, config))
+
+    # 300 words of two tokens each in chunks of 50 tokens
+    assert len(summaries) == 12
+    assert fake_ollama.max_inflight <= 3
+
+
+def test_apply_profile(tmp_path, make_config):
+    profile_path = tmp_path / 'autotune.json'
+    config = make_config('http://unused', OLLAMA, autotune=autotune_section(profile_path))
+    assert apply_profile(config) is config
+
+    save_profile(config, {'token_limit': 700, 'max_concurrency': 3, 'token_counter': 'approx'})
+    tuned = apply_profile(config)
+    assert tuned['chunking']['token_limit'] == 700
+    assert tuned['ollama']['max_concurrency'] == 3
+    assert config['ollama']['max_concurrency'] == 1
+
+    disabled = {**config, 'autotune': {**config['autotune'], 'use_profile': False}}
+    assert apply_profile(disabled) is disabled
+    assert apply_profile({**config, 'chunking': {'token_counter': 'words'}})['chunking'] == \
+        {'token_counter': 'words'}
+    assert apply_profile({**config, 'ollama': {'model': 'other'}})['ollama'] == {'model': 'other'}
+
+
+def test_tuned_concurrency_is_skipped_with_endpoints(tmp_path, make_config, caplog):
+    profile_path = tmp_path / 'autotune.json'
+    endpoints = [{'host': 'http://a', 'max_concurrency': 2}, 'http://b']
+    config = make_config('http://unused', {**OLLAMA, 'endpoints': endpoints},
+                         autotune=autotune_section(profile_path))
+    save_profile(config, {'token_limit': 700, 'max_concurrency': 6, 'token_counter': 'approx'})
+
+    with caplog.at_level(logging.INFO, logger='nounlogic_summariser_lib.autotune'):
+        tuned = apply_profile(config)
+    assert tuned['chunking']['token_limit'] == 700
+    assert tuned['ollama'] == config['ollama']
+    assert _max_concurrency(tuned) == 3
+    assert 'Not applying the tuned concurrency' in caplog.text
+
+
+def test_profiles_are_kept_per_model(tmp_path, make_config):
+    profile_path = tmp_path / 'autotune.json'
+    config = make_config('http://unused', OLLAMA, autotune=autotune_section(profile_path))
+    save_profile(config, {'token_limit': 700, 'max_concurrency': 3})
+    save_profile({**config, 'ollama': {'model': 'other'}}, {'token_limit': 300, 'max_concurrency': 1})
+    profiles = load_profiles(str(profile_path))
+    assert profiles['fake-model']['token_limit'] == 700
+    assert profiles['other']['token_limit'] == 300
@@ -0,0 +1,83 @@
+import os
+
+from nounlogic_summariser_lib.batch import discover_files, process_batch
+
+__author__ = "nathfavour"
+__copyright__ = "nathfavour"
+__license__ = "MIT"
+
+COURSE_TEXT = (
+    "The study of economics explains how societies allocate scarce resources. "
+    "Markets bring buyers and sellers together to set prices for goods. "
+    "Governments sometimes intervene in markets to correct failures and inequities. "
+    "Students should compare the main schools of economic thought in detail.\n\n"
+    "Inflation measures the general rise in prices across the whole economy. "
+    "Central banks adjust interest rates to keep inflation close to target."
+)
+
+OLLAMA = {'max_concurrency': 2}
+BATCH = {
+    'output': {'suffix': '_summarised.txt'},
+    'error_handling': {'continue_on_error': True},
+}
+
+
+def test_discover_files(tmp_path):
+    (tmp_path / 'unit1').mkdir()
+    for name in ['a.txt', 'unit1/b.md', 'unit1/c.pdf', 'unit1/d.docx',
+                 'a-summary.txt', 'a_summarised.txt', 'a-questions.txt']:
+        (tmp_path / name).write_text('x', encoding='utf-8')
+
+    found = discover_files(str(tmp_path), ['.txt', '.md', '.pdf'])
+    assert found == sorted(str(tmp_path / name)
+                           for name in ['a.txt', 'unit1/b.md', 'unit1/c.pdf'])
+    assert discover_files(str(tmp_path / '**' / '*.md'), ['.md']) == \
+        [str(tmp_path / 'unit1' / 'b.md')]
+    assert discover_files(str(tmp_path / 'a.txt'), ['.txt']) == [str(tmp_path / 'a.txt')]
+
+
+def write_course(tmp_path, name):
+    path = tmp_path / name
+    path.write_text(COURSE_TEXT, encoding='utf-8')
+    return str(path)
+
+
+def test_process_batch(fake_ollama, make_config, tmp_path):
+    paths = [write_course(tmp_path, f"module{i}.txt") for i in range(4)]
+
+    config = make_config(fake_ollama.host, OLLAMA, files=True, **BATCH)
+    report = process_batch(paths, config, workers=2)
+
+    assert [entry['file'] for entry in report] == paths
+    assert all(entry['status'] == 'ok' for entry in report)
+    for entry in report:
+        assert os.path.getsize(entry['output']) > 0
+    assert fake_ollama.max_inflight <= 2
+
+
+def write_batch_with_bad_file(tmp_path):
+    bad = tmp_path / 'a_broken.txt'
+    bad.write_bytes(b'\xff\xfe\xfa not utf-8')
+    return [str(bad), write_course(tmp_path, 'b_module.txt')]
+
+
+def test_process_batch_continue_on_error(fake_ollama, make_config, tmp_path):
+    paths = write_batch_with_bad_file(tmp_path)
+    config = make_config(fake_ollama.host, OLLAMA, files=True, **BATCH)
+    report = process_batch(paths, config, workers=1)
+    assert [entry['status'] for entry in report] == ['failed', 'ok']
+    assert report[0]['error']
+
+
+def test_process_batch_stop_on_error(fake_ollama, make_config, tmp_path):
+    fake_ollama.latency = 0.2
+    bad, good = write_batch_with_bad_file(tmp_path)
+    paths = [good, bad] + [write_course(tmp_path, f"module{i}.txt") for i in range(4)]
+    config = make_config(fake_ollama.host, OLLAMA, files=True, **BATCH)
+    config['error_handling'] = {'continue_on_error': False}
+    # One preprocessing process and two model requests: three files in flight
+    report = process_batch(paths, config, workers=1)
+    # Files started before the failure still finish and are reported
+    assert [entry['status'] for entry in report] == \
+        ['ok', 'failed', 'ok', 'skipped', 'skipped', 'skipped']
+    assert os.path.getsize(report[0]['output']) > 0
@@ -0,0 +1,91 @@
+import logging
+import os
+import time
+
+from nounlogic_summariser_lib.cache import SummaryCache, get_cache
+from nounlogic_summariser_lib.summariser import summarize_text
+
+__author__ = "nathfavour"
+__copyright__ = "nathfavour"
+__license__ = "MIT"
+
+
+def test_make_key_depends_on_all_inputs():
+    key = SummaryCache.make_key('m', 'p', 'chunk')
+    assert key == SummaryCache.make_key('m', 'p', 'chunk')
+    assert key != SummaryCache.make_key('other', 'p', 'chunk')
+    assert key != SummaryCache.make_key('m', 'other', 'chunk')
+    assert key != SummaryCache.make_key('m', 'p', 'other')
+
+
+def test_get_put_and_counters(tmp_path):
+    cache = SummaryCache(str(tmp_path), max_bytes=1024)
+    key = cache.make_key('m', 'p', 'chunk')
+    assert cache.get(key) is None
+    cache.put(key, 'a summary')
+    assert cache.get(key) == 'a summary'
+    assert (cache.hits, cache.misses) == (1, 1)
+    # A new instance sees what the first one stored
+    assert SummaryCache(str(tmp_path), max_bytes=1024).get(key) == 'a summary'
+
+
+def test_lru_eviction(tmp_path):
+    cache = SummaryCache(str(tmp_path), max_bytes=350)
+    keys = [cache.make_key('m', 'p', str(i)) for i in range(3)]
+    for key in keys:
+        cache.put(key, 'x' * 100)
+    # A hit on the oldest entry makes the second one least recently used
+    assert cache.get(keys[0]) is not None
+    cache.put(cache.make_key('m', 'p', 'new'), 'y' * 100)
+
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[1]) is None
+    assert cache._size <= 350
+
+
+def test_lru_order_survives_reopening(tmp_path):
+    cache = SummaryCache(str(tmp_path), max_bytes=350)
+    keys = [cache.make_key('m', 'p', str(i)) for i in range(3)]
+    for key in keys:
+        cache.put(key, 'x' * 100)
+        time.sleep(0.01)
+    # A newer modification time makes the second entry least recently used
+    later = time.time() + 1
+    os.utime(cache._path(keys[0]), (later, later))
+
+    reopened = SummaryCache(str(tmp_path), max_bytes=350)
+    assert reopened._size == 300
+    reopened.put(reopened.make_key('m', 'p', 'new'), 'y' * 100)
+    assert reopened.get(keys[0]) is not None
+    assert reopened.get(keys[1]) is None
+    assert reopened._size <= 350
+
+
+def test_get_cache_disabled():
+    assert get_cache({}) is None
+    assert get_cache({'cache': {'enabled': False}}) is None
+
+
+def test_summarize_text_uses_cache(fake_ollama, tmp_path, caplog):
+    config = {
+        'token_limit': 1000,
+        'prompt_template': 'Summarise:',
+        'ollama': {'model': 'fake-model', 'host': fake_ollama.host},
+        'cache': {'enabled': True, 'directory': str(tmp_path), 'max_size_mb': 1},
+    }
+    text = 'Intro first? second? third?'
+    first = list(summarize_text(text, config))
+    assert len(fake_ollama.requests) == 4
+
+    with caplog.at_level(logging.INFO, logger='nounlogic_summariser_lib.cache'):
+        assert list(summarize_text(text, config)) == first
+    assert len(fake_ollama.requests) == 4
+    assert '4 hits' in caplog.text
+
+    # Only the edited chunk goes back to the model
+    list(summarize_text('Intro first? second? changed?', config))
+    assert len(fake_ollama.requests) == 5
+
+    config['prompt_template'] = 'Summarise differently:'
+    list(summarize_text(text, config))
+    assert len(fake_ollama.requests) == 9
@@ -0,0 +1,190 @@
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+from ollama import ResponseError
+
+from nounlogic_summariser_lib import client as client_module
+from nounlogic_summariser_lib.client import (
+    AsyncOllamaClient,
+    CircuitOpenError,
+    OllamaClient,
+    get_async_client,
+    get_client,
+)
+
+__author__ = "nathfavour"
+__copyright__ = "nathfavour"
+__license__ = "MIT"
+
+
+MESSAGES = [{'role': 'user', 'content': 'Summarise: hello'}]
+
+
+def make_client(host, **kwargs):
+    kwargs.setdefault('backoff_base', 0.001)
+    return OllamaClient(host=host, **kwargs)
+
+
+def fail_first(n, status=500):
+    """Status function failing the first ``n`` requests."""
+    calls = []
+    lock = threading.Lock()
+
+    def status_fn(content):
+        with lock:
+            calls.append(content)
+            return status if len(calls) <= n else 200
+    return status_fn
+
+
+def test_retries_transient_errors(fake_ollama):
+    fake_ollama.status = fail_first(2)
+    response = make_client(fake_ollama.host, retry_attempts=3).chat(model='m', messages=MESSAGES)
+    assert response.message.content == 'summary: hello'
+    assert len(fake_ollama.requests) == 3
+
+
+def test_gives_up_after_retry_attempts(fake_ollama):
+    fake_ollama.status = lambda content: 503
+    with pytest.raises(ResponseError):
+        make_client(fake_ollama.host, retry_attempts=2).chat(model='m', messages=MESSAGES)
+    assert len(fake_ollama.requests) == 3
+
+
+def test_client_errors_are_not_retried(fake_ollama):
+    fake_ollama.status = lambda content: 404
+    client = make_client(fake_ollama.host, retry_attempts=3, failure_threshold=1)
+    with pytest.raises(ResponseError):
+        client.chat(model='m', messages=MESSAGES)
+    assert len(fake_ollama.requests) == 1
+    assert client.breaker.state == 'closed'
+
+
+def test_read_timeout_is_applied_and_retried(fake_ollama):
+    fake_ollama.latency = lambda content: 1.0 if len(fake_ollama.requests) == 1 else 0.0
+    client = make_client(fake_ollama.host, read_timeout=0.2, retry_attempts=1)
+    start = time.perf_counter()
+    assert client.chat(model='m', messages=MESSAGES).message.content == 'summary: hello'
+    assert time.perf_counter() - start < 0.9
+    assert len(fake_ollama.requests) == 2
+
+
+def test_timeout_does_not_cut_slow_replies(fake_ollama):
+    fake_ollama.latency = 0.5
+    client = make_client(fake_ollama.host, timeout=0.2, retry_attempts=1)
+    assert client.chat(model='m', messages=MESSAGES).message.content == 'summary: hello'
+    assert len(fake_ollama.requests) == 1
+    assert client.breaker.state == 'closed'
+
+
+def test_backoff_is_jittered_and_capped():
+    client = OllamaClient(backoff_base=0.5, backoff_max=3.0)
+    delays = [client.backoff(attempt) for attempt in range(10) for _ in range(20)]
+    assert all(0 <= delay <= 3.0 for delay in delays)
+    assert len(set(delays)) > 100
+    assert max(client.backoff(0) for _ in range(50)) <= 0.5
+
+
+def test_circuit_breaker_opens_and_recovers(fake_ollama):
+    fake_ollama.status = lambda content: 500
+    client = make_client(fake_ollama.host, failure_threshold=3, reset_timeout=0.2)
+    for _ in range(3):
+        with pytest.raises(ResponseError):
+            client.chat(model='m', messages=MESSAGES)
+    assert client.breaker.state == 'open'
+
+    # While open, calls fail without reaching the server
+    with pytest.raises(CircuitOpenError):
+        client.chat(model='m', messages=MESSAGES)
+    assert len(fake_ollama.requests) == 3
+
+    # After the reset timeout one trial request goes through and closes it
+    time.sleep(0.25)
+    fake_ollama.status = lambda content: 200
+    assert client.chat(model='m', messages=MESSAGES).message.content == 'summary: hello'
+    assert client.breaker.state == 'closed'
+
+
+def test_failed_trial_reopens_circuit(fake_ollama):
+    fake_ollama.status = lambda content: 500
+    client = make_client(fake_ollama.host, failure_threshold=1, reset_timeout=0.1)
+    with pytest.raises(ResponseError):
+        client.chat(model='m', messages=MESSAGES)
+    time.sleep(0.15)
+    with pytest.raises(ResponseError):
+        client.chat(model='m', messages=MESSAGES)
+    assert client.breaker.state == 'open'
+    assert len(fake_ollama.requests) == 2
+
+
+def test_connection_errors_are_retried_then_open_circuit():
+    client = make_client('http://127.0.0.1:9', retry_attempts=1, failure_threshold=2)
+    with pytest.raises(ConnectionError):
+        client.chat(model='m', messages=MESSAGES)
+    assert client.breaker.state == 'open'
+
+
+def test_stream_retried_before_first_part(fake_ollama):
+    fake_ollama.status = fail_first(1)
+    parts = make_client(fake_ollama.host, retry_attempts=1).chat(
+        model='m', messages=MESSAGES, stream=True)
+    assert ''.join(part.message.content for part in parts) == 'summary: hello'
+    assert len(fake_ollama.requests) == 2
+
+
+def test_get_client_is_shared_per_process(fake_ollama, monkeypatch):
+    config = {'host': fake_ollama.host, 'timeout': 5, 'retry_attempts': 2}
+    client = get_client(config)
+    assert get_client(dict(config)) is client
+    assert get_client({**config, 'timeout': 6}) is not client
+
+    pid = os.getpid()
+    monkeypatch.setattr(client_module.os, 'getpid', lambda: pid + 1)
+    assert get_client(config) is not client
+
+
+def test_connections_are_reused(fake_ollama):
+    client = make_client(fake_ollama.host)
+    for _ in range(5):
+        client.chat(model='m', messages=MESSAGES)
+    assert len(fake_ollama.requests) == 5
+    assert len(set(fake_ollama.client_ports)) == 1
+
+
+def test_async_client_retries_and_streams(fake_ollama):
+    fake_ollama.status = fail_first(2)
+
+    async def main():
+        client = AsyncOllamaClient(host=fake_ollama.host, retry_attempts=3, backoff_base=0.001)
+        response = await client.chat(model='m', messages=MESSAGES)
+        parts = await client.chat(model='m', messages=MESSAGES, stream=True)
+        streamed = ''.join([part.message.content async for part in parts])
+        await client.aclose()
+        return response.message.content, streamed
+
+    assert asyncio.run(main()) == ('summary: hello', 'summary: hello')
+    assert len(fake_ollama.requests) == 4
+
+
+def test_async_client_gives_up_and_opens_circuit(fake_ollama):
+    fake_ollama.status = lambda content: 503
+    client = AsyncOllamaClient(host=fake_ollama.host, retry_attempts=1, backoff_base=0.001,
+                               failure_threshold=2)
+    with pytest.raises(ResponseError):
+        asyncio.run(client.chat(model='m', messages=MESSAGES))
+    assert len(fake_ollama.requests) == 2
+    assert client.breaker.state == 'open'
+
+
+def test_get_async_client_is_shared_per_loop(fake_ollama):
+    config = {'host': fake_ollama.host, 'timeout': 5}
+
+    async def clients():
+        return get_async_client(config), get_async_client(dict(config))
+
+    first, same = asyncio.run(clients())
+    assert first is same
+    assert asyncio.run(clients())[0] is not first
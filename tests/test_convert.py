@@ -0,0 +1,47 @@
+from markdownify import markdownify as mdify
+from pdfplumber import open as pdf_open
+
+from nounlogic_summariser_lib.convert import (
+    convert_pdf_to_md,
+    convert_txt_to_pdf,
+    iter_pdf_markdown,
+    iter_pdf_pages,
+)
+
+__author__ = "nathfavour"
+__copyright__ = "nathfavour"
+__license__ = "MIT"
+
+
+def make_pdf(tmp_path, lines=250):
+    txt_path = tmp_path / 'handbook.txt'
+    txt_path.write_text('\n'.join(f"Line {i} of the course handbook *unit* {i // 45}"
+                                  for i in range(lines)), encoding='utf-8')
+    pdf_path = str(tmp_path / 'handbook.pdf')
+    convert_txt_to_pdf(str(txt_path), pdf_path)
+    return pdf_path
+
+
+def reference_pdf_to_md(pdf_path):
+    """The original implementation, which extracted every page twice."""
+    with pdf_open(pdf_path) as pdf:
+        text = "\n".join(page.extract_text() for page in pdf.pages if page.extract_text())
+    return mdify(text)
+
+
+def test_convert_pdf_to_md_matches_reference(tmp_path):
+    pdf_path = make_pdf(tmp_path)
+    expected = reference_pdf_to_md(pdf_path)
+    assert 'Line 249' in expected
+    assert convert_pdf_to_md(pdf_path) == expected
+    assert convert_pdf_to_md(pdf_path, workers=3) == expected
+
+
+def test_iter_pdf_pages_is_ordered_and_lazy(tmp_path):
+    pdf_path = make_pdf(tmp_path)
+    serial = list(iter_pdf_pages(pdf_path))
+    assert len(serial) > 3
+    assert list(iter_pdf_pages(pdf_path, workers=2)) == serial
+
+    pages = iter_pdf_markdown(pdf_path)
+    assert next(pages).startswith('Line 0 ')
@@ -0,0 +1,117 @@
+import random
+import time
+
+import pytest
+
+from nounlogic_summariser_lib.dedup import (
+    MinHasher,
+    NearDuplicateFilter,
+    lsh_params,
+    make_deduplicator,
+    shingles,
+)
+from nounlogic_summariser_lib.preprocessing import preprocess_text
+
+__author__ = "nathfavour"
+__copyright__ = "nathfavour"
+__license__ = "MIT"
+
+
+VOCABULARY = [f"word{i}" for i in range(5000)]
+
+
+def random_sentences(n, seed=0):
+    rng = random.Random(seed)
+    return [' '.join(rng.choice(VOCABULARY) for _ in range(rng.randint(8, 20))) + '.'
+            for _ in range(n)]
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b)
+
+
+def test_signature_estimates_jaccard():
+    rng = random.Random(3)
+    hasher = MinHasher(num_perm=128)
+    errors = []
+    for _ in range(200):
+        base = [rng.choice(VOCABULARY) for _ in range(20)]
+        other = list(base)
+        for _ in range(rng.randint(0, 8)):
+            other[rng.randrange(20)] = rng.choice(VOCABULARY)
+        a, b = shingles(' '.join(base), 2), shingles(' '.join(other), 2)
+        estimate = sum(x == y for x, y in zip(hasher.signature(a), hasher.signature(b))) / 128
+        errors.append(estimate - jaccard(a, b))
+    assert abs(sum(errors) / len(errors)) < 0.02
+    assert max(map(abs, errors)) < 0.25
+
+
+def test_signatures_are_deterministic():
+    hashes = shingles("Self assessment exercise: define demand and supply.", 2)
+    assert MinHasher().signature(hashes) == MinHasher().signature(hashes)
+
+
+def test_lsh_params_use_signature():
+    bands, rows = lsh_params(0.8, 64)
+    assert bands * rows <= 64
+    # Pairs at the threshold are very likely to become candidates
+    assert 1 - (1 - 0.8 ** rows) ** bands > 0.9
+
+
+def test_drops_exact_and_near_duplicates_keeping_first():
+    boilerplate = "Self assessment exercise: list the factors that determine the demand for a product in the market."
+    near = "Self-Assessment Exercise: list the factors that determine the demand for a product in a market."
+    unrelated = random_sentences(50)
+    sentences = [boilerplate] + unrelated[:25] + [near, boilerplate] + unrelated[25:] + [boilerplate.upper()]
+
+    kept = NearDuplicateFilter(threshold=0.7).filter(sentences)
+    assert kept == [boilerplate] + unrelated
+
+
+def test_keeps_short_and_distinct_sentences():
+    dedup = NearDuplicateFilter(min_words=4)
+    assert dedup.filter(['Unit one.', 'Unit one.', '']) == ['Unit one.', 'Unit one.', '']
+    sentences = random_sentences(2000, seed=5)
+    assert NearDuplicateFilter().filter(sentences) == sentences
+
+
+def test_filter_remembers_earlier_calls():
+    dedup = NearDuplicateFilter()
+    first = random_sentences(20, seed=1)
+    assert dedup.filter(first) == first
+    assert dedup.filter(first[:5] + ['A brand new sentence about market price theory today.']) == [
+        'A brand new sentence about market price theory today.']
+    assert dedup.dropped == 5
+
+
+def test_scales_linearly():
+    def run(n):
+        sentences = random_sentences(n, seed=n)
+        sentences += sentences[:n // 4]
+        start = time.perf_counter()
+        kept = NearDuplicateFilter().filter(sentences)
+        assert len(kept) == n
+        return time.perf_counter() - start
+
+    small, large = run(2000), run(8000)
+    assert large < small * 8
+
+
+def test_make_deduplicator():
+    assert make_deduplicator({}) is None
+    dedup = make_deduplicator({'dedup': {'enabled': True, 'threshold': 0.9, 'num_perm': 32}})
+    assert dedup.threshold == 0.9
+    assert dedup.hasher.num_perm == 32
+
+
+@pytest.mark.parametrize('enabled', [False, True])
+def test_preprocess_text_drops_repeated_boilerplate(shipped_config, tmp_path, enabled):
+    config = shipped_config()
+    config['dedup']['enabled'] = enabled
+    boilerplate = ("Students should read the unit carefully and attempt every exercise "
+                   "before moving on to the next part of the course material.")
+    units = [f"{boilerplate} {' '.join(random_sentences(6, seed=i))}" for i in range(30)]
+
+    final_text, _ = preprocess_text('\n\n'.join(units), config, 'course.txt', str(tmp_path))
+
+    assert (final_text.count('Students should read the unit') == 1) == enabled
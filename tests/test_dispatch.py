@@ -0,0 +1,222 @@
+import asyncio
+import socket
+import threading
+import time
+
+import pytest
+from ollama import ResponseError
+
+from nounlogic_summariser_lib.aio import asummarize_text
+from nounlogic_summariser_lib.client import CircuitOpenError
+from nounlogic_summariser_lib.dispatch import (
+    endpoint_configs,
+    get_dispatcher,
+    total_concurrency,
+)
+from nounlogic_summariser_lib.summariser import _max_concurrency, summarize_text
+
+__author__ = "nathfavour"
+__copyright__ = "nathfavour"
+__license__ = "MIT"
+
+
+MESSAGES = [{'role': 'user', 'content': 'Summarise: hello'}]
+
+
+def routed(endpoints, **ollama):
+    """``ollama`` settings sending requests to ``endpoints``."""
+    return {'endpoints': endpoints, 'backoff_base': 0.001, **ollama}
+
+
+def question_text(n):
+    # Every '?' starts a new chunk, so this yields n + 1 chunks
+    return 'Intro ' + ' '.join(f"question{i}?" for i in range(n))
+
+
+def expected_summaries(n):
+    return ['summary: Intro'] + [f"summary: question{i}?" for i in range(n)]
+
+
+def test_endpoint_configs():
+    ollama = {'model': 'm', 'host': 'http://default', 'port': 11434, 'timeout': 30,
+              'retry_attempts': 3, 'endpoints': [
+                  'http://a:1', {'host': 'http://b', 'port': 2, 'max_concurrency': 4, 'timeout': 5}]}
+    first, second = endpoint_configs(ollama)
+    assert (first['host'], first['port'], first['max_concurrency'], first['timeout']) == \
+        ('http://a:1', None, 1, 30)
+    assert (second['host'], second['port'], second['max_concurrency'], second['timeout']) == \
+        ('http://b', 2, 4, 5)
+    assert first['retry_attempts'] == second['retry_attempts'] == 0
+    assert total_concurrency(ollama) == 5
+    assert _max_concurrency({'ollama': {**ollama, 'max_concurrency': 2}}) == 5
+    assert endpoint_configs({'host': 'h'}) == [] and total_concurrency({'endpoints': []}) is None
+
+
+def test_routes_to_least_loaded_endpoint(fake_ollama_servers, make_config):
+    fast, medium, slow = fake_ollama_servers(3)
+    fast.latency, medium.latency, slow.latency = 0.01, 0.04, 0.16
+    endpoints = [{'host': server.host, 'max_concurrency': 2} for server in (fast, medium, slow)]
+    config = make_config(ollama=routed(endpoints))
+
+    summaries = list(summarize_text(question_text(60), config))
+
+    assert summaries == expected_summaries(60)
+    for server in (fast, medium, slow):
+        assert 0 < server.max_inflight <= 2
+    # Faster endpoints free their slots sooner and so take more of the work
+    assert len(fast.requests) > len(medium.requests) > len(slow.requests)
+    stats = get_dispatcher(config['ollama']).stats()
+    assert sum(entry['requests'] for entry in stats.values()) == 61
+    assert all(entry['inflight'] == 0 for entry in stats.values())
+
+
+def test_more_endpoints_raise_throughput(fake_ollama_servers, make_config):
+    servers = fake_ollama_servers(3)
+    for server in servers:
+        server.latency = 0.1
+    text = question_text(23)
+
+    def run(count):
+        endpoints = [{'host': s.host, 'max_concurrency': 2} for s in servers[:count]]
+        config = make_config(ollama=routed(endpoints))
+        start = time.perf_counter()
+        assert list(summarize_text(text, config)) == expected_summaries(23)
+        return time.perf_counter() - start
+
+    one, three = run(1), run(3)
+    assert one >= 12 * 0.1
+    assert three < one / 2
+
+
+def test_failed_requests_move_and_failing_host_is_ejected(fake_ollama_servers, make_config):
+    healthy, broken = fake_ollama_servers(2)
+    healthy.latency = broken.latency = 0.01
+    broken.status = lambda content: 503
+    endpoints = [{'host': s.host, 'max_concurrency': 2} for s in (healthy, broken)]
+    config = make_config(ollama=routed(
+        endpoints, circuit_breaker={'failure_threshold': 3, 'reset_timeout': 60}))
+
+    assert list(summarize_text(question_text(30), config)) == expected_summaries(30)
+
+    stats = get_dispatcher(config['ollama']).stats()
+    assert stats[broken.host]['state'] == 'open'
+    # The broken host only got requests until its breaker opened
+    assert len(broken.requests) <= 3 + 2
+    assert stats[broken.host]['failures'] == len(broken.requests)
+    assert len(healthy.requests) == 31
+
+
+def test_ejected_host_rejoins_after_reset(fake_ollama_servers, make_config):
+    first, second = fake_ollama_servers(2)
+    first.status = lambda content: 503
+    config = make_config(ollama=routed(
+        [first.host, second.host],
+        circuit_breaker={'failure_threshold': 1, 'reset_timeout': 0.2}))
+    dispatcher = get_dispatcher(config['ollama'])
+
+    dispatcher.chat(model='m', messages=MESSAGES)
+    assert dispatcher.stats()[first.host]['state'] == 'open'
+    dispatcher.chat(model='m', messages=MESSAGES)
+    assert len(first.requests) == 1
+
+    first.status = lambda content: 200
+    time.sleep(0.25)
+    dispatcher.chat(model='m', messages=MESSAGES)
+    assert len(first.requests) == 2
+    assert dispatcher.stats()[first.host]['state'] == 'closed'
+
+
+def test_every_endpoint_down(fake_ollama_servers, make_config):
+    servers = fake_ollama_servers(2)
+    for server in servers:
+        server.status = lambda content: 503
+    config = make_config(ollama=routed(
+        [s.host for s in servers], retry_attempts=1,
+        circuit_breaker={'failure_threshold': 2, 'reset_timeout': 60}))
+    dispatcher = get_dispatcher(config['ollama'])
+
+    with pytest.raises(ResponseError):
+        dispatcher.chat(model='m', messages=MESSAGES)
+    # Each endpoint once, then once more after backing off
+    assert [len(s.requests) for s in servers] == [2, 2]
+    with pytest.raises(CircuitOpenError):
+        dispatcher.chat(model='m', messages=MESSAGES)
+    assert [len(s.requests) for s in servers] == [2, 2]
+
+
+def test_client_errors_do_not_move(fake_ollama_servers, make_config):
+    servers = fake_ollama_servers(2)
+    for server in servers:
+        server.status = lambda content: 404
+    dispatcher = get_dispatcher(routed([s.host for s in servers]))
+    with pytest.raises(ResponseError):
+        dispatcher.chat(model='m', messages=MESSAGES)
+    assert sum(len(s.requests) for s in servers) == 1
+
+
+def test_streamed_replies_hold_their_slot(fake_ollama_servers, make_config):
+    first, second = fake_ollama_servers(2)
+    first.token_latency = second.token_latency = 0.01
+    dispatcher = get_dispatcher(routed([first.host, second.host]))
+    results = []
+
+    def run():
+        parts = dispatcher.chat(model='m', messages=MESSAGES, stream=True)
+        results.append(''.join(part.message.content for part in parts))
+
+    threads = [threading.Thread(target=run) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ['summary: hello'] * 6
+    assert first.max_inflight == second.max_inflight == 1
+    assert all(entry['inflight'] == 0 for entry in dispatcher.stats().values())
+
+
+def closed_port_host():
+    """URL of a local port nothing listens on, so connections are refused."""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}"
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_refused_connections_move(fake_ollama_servers, stream, make_config):
+    server, = fake_ollama_servers(1)
+    down = closed_port_host()
+    config = make_config(ollama=routed(
+        [down, server.host], circuit_breaker={'failure_threshold': 5, 'reset_timeout': 60}))
+    dispatcher = get_dispatcher(config['ollama'])
+
+    for _ in range(2):
+        reply = dispatcher.chat(model='m', messages=MESSAGES, stream=stream)
+        if stream:
+            assert ''.join(part.message.content for part in reply) == 'summary: hello'
+        else:
+            assert reply.message.content == 'summary: hello'
+
+    assert len(server.requests) == 2
+    stats = dispatcher.stats()
+    assert stats[down]['failures'] == 2
+    assert all(entry['inflight'] == 0 for entry in stats.values())
+
+
+def test_async_dispatch(fake_ollama_servers, make_config):
+    fast, slow, broken = fake_ollama_servers(3)
+    fast.latency, slow.latency = 0.01, 0.08
+    broken.status = lambda content: 503
+    endpoints = [{'host': s.host, 'max_concurrency': 2} for s in (fast, slow, broken)]
+    config = make_config(ollama=routed(
+        endpoints, circuit_breaker={'failure_threshold': 2, 'reset_timeout': 60}))
+
+    async def collect():
+        return [summary async for summary in asummarize_text(question_text(30), config)]
+
+    assert asyncio.run(collect()) == expected_summaries(30)
+    assert fast.max_inflight <= 2 and slow.max_inflight <= 2
+    assert len(fast.requests) > len(slow.requests) > 0
+    assert len(broken.requests) <= 2 + 2
+    assert len(fast.requests) + len(slow.requests) == 31
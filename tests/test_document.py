@@ -0,0 +1,94 @@
+import os
+import random
+
+import pytest
+
+from nounlogic_summariser_lib.document import SENTENCE_SPLIT, Document
+from nounlogic_summariser_lib.interface import sanitize_text
+from nounlogic_summariser_lib.preprocessing import (
+    final_process_text,
+    get_text_statistics,
+    smart_chunk_detection,
+)
+
+__author__ = "nathfavour"
+__copyright__ = "nathfavour"
+__license__ = "MIT"
+
+GOLDEN_DIR = os.path.join(os.path.dirname(__file__), 'golden')
+
+
+def golden_text(name):
+    with open(os.path.join(GOLDEN_DIR, f"{name}.txt"), encoding='utf-8') as f:
+        return sanitize_text(f.read())
+
+
+def random_texts(count=2000, seed=11):
+    rng = random.Random(seed)
+    alphabet = ['a', 'B', 'É', 'İ', ' ', ' ', '.', '!', '?', '\n', 'word', 'Σ']
+    for _ in range(count):
+        yield ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 40)))
+
+
+def check_document(document, text):
+    sentences = SENTENCE_SPLIT.split(text)
+    assert len(document) == len(sentences)
+    assert document.sentences() == sentences
+    assert [document.sentence(i) for i in range(len(document))] == sentences
+    words = [[document.word_id(word) for word in s.lower().split()] for s in sentences]
+    assert [list(document.words(i)) for i in range(len(document))] == words
+    assert [list(ids) for ids in document.iter_words()] == words
+
+
+@pytest.mark.parametrize('name', ['edge_cases', 'course_1', 'course_2', 'course_3'])
+def test_parse_matches_sentence_split(name):
+    text = golden_text(name)
+    check_document(Document.parse(text), text)
+
+
+def test_parse_random_text():
+    for text in random_texts():
+        check_document(Document.parse(text), text)
+
+
+def test_from_sentences():
+    sentences = ['First one.', '', 'Second  one!', 'Third']
+    document = Document.from_sentences(sentences)
+    assert document.sentences() == sentences
+    assert document.text == 'First one.  Second  one! Third'
+    assert document.statistics()['word_count'] == 5
+    assert len(Document.from_sentences([])) == 0
+
+
+def test_word_ids_follow_first_appearance():
+    document = Document.parse('The cat sat down. THE dog sat down.')
+    assert list(document.word_ids) == [0, 1, 2, 3, 0, 5, 2, 3]
+    assert document.word_id('the') == 0
+    assert document.word_id('The') is None
+    assert document.word_counts() == {0: 2, 1: 1, 2: 2, 3: 2, 5: 1}
+
+
+def test_compact_storage():
+    document = Document.parse('One sentence here.')
+    assert not hasattr(document, '__dict__')
+    assert document.word_ids.typecode == 'i'
+
+
+@pytest.mark.parametrize('name', ['edge_cases', 'course_1'])
+def test_statistics_match_text_statistics(name):
+    text = golden_text(name)
+    assert get_text_statistics(Document.parse(text)) == get_text_statistics(text)
+    assert Document.parse('').statistics() == get_text_statistics('')
+
+
+@pytest.mark.parametrize('name', ['course_1', 'course_2', 'course_3'])
+def test_shared_document_gives_same_result(name, shipped_config):
+    config = shipped_config()
+    text = ' '.join(golden_text(name).split())
+    stats = get_text_statistics(text)
+    document = Document.parse(text)
+
+    chunks = smart_chunk_detection(document)
+    assert chunks == smart_chunk_detection(text)
+    assert final_process_text(chunks, config, name, stats, document) == \
+        final_process_text(chunks, config, name, stats)
@@ -0,0 +1,108 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+__author__ = "nathfavour"
+__copyright__ = "nathfavour"
+__license__ = "MIT"
+
+
+# Slow to import and only needed by some features
+HEAVY = {'ollama', 'httpx', 'pdfplumber', 'markdownify', 'reportlab', 'numpy', 'scipy'}
+
+# Import time budgets as a share of the time ``import ollama`` takes in the
+# same test run, so they hold on fast and slow machines alike. Importing
+# ollama eagerly would blow any of them.
+BUDGETS = {
+    'nounlogic_summariser_lib': 0.25,
+    'nounlogic_summariser_lib.skeleton': 0.75,
+}
+SUBCOMMAND_BUDGET = 0.75
+
+REFERENCE = 'ollama'
+
+MAIN = "import sys; from nounlogic_summariser_lib.skeleton import main; main(sys.argv[1:])"
+
+
+def importtime(code, *args, cwd=None, outermost=False):
+    """Run ``code`` with ``-X importtime``.
+
+    Args:
+        outermost (bool): Only report the imports not made by another
+            module's import, whose times add up to the total.
+
+    Returns:
+        Dict[str, int]: Cumulative import time in microseconds per module.
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code, *args],
+                            capture_output=True, text=True, cwd=cwd)
+    assert result.returncode == 0, result.stderr
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented below the one that made them
+        if outermost and name.startswith('  '):
+            continue
+        modules[name.strip()] = modules.get(name.strip(), 0) + int(cumulative)
+    return modules
+
+
+def top_level(modules):
+    return {name.split('.')[0] for name in modules}
+
+
+def best_of_three(measure):
+    # Best of three runs, so a busy machine does not fail the tests
+    return min(measure() for _ in range(3))
+
+
+@pytest.fixture(scope='module')
+def reference_us():
+    return best_of_three(lambda: importtime(f"import {REFERENCE}")[REFERENCE])
+
+
+@pytest.mark.parametrize('module', sorted(BUDGETS))
+def test_import_budget(module, reference_us):
+    assert not top_level(importtime(f"import {module}")) & HEAVY
+    best_us = best_of_three(lambda: importtime(f"import {module}")[module])
+    assert best_us < BUDGETS[module] * reference_us
+
+
+@pytest.fixture
+def workdir(tmp_path, fake_ollama, shipped_config):
+    config = shipped_config()
+    config['ollama'].update(host=fake_ollama.host, port=None)
+    config['enable_output_conversion'] = False
+    config['cache']['directory'] = str(tmp_path / 'cache')
+    config['output']['directory'] = str(tmp_path / 'out')
+    (tmp_path / 'config.json').write_text(json.dumps(config), encoding='utf-8')
+    (tmp_path / 'notes.txt').write_text(
+        "Unit one introduces the market. Demand falls when prices rise in most markets.\n",
+        encoding='utf-8')
+    return tmp_path
+
+
+@pytest.mark.parametrize('args, needed', [
+    (['convert', 'notes.txt', '--markitdown'], set()),
+    (['convert', 'notes.txt', '--pdf'], {'reportlab'}),
+    (['summarize', 'notes.txt'], {'ollama', 'httpx'}),
+])
+def test_subcommands_import_only_what_they_use(workdir, args, needed, reference_us):
+    loaded = top_level(importtime(MAIN, *args, '--config', 'config.json', cwd=workdir))
+    assert loaded & HEAVY == needed
+
+    startup = set(importtime('pass', outermost=True))
+
+    def own_us():
+        # Time spent importing what the subcommand adds to interpreter
+        # startup, apart from the libraries it needs
+        modules = importtime(MAIN, *args, '--config', 'config.json', cwd=workdir,
+                             outermost=True)
+        return sum(us for name, us in modules.items()
+                   if name not in startup and name.split('.')[0] not in needed)
+
+    assert best_of_three(own_us) < SUBCOMMAND_BUDGET * reference_us
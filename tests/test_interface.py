@@ -0,0 +1,102 @@
+import random
+import time
+
+import pytest
+
+from nounlogic_summariser_lib.interface import (
+    approx_token_count,
+    chunk_settings,
+    chunk_text,
+    make_token_counter,
+)
+
+__author__ = "nathfavour"
+__copyright__ = "nathfavour"
+__license__ = "MIT"
+
+
+def old_chunk_text(text, token_limit):
+    """Word-count chunker the token-aware one replaced."""
+    chunks = []
+    current_chunk = []
+    current_tokens = 0
+    for word in text.split():
+        if '?' in word or word.strip().endswith(':'):
+            chunks.append(' '.join(current_chunk))
+            current_chunk = []
+            current_tokens = 0
+        current_tokens += 1
+        if current_tokens > token_limit:
+            chunks.append(' '.join(current_chunk))
+            current_chunk = [word]
+            current_tokens = 1
+        else:
+            current_chunk.append(word)
+    if current_chunk:
+        chunks.append(' '.join(current_chunk))
+    return chunks
+
+
+def random_text(seed, n_words):
+    rng = random.Random(seed)
+    words = ['a', 'market', 'internationalisation', 'price?', 'Unit:', 'x' * 50, 'demand.']
+    return ' '.join(rng.choice(words) for _ in range(n_words))
+
+
+def test_no_empty_chunks():
+    assert chunk_text('Why? What? Heading: text', 10) == ['Why?', 'What?', 'Heading: text']
+    assert chunk_text('', 10) == []
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_word_counter_matches_old_chunks(seed):
+    text = random_text(seed, 2000)
+    expected = [chunk for chunk in old_chunk_text(text, 37) if chunk]
+    assert chunk_text(text, 37, make_token_counter('words')) == expected
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_chunks_respect_token_limit(seed):
+    text = random_text(seed, 2000)
+    chunks = chunk_text(text, 40, overlap=10)
+    for chunk in chunks:
+        words = chunk.split()
+        assert len(words) == 1 or sum(approx_token_count(w) for w in words) <= 40
+
+
+def test_approx_token_count(course_text):
+    assert [approx_token_count(w) for w in ['the', 'market', 'production', 'price.', '...']] == \
+        [1, 1, 2, 2, 2]
+    # BPE tokenizers average about 1.3 tokens per word of course text
+    words = course_text().split()
+    assert sum(map(approx_token_count, words)) / len(words) == pytest.approx(1.3, abs=0.1)
+
+
+def test_overlap_carries_tail_of_full_chunk():
+    text = ' '.join(f"w{i}" for i in range(10))
+    counter = make_token_counter('words')
+    assert chunk_text(text, 4, counter, overlap=2) == [
+        'w0 w1 w2 w3', 'w2 w3 w4 w5', 'w4 w5 w6 w7', 'w6 w7 w8 w9']
+    # No overlap across question boundaries
+    assert chunk_text('a b c why? d', 4, counter, overlap=2) == ['a b c', 'why? d']
+
+
+def test_chunking_is_linear():
+    text = 'word ' * 400000
+    start = time.perf_counter()
+    chunks = chunk_text(text, 1000, overlap=100)
+    assert time.perf_counter() - start < 5
+    assert len(chunks) > 400
+
+
+def test_chunk_settings_reads_chunking_section():
+    settings = chunk_settings({'token_limit': 50, 'chunking': {'overlap': 5, 'token_counter': 'words'}})
+    assert settings['token_limit'] == 50
+    assert settings['overlap'] == 5
+    assert settings['token_counter']('internationalisation') == 1
+    assert chunk_settings({'token_limit': 50})['overlap'] == 0
+
+
+def test_unknown_token_counter():
+    with pytest.raises(ValueError):
+        make_token_counter('nonsense')
@@ -0,0 +1,175 @@
+import asyncio
+import os
+import re
+
+import pytest
+
+from nounlogic_summariser_lib import summariser
+from nounlogic_summariser_lib.aio import aprocess_file, asummarize_text
+from nounlogic_summariser_lib.packing import (
+    PackRequest,
+    build_packed_prompt,
+    pack_chunks,
+    packing_settings,
+    parse_packed_reply,
+)
+from nounlogic_summariser_lib.summariser import process_file, summarize_text
+
+__author__ = "nathfavour"
+__copyright__ = "nathfavour"
+__license__ = "MIT"
+
+
+MARKER = re.compile(r'^=== (\d+) ===$', re.MULTILINE)
+
+PACKING = {'enabled': True}
+
+
+def question_text(n):
+    # Every '?' starts a new chunk, so this yields n + 1 chunks
+    return 'Intro ' + ' '.join(f"question{i}?" for i in range(n))
+
+
+def expected_summaries(n):
+    return ['summary: Intro'] + [f"summary: question{i}?" for i in range(n)]
+
+
+def packed_reply(content):
+    """Answer packed prompts section by section, like a well-behaved model."""
+    parts = MARKER.split(content)
+    if len(parts) == 1:
+        return f"summary: {content.split()[-1]}"
+    return '\n\n'.join(f"=== {number} ===\nsummary: {section.split()[-1]}"
+                       for number, section in zip(parts[1::2], parts[2::2]))
+
+
+def test_pack_chunks_respects_limits():
+    items = list(enumerate(['a b', 'c d e', 'f', 'g h i j k l', 'm']))
+    count = lambda word: 1
+    assert [[i for i, _ in pack] for pack in pack_chunks(items, 6, 8, count)] == \
+        [[0, 1, 2], [3], [4]]
+    assert [[i for i, _ in pack] for pack in pack_chunks(items, 100, 2, count)] == \
+        [[0, 1], [2, 3], [4]]
+    # A chunk over the limit is packed on its own
+    assert [len(pack) for pack in pack_chunks(items, 1, 8, count)] == [1, 1, 1, 1, 1]
+    assert list(pack_chunks([], 10)) == []
+
+
+def test_packing_settings():
+    assert packing_settings({'token_limit': 10}) is None
+    settings = packing_settings({'token_limit': 10, 'chunking': {'token_limit': 50},
+                                 'packing': {'enabled': True, 'max_chunks': 3}})
+    assert (settings['token_limit'], settings['max_chunks']) == (50, 3)
+    settings = packing_settings({'token_limit': 10, 'packing': {'enabled': True, 'token_limit': 20}})
+    assert (settings['token_limit'], settings['max_chunks']) == (20, 8)
+
+
+def test_prompt_and_reply_round_trip():
+    prompt = build_packed_prompt('Summarise:', ['first text', 'second text'])
+    assert prompt.startswith('Summarise:\n\n')
+    assert prompt.endswith('=== 1 ===\nfirst text\n\n=== 2 ===\nsecond text')
+    assert parse_packed_reply(packed_reply(prompt), 2) == ['summary: text', 'summary: text']
+
+
+def test_pack_request_bookkeeping():
+    request = PackRequest(['a', 'b', 'c'], [None, 'cached', None])
+    assert request.todo == [0, 2] and request.packed
+    assert request.prompt('Summarise:').endswith('=== 1 ===\na\n\n=== 2 ===\nc')
+    assert request.accept('no markers') == [] and request.todo == [0, 2]
+    assert request.accept('=== 1 ===\nA\n=== 2 ===\nC') == [0, 2]
+    assert request.summaries == ['A', 'cached', 'C'] and request.todo == []
+    assert not PackRequest(['a', 'b'], ['cached', None]).packed
+
+
+@pytest.mark.parametrize('reply, expected', [
+    ("=== 1 ===\nOne.\n=== 2 ===\nTwo.", ['One.', 'Two.']),
+    ("Here you go:\n\n**=== 1 ===**\nOne.\n\n## == 2 ==\n Two. \n", ['One.', 'Two.']),
+    ("=== 1 ===\nOne.", None),
+    ("=== 1 ===\nOne.\n=== 2 ===\nTwo.\n=== 3 ===\nThree.", None),
+    ("=== 2 ===\nTwo.\n=== 1 ===\nOne.", None),
+    ("=== 1 ===\n\n=== 2 ===\nTwo.", None),
+    ("One. Two.", None),
+])
+def test_parse_packed_reply(reply, expected):
+    assert parse_packed_reply(reply, 2) == expected
+
+
+def test_packing_cuts_requests(fake_ollama, make_config):
+    fake_ollama.reply = packed_reply
+    config = make_config(fake_ollama.host, packing=PACKING)
+    summaries = list(summarize_text(question_text(31), config))
+    assert summaries == expected_summaries(31)
+    # 32 chunks in packs of 8
+    assert len(fake_ollama.requests) == 4
+
+
+def test_unparseable_reply_falls_back_to_single_chunks(fake_ollama, make_config):
+    # The default reply ignores the markers
+    config = make_config(fake_ollama.host, {'max_concurrency': 2},
+                         packing={**PACKING, 'max_chunks': 4})
+    summaries = list(summarize_text(question_text(11), config))
+    assert summaries == expected_summaries(11)
+    assert len(fake_ollama.requests) == 3 + 12
+
+
+def test_cached_chunks_are_not_packed(fake_ollama, make_config, tmp_path):
+    fake_ollama.reply = packed_reply
+    config = make_config(fake_ollama.host, packing=PACKING)
+    config['cache'] = {'enabled': True, 'directory': str(tmp_path / 'cache')}
+    list(summarize_text(question_text(2), config))
+    fake_ollama.requests.clear()
+
+    assert list(summarize_text(question_text(4), config)) == expected_summaries(4)
+    # Only the two new chunks go out, together
+    assert len(fake_ollama.requests) == 1
+    content = fake_ollama.requests[0]['messages'][-1]['content']
+    assert 'question2?' in content and 'question3?' in content and 'Intro' not in content
+
+
+def test_process_file_with_packing_and_resume(fake_ollama, make_config, tmp_path, monkeypatch):
+    fake_ollama.reply = packed_reply
+    monkeypatch.setattr(summariser, 'preprocess_text',
+                        lambda text, config, name, input_dir: (question_text(11), ['META']))
+    source = tmp_path / 'module.txt'
+    source.write_text('placeholder', encoding='utf-8')
+    config = make_config(fake_ollama.host, packing={**PACKING, 'max_chunks': 4})
+    expected = ''.join(f"{summary}\n\n" for summary in expected_summaries(11))
+
+    fake_ollama.status = lambda content: 500 if 'question5?' in content else 200
+    with pytest.raises(Exception):
+        process_file(str(source), config)
+    assert os.path.exists(tmp_path / 'module-checkpoint.jsonl')
+    assert len(fake_ollama.requests) == 2
+
+    fake_ollama.status = lambda content: 200
+    pieces = []
+    final_path = process_file(str(source), config, resume=True,
+                              on_token=lambda i, piece: pieces.append((i, piece)))
+    # The first pack was checkpointed; the other two are sent again
+    assert len(fake_ollama.requests) == 4
+    with open(final_path, encoding='utf-8') as f:
+        assert f.read() == expected
+    assert [i for i, _ in pieces] == list(range(12))
+
+    os.remove(final_path)
+    assert asyncio.run(aprocess_file(str(source), config)) == final_path
+    with open(final_path, encoding='utf-8') as f:
+        assert f.read() == expected
+
+
+def test_async_packing(fake_ollama, make_config):
+    fake_ollama.reply = packed_reply
+
+    async def collect(config):
+        return [summary async for summary in asummarize_text(question_text(15), config)]
+
+    config = make_config(fake_ollama.host, {'max_concurrency': 2}, packing=PACKING)
+    assert asyncio.run(collect(config)) == expected_summaries(15)
+    assert len(fake_ollama.requests) == 2
+
+    fake_ollama.reply = lambda content: 'no markers here'
+    fake_ollama.requests.clear()
+    config = make_config(fake_ollama.host, packing={**PACKING, 'max_chunks': 8})
+    summaries = asyncio.run(collect(config))
+    assert summaries == ['no markers here'] * 16
+    assert len(fake_ollama.requests) == 2 + 16
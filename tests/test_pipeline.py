@@ -0,0 +1,114 @@
+import random
+import re
+import tracemalloc
+
+import pytest
+
+from nounlogic_summariser_lib import pipeline
+from nounlogic_summariser_lib.pipeline import StreamingPreprocessor, iter_sections
+from nounlogic_summariser_lib.preprocessing import get_text_statistics
+from nounlogic_summariser_lib.summariser import process_file
+
+__author__ = "nathfavour"
+__copyright__ = "nathfavour"
+__license__ = "MIT"
+
+
+@pytest.fixture
+def streaming_config(shipped_config):
+    """Shipped configuration in streaming mode, reading 97 characters at a time."""
+    def make(host, **streaming):
+        streaming = {'enabled': True, 'block_size': 97, **streaming}
+        return shipped_config(host, cache={'enabled': False}, streaming=streaming)
+    return make
+
+
+def split_blocks(text, rng):
+    blocks = []
+    while text:
+        size = rng.randint(1, 40)
+        blocks.append(text[:size])
+        text = text[size:]
+    return blocks
+
+
+def test_iter_sections_matches_split():
+    rng = random.Random(11)
+    pieces = ['word', ' ', '\n', '\n\n', '\n \t\n', '  \n  \n\n', 'other text.']
+    for _ in range(300):
+        text = ''.join(rng.choice(pieces) for _ in range(rng.randint(0, 40)))
+        expected = re.split(r'\n\s*\n', text)
+        assert list(iter_sections(split_blocks(text, rng), max_chars=10 ** 6)) == expected
+
+
+def test_iter_sections_bounds_long_sections():
+    text = ' '.join(['word'] * 1000)
+    sections = list(iter_sections(split_blocks(text, random.Random(1)), max_chars=100))
+    assert all(len(section) <= 100 for section in sections)
+    assert ''.join(sections) == text
+
+
+def test_streaming_matches_whole_file_in_one_window(fake_ollama, streaming_config,
+                                                     tmp_path, course_text):
+    source = tmp_path / 'module.txt'
+    source.write_text(course_text(seed=4), encoding='utf-8')
+    outputs = ['_summarised.txt', '-summary.txt', '-metadata.txt', '-questions.txt']
+
+    config = streaming_config(fake_ollama.host, window_words=10 ** 9)
+    process_file(str(source), config)
+    streamed = {name: (tmp_path / f"module{name}").read_text(encoding='utf-8')
+                for name in outputs}
+    assert not (tmp_path / 'module-checkpoint.jsonl').exists()
+
+    config['streaming']['enabled'] = False
+    process_file(str(source), config)
+    for name in outputs:
+        assert (tmp_path / f"module{name}").read_text(encoding='utf-8') == streamed[name]
+    assert streamed['-questions.txt']
+    assert streamed['-metadata.txt']
+
+
+def test_first_chunk_sent_before_document_is_read(fake_ollama, streaming_config,
+                                                  tmp_path, course_text, monkeypatch):
+    source = tmp_path / 'module.txt'
+    source.write_text(course_text(seed=2, n_sections=400), encoding='utf-8')
+    sections_seen = []
+    preprocess_section = pipeline.preprocess_section
+    monkeypatch.setattr(pipeline, 'preprocess_section',
+                        lambda section, config: sections_seen.append(section)
+                        or preprocess_section(section, config))
+    seen_at_request = []
+    reply = fake_ollama.reply
+    fake_ollama.reply = lambda content: seen_at_request.append(len(sections_seen)) or reply(content)
+
+    process_file(str(source), streaming_config(fake_ollama.host, window_words=200))
+
+    assert len(sections_seen) >= 400
+    assert seen_at_request[0] < len(sections_seen) / 4
+
+
+def test_window_statistics_match_joined_text(course_text):
+    sections = re.split(r'\n\s*\n', course_text(seed=3)) + ['', 'End. ', ' Start']
+    stats = pipeline._WindowStatistics()
+    for section in sections:
+        stats.add(section)
+    assert stats.result() == get_text_statistics('\n\n'.join(sections))
+
+
+def test_dropped_text_closes_windows_on_characters(shipped_config, tmp_path):
+    # Sentences of five words or fewer are all dropped by preprocessing
+    sections = ["Yes it is. No it is not. OK then."] * 30000
+    window_chars = 1 << 16
+    preprocessor = StreamingPreprocessor(shipped_config(), 'notes', str(tmp_path),
+                                         window_words=5000, window_chars=window_chars)
+    tracemalloc.start()
+    try:
+        windows = list(preprocessor.windows(iter(sections)))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    assert not ''.join(windows).strip()
+    assert len(windows) == -(-sum(map(len, sections)) // window_chars)
+    # About a megabyte of input, but only one window's worth held at a time
+    assert peak < 16 * window_chars
@@ -0,0 +1,140 @@
+import json
+import math
+import os
+import random
+from collections import Counter
+
+import pytest
+
+from nounlogic_summariser_lib import preprocessing
+from nounlogic_summariser_lib.interface import sanitize_text
+from nounlogic_summariser_lib.preprocessing import (
+    SECTION_SPLIT,
+    _section_batches,
+    calculate_sentence_importance,
+    get_rules,
+    preprocess_section,
+    preprocess_sections,
+    preprocess_text,
+    preprocessing_workers,
+    score_sentences,
+)
+
+__author__ = "nathfavour"
+__copyright__ = "nathfavour"
+__license__ = "MIT"
+
+
+def _reference_importance(sentence, total_sentences):
+    """The original per-sentence scorer, kept verbatim as a regression oracle."""
+    words = sentence.lower().split()
+    all_words = [w for s in total_sentences for w in s.lower().split()]
+    word_freq = Counter(all_words)
+    score = sum(math.log(1 + word_freq[word]) for word in words)
+    synonyms_map = {
+        'important': ['vital', 'pivotal', 'paramount'],
+        'significant': ['noteworthy', 'meaningful'],
+        'main': ['primary', 'principal'],
+    }
+    for phrase, synonyms in synonyms_map.items():
+        for word in synonyms:
+            if word in words:
+                score += 2
+    score = score / (len(words) + 1)
+    if len(total_sentences) > 0:
+        position = total_sentences.index(sentence)
+        if position < len(total_sentences) * 0.2 or position > len(total_sentences) * 0.8:
+            score *= 1.2
+    return score
+
+
+def _synthetic_corpus(n_sentences, seed=1729):
+    rng = random.Random(seed)
+    vocabulary = [f"term{i}" for i in range(400)] + [
+        "vital", "pivotal", "paramount", "noteworthy", "meaningful",
+        "primary", "principal", "The", "course", "UNIT", "Objectives",
+    ]
+    sentences = []
+    for _ in range(n_sentences):
+        if sentences and rng.random() < 0.05:
+            # Repeated boilerplate sentences exercise the first-position rule
+            sentences.append(rng.choice(sentences))
+        else:
+            length = rng.randint(0, 25)
+            sentences.append(' '.join(rng.choice(vocabulary) for _ in range(length)) + '.')
+    return sentences
+
+
+def test_score_sentences_matches_reference():
+    """Single-pass scores are identical to the original per-sentence scores"""
+    sentences = _synthetic_corpus(800)
+    expected = [_reference_importance(s, sentences) for s in sentences]
+    assert score_sentences(sentences) == expected
+
+
+def test_calculate_sentence_importance_matches_reference():
+    sentences = _synthetic_corpus(200, seed=7)
+    for sentence in sentences:
+        assert calculate_sentence_importance(sentence, sentences) == \
+            _reference_importance(sentence, sentences)
+
+
+def test_score_sentences_empty():
+    assert score_sentences([]) == []
+
+
+GOLDEN_DIR = os.path.join(os.path.dirname(__file__), 'golden')
+
+
+@pytest.mark.parametrize('name', ['edge_cases', 'course_1', 'course_2', 'course_3'])
+@pytest.mark.parametrize('workers', [1, 3])
+def test_preprocess_text_golden(name, workers, shipped_config, tmp_path, monkeypatch):
+    """Output matches files recorded with the original rule-by-rule implementation"""
+    monkeypatch.setattr(preprocessing, 'PARALLEL_MIN_CHARS', 0)
+    with open(os.path.join(GOLDEN_DIR, f"{name}.txt"), encoding='utf-8') as f:
+        text = sanitize_text(f.read())
+    with open(os.path.join(GOLDEN_DIR, f"{name}.expected.json"), encoding='utf-8') as f:
+        expected = json.load(f)
+
+    config = shipped_config()
+    config['preprocessing']['workers'] = workers
+    final_text, summary_content = preprocess_text(text, config, name, str(tmp_path))
+
+    assert final_text == expected['text']
+    assert summary_content == expected['summary_content']
+    questions = (tmp_path / f"{name}-questions.txt").read_text(encoding='utf-8')
+    assert questions == expected['questions']
+
+
+def test_rules_compiled_once_per_config(shipped_config):
+    config = shipped_config()
+    assert get_rules(config) is get_rules(shipped_config())
+    config['preprocessing']['capital_proximity'] = 4
+    assert get_rules(config) is not get_rules(shipped_config())
+
+
+def test_section_batches_keep_document_order():
+    sections = ['a' * 10, 'b' * 3, 'c' * 8, 'd' * 1, 'e' * 20]
+    batches = _section_batches(sections, 10)
+    assert batches == [['a' * 10], ['b' * 3, 'c' * 8], ['d' * 1, 'e' * 20]]
+    assert _section_batches([], 10) == []
+
+
+def test_preprocess_sections_in_parallel(shipped_config, monkeypatch):
+    with open(os.path.join(GOLDEN_DIR, 'course_1.txt'), encoding='utf-8') as f:
+        sections = SECTION_SPLIT.split(sanitize_text(f.read())) * 3
+    config = shipped_config()
+    expected = [preprocess_section(section, config) for section in sections]
+
+    monkeypatch.setattr(preprocessing, 'PARALLEL_MIN_CHARS', 0)
+    assert preprocess_sections(sections, config, workers=4) == expected
+    assert preprocess_sections(sections[:1], config, workers=4) == expected[:1]
+    assert preprocess_sections([], config, workers=4) == []
+
+
+def test_preprocessing_workers(monkeypatch):
+    monkeypatch.setattr(os, 'cpu_count', lambda: 32)
+    assert preprocessing_workers({'preprocessing': {}}) == 1
+    assert preprocessing_workers({'preprocessing': {'workers': 4}}) == 4
+    assert preprocessing_workers({'preprocessing': {'workers': None}}) == 32
+    assert preprocessing_workers({'preprocessing': {'workers': 0}}) == 1
@@ -0,0 +1,86 @@
+import json
+import pstats
+
+from nounlogic_summariser_lib.profiling import NULL_PROFILER, Profiler, get_profiler, profiling
+from nounlogic_summariser_lib.skeleton import main
+from nounlogic_summariser_lib.summariser import process_file
+
+__author__ = "nathfavour"
+__copyright__ = "nathfavour"
+__license__ = "MIT"
+
+
+# Changes to the shipped config, so runs leave only the summaries behind
+SETTINGS = {'cache': {'enabled': False}, 'enable_output_conversion': False}
+
+
+def stages(report):
+    return {stage['name']: stage for stage in report['stages']}
+
+
+def test_null_profiler_by_default():
+    assert get_profiler() is NULL_PROFILER
+    with NULL_PROFILER.stage('anything', 10) as stage:
+        stage.output(5)
+    profiler = Profiler(trace_memory=False)
+    with profiling(profiler):
+        assert get_profiler() is profiler
+    assert get_profiler() is NULL_PROFILER
+
+
+def test_stages_are_aggregated_with_nested_memory():
+    profiler = Profiler()
+    with profiling(profiler):
+        with profiler.stage('outer', 3):
+            for _ in range(3):
+                with profiler.stage('inner') as stage:
+                    data = bytearray(1 << 20)
+                    stage.output(len(data))
+                    del data
+    report = stages(profiler.report())
+    assert report['inner']['calls'] == 3
+    assert report['inner']['output_size'] == 3 << 20
+    assert report['inner']['peak_memory_bytes'] >= 1 << 20
+    # The parent's peak includes what its children allocated
+    assert report['outer']['peak_memory_bytes'] >= report['inner']['peak_memory_bytes']
+    assert report['outer']['wall_s'] >= report['inner']['wall_s']
+
+
+def test_process_file_report(fake_ollama, shipped_config, tmp_path, course_text):
+    fake_ollama.latency = 0.02
+    source = tmp_path / 'course.txt'
+    source.write_text(course_text(1, 40), encoding='utf-8')
+
+    profiler = Profiler(trace_memory=False)
+    with profiling(profiler):
+        process_file(str(source), shipped_config(fake_ollama.host, **SETTINGS))
+    report = profiler.report()
+    json.dumps(report)
+    by_name = stages(report)
+
+    for name in ('read_file', 'sanitize_text', 'preprocess_text', 'preprocess.1_sections',
+                 'preprocess.7_close_sentences', 'preprocess.select_text', 'chunk_text',
+                 'summarize', 'chat'):
+        assert name in by_name
+    assert by_name['preprocess.2_short_sentences']['calls'] == by_name['preprocess.1_sections']['output_size']
+    chat = by_name['chat']
+    assert chat['calls'] == len(fake_ollama.requests)
+    assert 0.02 <= chat['first_byte_s'] <= chat['wall_s'] / chat['calls']
+    assert report['total_wall_s'] >= by_name['summarize']['wall_s']
+
+
+def test_cli_profile(fake_ollama, shipped_config, tmp_path, course_text):
+    source = tmp_path / 'course.txt'
+    source.write_text(course_text(2, 20), encoding='utf-8')
+    config_path = tmp_path / 'config.json'
+    config = shipped_config(fake_ollama.host, **SETTINGS)
+    config_path.write_text(json.dumps(config), encoding='utf-8')
+    report_path = tmp_path / 'profile.json'
+    cprofile_path = tmp_path / 'run.prof'
+
+    main(['summarize', str(source), '--config', str(config_path),
+          '--profile', str(report_path), '--cprofile', str(cprofile_path)])
+
+    report = json.loads(report_path.read_text(encoding='utf-8'))
+    assert stages(report)['preprocess_text']['peak_memory_bytes'] > 0
+    assert pstats.Stats(str(cprofile_path)).total_calls > 0
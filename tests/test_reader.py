@@ -0,0 +1,133 @@
+import tracemalloc
+
+import pytest
+
+from nounlogic_summariser_lib import pipeline
+from nounlogic_summariser_lib.pipeline import (
+    StreamingPreprocessor,
+    iter_sanitized,
+    iter_sections,
+)
+from nounlogic_summariser_lib.reader import iter_text_blocks, peak_memory_target
+from nounlogic_summariser_lib.summariser import process_file, use_streaming
+
+__author__ = "nathfavour"
+__copyright__ = "nathfavour"
+__license__ = "MIT"
+
+
+PARAGRAPH = ("Unit 3 covers demand – the quantity buyers want at each price. "
+             "Prices rise when supply falls:\r\nsee Figure 2 ✓ and the café example.\r\n\r\n")
+# Preprocessing drops sentences of five words or fewer, so all of this
+SHORT_PARAGRAPH = "Yes it is. No it is not. OK then.\r\n\r\n"
+
+
+def write_text(path, size, long_section_every=0, paragraph=PARAGRAPH):
+    """Write about ``size`` bytes of paragraphs with CRLF line endings."""
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        written = 0
+        count = 0
+        while written < size:
+            count += 1
+            if long_section_every and count % long_section_every == 0:
+                # A section with no blank lines, longer than any buffer limit
+                block = PARAGRAPH.replace('\r\n', ' ') * 5000 + '\r\n\r\n'
+            else:
+                block = paragraph
+            f.write(block)
+            written += len(block.encode('utf-8'))
+
+
+@pytest.mark.parametrize('block_size', [1, 2, 3, 7, 64, 1 << 16])
+def test_blocks_join_to_text_mode_read(tmp_path, block_size):
+    path = tmp_path / 'notes.txt'
+    write_text(path, 20000 if block_size > 3 else 2000)
+    blocks = list(iter_text_blocks(str(path), block_size))
+    assert all(blocks)
+    with open(path, 'r', encoding='utf-8') as f:
+        assert ''.join(blocks) == f.read()
+
+
+def test_lone_carriage_return_and_empty_file(tmp_path):
+    path = tmp_path / 'mac.txt'
+    path.write_bytes(b'one\rtwo\r')
+    assert ''.join(iter_text_blocks(str(path), 4)) == 'one\ntwo\n'
+    empty = tmp_path / 'empty.txt'
+    empty.write_bytes(b'')
+    assert list(iter_text_blocks(str(empty))) == []
+
+
+def test_decoding_errors(tmp_path):
+    path = tmp_path / 'latin1.txt'
+    path.write_bytes('café'.encode('latin-1'))
+    with pytest.raises(UnicodeDecodeError):
+        list(iter_text_blocks(str(path)))
+    assert ''.join(iter_text_blocks(str(path), errors='replace')) == 'caf�'
+
+
+def peak_memory(path, block_size, max_section_chars, preprocessor=None):
+    tracemalloc.start()
+    try:
+        sections = iter_sections(iter_sanitized(iter_text_blocks(str(path), block_size)),
+                                 max_section_chars)
+        if preprocessor is not None:
+            sections = preprocessor.windows(sections)
+        count = 0
+        for _ in sections:
+            count += 1
+        return tracemalloc.get_traced_memory()[1], count
+    finally:
+        tracemalloc.stop()
+
+
+def test_peak_memory_stays_under_target(tmp_path):
+    block_size, max_section_chars = 1 << 16, 1 << 18
+    small, large = tmp_path / 'small.txt', tmp_path / 'large.txt'
+    write_text(small, 4 << 20, long_section_every=500)
+    write_text(large, 16 << 20, long_section_every=500)
+
+    small_peak, _ = peak_memory(small, block_size, max_section_chars)
+    large_peak, sections = peak_memory(large, block_size, max_section_chars)
+
+    assert sections > 10000
+    assert large_peak < peak_memory_target(block_size, max_section_chars)
+    # Peak memory does not grow with the size of the file
+    assert large_peak < small_peak * 1.5 + (1 << 20)
+
+
+@pytest.mark.parametrize('paragraph', [PARAGRAPH, SHORT_PARAGRAPH], ids=['long', 'short'])
+def test_streaming_peak_memory_stays_under_target(tmp_path, make_config, paragraph):
+    block_size, max_section_chars, window_chars = 1 << 14, 1 << 16, 1 << 16
+    config = make_config(files=True)
+
+    def measure(path, size):
+        write_text(path, size, long_section_every=100, paragraph=paragraph)
+        preprocessor = StreamingPreprocessor(config, 'notes', str(tmp_path),
+                                             window_words=5000, window_chars=window_chars)
+        return peak_memory(path, block_size, max_section_chars, preprocessor)
+
+    # Warm up, so one-off allocations such as compiled patterns don't count
+    measure(tmp_path / 'warm.txt', 1 << 16)
+    small_peak, _ = measure(tmp_path / 'small.txt', 1 << 18)
+    large_peak, windows = measure(tmp_path / 'large.txt', 1 << 20)
+
+    assert windows > 10
+    assert large_peak < peak_memory_target(block_size, max_section_chars, window_chars)
+    # Peak memory does not grow with the size of the file
+    assert large_peak < small_peak * 1.5 + (1 << 20)
+
+
+def test_large_files_use_streaming(tmp_path, monkeypatch):
+    path = tmp_path / 'dump.txt'
+    write_text(path, 200000)
+    config = {'streaming': {'enabled': False, 'auto_threshold_mb': 0.1}}
+    assert use_streaming(str(path), config)
+    assert not use_streaming(str(path), {'streaming': {'auto_threshold_mb': 1}})
+    assert not use_streaming(str(path), {})
+    assert use_streaming(str(path), {'streaming': {'enabled': True}})
+
+    calls = []
+    monkeypatch.setattr(pipeline, 'process_file_streaming',
+                        lambda *args, **kwargs: calls.append(args) or 'summary')
+    assert process_file(str(path), config) == 'summary'
+    assert calls == [(str(path), config)]
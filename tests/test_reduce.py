@@ -0,0 +1,64 @@
+from nounlogic_summariser_lib import summariser
+from nounlogic_summariser_lib.reduce import group_summaries, reduce_summaries
+from nounlogic_summariser_lib.summariser import process_file
+
+__author__ = "nathfavour"
+__copyright__ = "nathfavour"
+__license__ = "MIT"
+
+
+REDUCE = {'enabled': True, 'prompt_template': 'Combine:', 'batch_size': 4, 'target_words': 5}
+OLLAMA = {'max_concurrency': 4}
+
+
+def test_group_summaries():
+    summaries = [f"s{i} word" for i in range(9)]
+    assert [len(batch) for batch in group_summaries(summaries, 4, 1000)] == [4, 4, 1]
+    # The word limit closes batches early, but never below two summaries
+    assert [len(batch) for batch in group_summaries(summaries, 4, 5)] == [2, 2, 2, 2, 1]
+    assert [len(batch) for batch in group_summaries(summaries, 4, 1)] == [2, 2, 2, 2, 1]
+    assert group_summaries([], 4, 10) == []
+
+
+def test_reduce_summaries_levels(fake_ollama, make_config):
+    fake_ollama.latency = 0.02
+    summaries = [f"summary: part{i}" for i in range(41)]
+
+    reduced = reduce_summaries(summaries, make_config(fake_ollama.host, OLLAMA, reduce=REDUCE))
+
+    # 41 -> 11 -> 3 -> 1
+    assert len(fake_ollama.requests) == 11 + 3 + 1
+    assert reduced.count('summary:') == 1
+    assert all(request['messages'][0]['content'].startswith('Combine:')
+               for request in fake_ollama.requests)
+    assert fake_ollama.max_inflight > 1
+
+
+def test_reduce_stops_at_target_length(fake_ollama, make_config):
+    summaries = ['short one', 'short two']
+    config = make_config(fake_ollama.host, OLLAMA, reduce={**REDUCE, 'target_words': 10})
+    assert reduce_summaries(summaries, config) == 'short one\n\nshort two'
+    assert fake_ollama.requests == []
+
+
+def test_process_file_reduce_mode_with_cache(fake_ollama, make_config, tmp_path, monkeypatch):
+    text = 'Intro ' + ' '.join(f"question{i}?" for i in range(20))
+    monkeypatch.setattr(summariser, 'preprocess_text',
+                        lambda text_, config, name, input_dir: (text, []))
+    source = tmp_path / 'module.txt'
+    source.write_text('placeholder', encoding='utf-8')
+    config = make_config(fake_ollama.host, OLLAMA, reduce={**REDUCE, 'target_words': 3},
+                         cache={'enabled': True, 'directory': str(tmp_path / 'cache')})
+
+    final_path = process_file(str(source), config)
+
+    with open(final_path, encoding='utf-8') as f:
+        assert f.read().count('summary:') == 1
+    detail = (tmp_path / 'module-summary.txt').read_text(encoding='utf-8')
+    assert detail.count('summary:') == 21
+    requests = len(fake_ollama.requests)
+    assert requests == 21 + 6 + 2 + 1
+
+    # Chunks and every intermediate level come from the cache on a re-run
+    process_file(str(source), config)
+    assert len(fake_ollama.requests) == requests
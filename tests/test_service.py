@@ -0,0 +1,279 @@
+import http.client
+import json
+import os
+import socket
+import threading
+import time
+
+import pytest
+
+from nounlogic_summariser_lib.service import JobQueue, QueueFullError, make_server
+
+__author__ = "nathfavour"
+__copyright__ = "nathfavour"
+__license__ = "MIT"
+
+COURSE_TEXT = (
+    "The study of economics explains how societies allocate scarce resources. "
+    "Markets bring buyers and sellers together to set prices for goods. "
+    "Governments sometimes intervene in markets to correct failures and inequities.\n\n"
+    "Inflation measures the general rise in prices across the whole economy. "
+    "Central banks adjust interest rates to keep inflation close to target."
+)
+
+OLLAMA = {'max_concurrency': 2}
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path):
+        super().__init__('localhost')
+        self.socket_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.socket_path)
+
+
+class Service:
+    """A job queue and server running in background threads."""
+
+    def __init__(self, config, socket_path=None, **kwargs):
+        self.jobs = JobQueue(config, **kwargs)
+        self.jobs.start()
+        self.server = make_server(self.jobs, config, port=0, socket_path=socket_path)
+        self.socket_path = socket_path
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def request(self, method, path, body=None, content_type='application/json'):
+        if self.socket_path:
+            connection = UnixHTTPConnection(self.socket_path)
+        else:
+            connection = http.client.HTTPConnection(*self.server.server_address[:2])
+        if isinstance(body, dict):
+            body = json.dumps(body)
+        headers = {'Content-Type': content_type} if body is not None else {}
+        connection.request(method, path, body=body, headers=headers)
+        response = connection.getresponse()
+        data = response.read()
+        connection.close()
+        if response.getheader('Content-Type') == 'application/json':
+            data = json.loads(data)
+        return response, data
+
+    def wait(self, job_id, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            _, job = self.request('GET', f"/jobs/{job_id}")
+            if job['status'] not in ('queued', 'running'):
+                return job
+            time.sleep(0.02)
+        raise AssertionError(f"job {job_id} did not finish")
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.jobs.close()
+
+
+@pytest.fixture
+def start_service(fake_ollama, make_config, tmp_path):
+    services = []
+
+    def start(socket_path=None, **kwargs):
+        config = make_config(fake_ollama.host, OLLAMA, files=True, serve={
+            'upload_dir': str(tmp_path / 'uploads'), 'allowed_dirs': [str(tmp_path)]})
+        service = Service(config, socket_path=socket_path, **kwargs)
+        services.append(service)
+        return service
+
+    yield start
+    for service in services:
+        service.close()
+
+
+def write_course(tmp_path, name='module.txt'):
+    path = tmp_path / name
+    path.write_text(COURSE_TEXT, encoding='utf-8')
+    return str(path)
+
+
+def test_job_runs_and_reports_progress(start_service, tmp_path):
+    service = start_service(workers=2)
+    response, job = service.request('POST', '/jobs', {'file': write_course(tmp_path)})
+    assert response.status == 202
+    assert response.getheader('Location') == f"/jobs/{job['id']}"
+
+    job = service.wait(job['id'])
+    assert job['status'] == 'done'
+    assert job['output'] == str(tmp_path / 'module_summarised.txt')
+    assert job['progress']['chunks'] >= 1
+    assert job['progress']['characters'] > 0
+
+    response, summary = service.request('GET', f"/jobs/{job['id']}/summary")
+    assert response.status == 200
+    assert summary.decode('utf-8') == (tmp_path / 'module_summarised.txt').read_text(encoding='utf-8')
+
+    _, listing = service.request('GET', '/jobs')
+    assert [entry['id'] for entry in listing['jobs']] == [job['id']]
+    _, health = service.request('GET', '/health')
+    assert health['status'] == 'ok'
+    assert health['jobs'] == {'done': 1}
+
+
+def test_upload(start_service, tmp_path):
+    service = start_service()
+    response, job = service.request('POST', '/jobs?filename=notes.txt', COURSE_TEXT.encode('utf-8'),
+                                    content_type='text/plain')
+    assert response.status == 202
+    job = service.wait(job['id'])
+    assert job['status'] == 'done'
+    assert job['file'].startswith(str(tmp_path / 'uploads'))
+    assert job['output'].endswith('notes_summarised.txt')
+
+    response, _ = service.request('POST', '/jobs?filename=notes.exe', b'x', content_type='text/plain')
+    assert response.status == 415
+    response, _ = service.request('POST', '/jobs', b'x', content_type='text/plain')
+    assert response.status == 400
+
+
+def test_uploads_are_deleted_with_their_jobs(start_service, tmp_path):
+    service = start_service(keep_jobs=1)
+    directories = []
+    for _ in range(3):
+        _, job = service.request('POST', '/jobs?filename=notes.txt', COURSE_TEXT.encode('utf-8'),
+                                 content_type='text/plain')
+        assert service.wait(job['id'])['status'] == 'done'
+        directories.append(os.path.dirname(job['file']))
+    # Each new job makes the queue forget the one before
+    assert [os.path.isdir(directory) for directory in directories] == [False, False, True]
+
+
+def test_files_outside_allowed_dirs_are_refused(fake_ollama, make_config, tmp_path):
+    (tmp_path / 'allowed').mkdir()
+    allowed = write_course(tmp_path / 'allowed')
+    outside = write_course(tmp_path)
+    (tmp_path / 'allowed' / 'link.txt').symlink_to(outside)
+    for allowed_dirs in ([], [str(tmp_path / 'allowed')]):
+        config = make_config(fake_ollama.host, OLLAMA, files=True,
+                             serve={'allowed_dirs': allowed_dirs})
+        service = Service(config)
+        try:
+            for path in (outside, str(tmp_path / 'allowed' / '..' / 'module.txt'),
+                         str(tmp_path / 'allowed' / 'link.txt')):
+                response, error = service.request('POST', '/jobs', {'file': path})
+                assert response.status == 403
+                assert 'allowed_dirs' in error['error']
+            response, job = service.request('POST', '/jobs', {'file': allowed})
+            assert response.status == (202 if allowed_dirs else 403)
+            if allowed_dirs:
+                assert service.wait(job['id'])['status'] == 'done'
+        finally:
+            service.close()
+
+
+def test_back_pressure_and_cancel(start_service, fake_ollama, tmp_path):
+    release = threading.Event()
+    fake_ollama.latency = lambda content: release.wait(10) and 0
+    service = start_service(workers=1, max_queue=1)
+    path = write_course(tmp_path)
+
+    _, running = service.request('POST', '/jobs', {'file': path})
+    while service.jobs.get(running['id']).status != 'running':
+        time.sleep(0.01)
+    _, waiting = service.request('POST', '/jobs', {'file': path})
+
+    response, error = service.request('POST', '/jobs', {'file': path})
+    assert response.status == 429
+    assert response.getheader('Retry-After') == '5'
+    assert 'full' in error['error']
+
+    response, cancelled = service.request('DELETE', f"/jobs/{waiting['id']}")
+    assert response.status == 200
+    assert cancelled['status'] == 'cancelled'
+    response, _ = service.request('DELETE', f"/jobs/{running['id']}")
+    assert response.status == 409
+    response, _ = service.request('GET', f"/jobs/{running['id']}/summary")
+    assert response.status == 409
+
+    # The cancelled job no longer holds the only place in the queue
+    response, replacement = service.request('POST', '/jobs', {'file': path})
+    assert response.status == 202
+    assert service.request('POST', '/jobs', {'file': path})[0].status == 429
+
+    release.set()
+    assert service.wait(running['id'])['status'] == 'done'
+    assert service.wait(replacement['id'])['status'] == 'done'
+    assert fake_ollama.max_inflight <= 2
+
+
+def test_failed_job(start_service, fake_ollama, tmp_path):
+    fake_ollama.status = lambda content: 404
+    service = start_service()
+    _, job = service.request('POST', '/jobs', {'file': write_course(tmp_path)})
+    job = service.wait(job['id'])
+    assert job['status'] == 'failed'
+    assert job['error']
+
+
+def test_bad_requests(start_service, tmp_path):
+    service = start_service()
+    assert service.request('POST', '/jobs', {'file': str(tmp_path / 'missing.txt')})[0].status == 400
+    assert service.request('POST', '/jobs', b'not json')[0].status == 400
+    assert service.request('POST', '/jobs', {'file': 42})[0].status == 400
+    assert service.request('GET', '/jobs/nope')[0].status == 404
+    assert service.request('GET', '/nowhere')[0].status == 404
+
+
+def test_unix_socket(start_service, tmp_path):
+    service = start_service(socket_path=str(tmp_path / 'summariser.sock'))
+    _, job = service.request('POST', '/jobs', {'file': write_course(tmp_path)})
+    assert service.wait(job['id'])['status'] == 'done'
+
+
+def test_closed_queue_cancels_waiting_jobs(fake_ollama, make_config, tmp_path):
+    jobs = JobQueue(make_config(fake_ollama.host, OLLAMA, files=True), workers=1, max_queue=1)
+    first = jobs.submit(write_course(tmp_path))
+    with pytest.raises(QueueFullError):
+        jobs.submit(write_course(tmp_path))
+    jobs.close()
+    assert first.status == 'cancelled'
+    with pytest.raises(RuntimeError):
+        jobs.submit(write_course(tmp_path))
+
+
+def test_cancelled_jobs_free_their_place(fake_ollama, make_config, tmp_path):
+    config = make_config(fake_ollama.host, OLLAMA, files=True)
+    jobs = JobQueue(config, workers=1, max_queue=2)
+    first = jobs.submit(write_course(tmp_path))
+    second = jobs.submit(write_course(tmp_path))
+    assert jobs.cancel(first.id)
+    assert not jobs.cancel(first.id)
+    assert jobs.stats()['waiting'] == 1
+    third = jobs.submit(write_course(tmp_path))
+    with pytest.raises(QueueFullError):
+        jobs.submit(write_course(tmp_path))
+
+    # Workers skip the cancelled job without freeing its place a second time
+    jobs.start()
+    try:
+        assert second.finished.wait(30) and third.finished.wait(30)
+        assert jobs.stats()['waiting'] == 0
+        statuses = [job.status for job in (first, second, third)]
+        assert statuses == ['cancelled', 'done', 'done']
+    finally:
+        jobs.close()
+
+
+def test_finished_jobs_are_forgotten(fake_ollama, make_config, tmp_path):
+    jobs = JobQueue(make_config(fake_ollama.host, OLLAMA, files=True), workers=1, keep_jobs=2)
+    jobs.start()
+    try:
+        submitted = []
+        for _ in range(4):
+            job = jobs.submit(write_course(tmp_path))
+            assert job.finished.wait(30)
+            submitted.append(job.id)
+        assert [job.id for job in jobs.jobs()] == submitted[-2:]
+    finally:
+        jobs.close()
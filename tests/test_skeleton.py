@@ -1,3 +1,5 @@
+import json
+
 import pytest
 
 from nounlogic_summariser_lib.skeleton import fib, main
@@ -23,3 +25,13 @@ def test_main(capsys):
     main(["7"])
     captured = capsys.readouterr()
     assert "The 7-th Fibonacci number is 13" in captured.out
+
+
+def test_summarize_without_matching_files(tmp_path, caplog):
+    config_path = tmp_path / 'config.json'
+    config_path.write_text(json.dumps({'supported_formats': ['.txt']}), encoding='utf-8')
+    (tmp_path / 'notes.docx').write_text('x', encoding='utf-8')
+    with pytest.raises(SystemExit) as excinfo:
+        main(['summarize', str(tmp_path), '--config', str(config_path)])
+    assert excinfo.value.code == 1
+    assert 'No supported files found' in caplog.text
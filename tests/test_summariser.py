@@ -0,0 +1,196 @@
+import os
+import random
+import time
+
+import pytest
+from ollama import ResponseError
+
+from nounlogic_summariser_lib import summariser
+from nounlogic_summariser_lib.summariser import process_file, summarize_text
+
+__author__ = "nathfavour"
+__copyright__ = "nathfavour"
+__license__ = "MIT"
+
+
+def question_text(n):
+    # Every '?' starts a new chunk, so this yields n + 1 chunks
+    return 'Intro ' + ' '.join(f"question{i}?" for i in range(n))
+
+
+def expected_summaries(n):
+    return ['summary: Intro'] + [f"summary: question{i}?" for i in range(n)]
+
+
+def test_summarize_text_sequential(fake_ollama, make_config):
+    summaries = list(summarize_text(question_text(4), make_config(fake_ollama.host)))
+    assert summaries == expected_summaries(4)
+    assert fake_ollama.max_inflight == 1
+
+
+def test_summarize_text_concurrent_keeps_order(fake_ollama, make_config):
+    """Chunks finishing out of order are still yielded in chunk order"""
+    rng = random.Random(3)
+    fake_ollama.latency = lambda content: rng.uniform(0.0, 0.05)
+    config = make_config(fake_ollama.host, {'max_concurrency': 4})
+    summaries = list(summarize_text(question_text(20), config))
+    assert summaries == expected_summaries(20)
+    assert 1 < fake_ollama.max_inflight <= 4
+
+
+def test_summarize_text_concurrency_speedup(fake_ollama, make_config):
+    fake_ollama.latency = 0.1
+    text = question_text(7)
+
+    start = time.perf_counter()
+    list(summarize_text(text, make_config(fake_ollama.host)))
+    sequential = time.perf_counter() - start
+
+    start = time.perf_counter()
+    list(summarize_text(text, make_config(fake_ollama.host, {'max_concurrency': 4})))
+    concurrent = time.perf_counter() - start
+
+    assert sequential >= 0.8
+    assert concurrent < sequential / 2
+
+
+def test_process_file_writes_in_chunk_order(fake_ollama, make_config, tmp_path, monkeypatch):
+    rng = random.Random(5)
+    fake_ollama.latency = lambda content: rng.uniform(0.0, 0.03)
+    monkeypatch.setattr(summariser, 'preprocess_text',
+                        lambda text, config, name, input_dir: (question_text(12), ['META']))
+    source = tmp_path / 'module.txt'
+    source.write_text('placeholder', encoding='utf-8')
+
+    config = make_config(fake_ollama.host, {'max_concurrency': 3})
+    final_path = process_file(str(source), config)
+
+    expected = ''.join(f"{summary}\n\n" for summary in expected_summaries(12))
+    with open(final_path, encoding='utf-8') as f:
+        assert f.read() == expected
+    summary = (tmp_path / 'module-summary.txt').read_text(encoding='utf-8')
+    assert summary.endswith(expected)
+    assert (tmp_path / 'module-metadata.txt').read_text(encoding='utf-8') == 'META'
+
+
+def test_process_file_resume_after_failure(fake_ollama, make_config, tmp_path, monkeypatch):
+    monkeypatch.setattr(summariser, 'preprocess_text',
+                        lambda text, config, name, input_dir: (question_text(6), ['META']))
+    source = tmp_path / 'module.txt'
+    source.write_text('placeholder', encoding='utf-8')
+    config = make_config(fake_ollama.host)
+    checkpoint = tmp_path / 'module-checkpoint.jsonl'
+
+    fake_ollama.status = lambda content: 500 if 'question3?' in content else 200
+    with pytest.raises(ResponseError):
+        process_file(str(source), config)
+    assert checkpoint.exists()
+    assert len(fake_ollama.requests) == 5
+
+    fake_ollama.status = lambda content: 200
+    final_path = process_file(str(source), config, resume=True)
+
+    # Only the failed chunk and the ones after it go back to the model
+    assert len(fake_ollama.requests) == 8
+    expected = ''.join(f"{summary}\n\n" for summary in expected_summaries(6))
+    with open(final_path, encoding='utf-8') as f:
+        assert f.read() == expected
+    assert (tmp_path / 'module-summary.txt').read_text(encoding='utf-8').endswith(expected)
+    assert not os.path.exists(checkpoint)
+
+
+def test_process_file_resume_ignores_stale_checkpoint(fake_ollama, make_config, tmp_path,
+                                                      monkeypatch):
+    monkeypatch.setattr(summariser, 'preprocess_text',
+                        lambda text, config, name, input_dir: (question_text(3), []))
+    source = tmp_path / 'module.txt'
+    source.write_text('placeholder', encoding='utf-8')
+
+    fake_ollama.status = lambda content: 500 if 'question2?' in content else 200
+    with pytest.raises(ResponseError):
+        process_file(str(source), make_config(fake_ollama.host))
+    fake_ollama.status = lambda content: 200
+
+    # A different prompt invalidates the journal, so every chunk is redone
+    config = make_config(fake_ollama.host)
+    config['prompt_template'] = 'Summarise briefly:'
+    process_file(str(source), config, resume=True)
+    assert len(fake_ollama.requests) == 4 + 4
+
+
+def test_streamed_summaries_match_and_arrive_in_order(fake_ollama, make_config, tmp_path,
+                                                      monkeypatch):
+    rng = random.Random(7)
+    fake_ollama.latency = lambda content: rng.uniform(0.0, 0.03)
+    fake_ollama.token_latency = 0.002
+    fake_ollama.reply = lambda content: f"summary of {content.split()[-1]} ok"
+    monkeypatch.setattr(summariser, 'preprocess_text',
+                        lambda text, config, name, input_dir: (question_text(10), ['META']))
+    source = tmp_path / 'module.txt'
+    source.write_text('placeholder', encoding='utf-8')
+
+    with open(process_file(str(source), make_config(fake_ollama.host, {'max_concurrency': 3})),
+              encoding='utf-8') as f:
+        expected = f.read()
+    fake_ollama.requests.clear()
+
+    pieces = []
+    config = make_config(fake_ollama.host, {'max_concurrency': 3, 'stream': True})
+    final_path = process_file(str(source), config, on_token=lambda i, piece: pieces.append((i, piece)))
+
+    assert all(body['stream'] for body in fake_ollama.requests)
+    assert len(pieces) > 11
+    assert [i for i, _ in pieces] == sorted(i for i, _ in pieces)
+    with open(final_path, encoding='utf-8') as f:
+        assert f.read() == expected
+    assert (tmp_path / 'module-summary.txt').read_text(encoding='utf-8').endswith(expected)
+
+
+def test_iter_summary_tokens_first_output_before_completion(fake_ollama, make_config):
+    fake_ollama.token_latency = 0.05
+    fake_ollama.reply = lambda content: 'one two three four five six'
+    config = make_config(fake_ollama.host, {'stream': True})
+
+    start = time.perf_counter()
+    tokens = summariser.iter_summary_tokens(question_text(1), config)
+    first = next(tokens)
+    first_output = time.perf_counter() - start
+    rest = list(tokens)
+    total = time.perf_counter() - start
+
+    assert first == (0, 'one ')
+    assert ''.join(piece for i, piece in [first] + rest if i == 1) == 'one two three four five six'
+    assert first_output < total / 4
+
+
+def test_closing_iter_summary_tokens_cancels_the_rest(fake_ollama, make_config):
+    fake_ollama.token_latency = 0.02
+    fake_ollama.reply = lambda content: ' '.join(['word'] * 20)
+    config = make_config(fake_ollama.host, {'stream': True, 'max_concurrency': 2})
+
+    tokens = summariser.iter_summary_tokens(question_text(30), config)
+    assert next(tokens) == (0, 'word ')
+    tokens.close()
+    time.sleep(1)
+    sent = len(fake_ollama.requests)
+    time.sleep(1)
+    # No new requests once the streams in flight have stopped
+    assert len(fake_ollama.requests) == sent <= 4
+
+
+def test_iter_summary_tokens_raises_errors(fake_ollama, make_config):
+    fake_ollama.status = lambda content: 500
+    config = make_config(fake_ollama.host, {'stream': True})
+    with pytest.raises(ResponseError):
+        list(summariser.iter_summary_tokens(question_text(1), config))
+
+
+def test_streamed_blank_summary_is_skipped(fake_ollama, make_config, tmp_path, monkeypatch):
+    fake_ollama.reply = lambda content: '  ' if 'question0?' in content else 'kept'
+    monkeypatch.setattr(summariser, 'preprocess_text',
+                        lambda text, config, name, input_dir: (question_text(2), []))
+    source = tmp_path / 'module.txt'
+    source.write_text('placeholder', encoding='utf-8')
+    final_path = process_file(str(source), make_config(fake_ollama.host, {'stream': True}))
+    with open(final_path, encoding='utf-8') as f:
+        assert f.read() == 'kept\n\nkept\n\n'
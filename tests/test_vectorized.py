@@ -0,0 +1,120 @@
+import os
+import random
+
+import pytest
+
+from nounlogic_summariser_lib import preprocessing
+from nounlogic_summariser_lib.document import Document
+from nounlogic_summariser_lib.interface import sanitize_text
+from nounlogic_summariser_lib.preprocessing import (
+    discard_close_sentences,
+    preprocess_text,
+    score_sentences,
+)
+
+pytest.importorskip('numpy')
+pytest.importorskip('scipy')
+
+from nounlogic_summariser_lib import vectorized  # noqa: E402
+
+__author__ = "nathfavour"
+__copyright__ = "nathfavour"
+__license__ = "MIT"
+
+
+GOLDEN_DIR = os.path.join(os.path.dirname(__file__), 'golden')
+
+
+def synthetic_sentences(n, seed=0, vocabulary_size=300):
+    """Sentences with repeats, near repeats, synonyms and empty strings."""
+    rng = random.Random(seed)
+    vocabulary = [f"term{i}" for i in range(vocabulary_size)] + [
+        "vital", "pivotal", "paramount", "noteworthy", "meaningful",
+        "primary", "principal", "The", "the", "UNIT"]
+    sentences = []
+    for _ in range(n):
+        roll = rng.random()
+        if sentences and roll < 0.05:
+            sentences.append(rng.choice(sentences))
+        elif sentences and sentences[-1] and roll < 0.25:
+            # Shares most words with the previous sentence
+            words = sentences[-1].split()
+            words[rng.randrange(len(words))] = rng.choice(vocabulary)
+            sentences.append(' '.join(words))
+        elif roll < 0.27:
+            sentences.append('')
+        else:
+            sentences.append(' '.join(rng.choice(vocabulary) for _ in range(rng.randint(1, 25))) + '.')
+    return sentences
+
+
+def golden_sentences(name):
+    with open(os.path.join(GOLDEN_DIR, f"{name}.txt"), encoding='utf-8') as f:
+        return preprocessing.SENTENCE_SPLIT.split(sanitize_text(f.read()))
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_scores_equal_python_backend(seed):
+    sentences = synthetic_sentences(1500, seed=seed)
+    assert score_sentences(sentences, 'numpy') == score_sentences(sentences, 'python')
+
+
+@pytest.mark.parametrize('name', ['course_1', 'course_2', 'course_3', 'edge_cases'])
+def test_golden_scores_equal_python_backend(name):
+    sentences = golden_sentences(name)
+    assert score_sentences(sentences, 'numpy') == score_sentences(sentences, 'python')
+
+
+@pytest.mark.parametrize('threshold', [1, 3, 5, 8, 10])
+@pytest.mark.parametrize('seed', range(3))
+def test_close_sentences_equal_python_backend(seed, threshold):
+    text = ' '.join(synthetic_sentences(1000, seed=seed, vocabulary_size=40))
+    expected = discard_close_sentences(text, threshold, 'python')
+    assert discard_close_sentences(text, threshold, 'numpy') == expected
+
+
+@pytest.mark.parametrize('name', ['course_1', 'course_2', 'course_3', 'edge_cases'])
+def test_golden_close_sentences_equal_python_backend(name):
+    text = ' '.join(golden_sentences(name))
+    for threshold in (2, 5):
+        assert discard_close_sentences(text, threshold, 'numpy') == \
+            discard_close_sentences(text, threshold, 'python')
+
+
+def test_small_inputs():
+    assert score_sentences([], 'numpy') == []
+    assert vectorized.discard_close_sentences(Document.from_sentences([]), 5) == []
+    assert discard_close_sentences('', 5, 'numpy') == ''
+    assert discard_close_sentences('One sentence.', 5, 'numpy') == 'One sentence.'
+
+
+def test_term_matrix_is_binary():
+    matrix = vectorized.term_matrix(Document.from_sentences(['a b A', '', 'b c']))
+    assert matrix.shape == (3, 3)
+    assert matrix.toarray().tolist() == [[1, 1, 0], [0, 0, 0], [0, 1, 1]]
+
+
+def test_backend_selection(monkeypatch):
+    assert not preprocessing._use_vectorized('python', 10 ** 6)
+    assert preprocessing._use_vectorized('numpy', 1)
+    assert preprocessing._use_vectorized('auto', preprocessing.VECTORIZE_MIN_SENTENCES)
+    assert not preprocessing._use_vectorized('auto', preprocessing.VECTORIZE_MIN_SENTENCES - 1)
+    with pytest.raises(ValueError):
+        preprocessing._use_vectorized('gpu', 1)
+
+    monkeypatch.setattr(vectorized, 'available', lambda: False)
+    assert not preprocessing._use_vectorized('auto', 10 ** 6)
+    with pytest.raises(ImportError):
+        preprocessing._use_vectorized('numpy', 1)
+
+
+@pytest.mark.parametrize('name', ['course_1', 'edge_cases'])
+def test_preprocess_text_same_with_either_backend(name, shipped_config, tmp_path):
+    with open(os.path.join(GOLDEN_DIR, f"{name}.txt"), encoding='utf-8') as f:
+        text = sanitize_text(f.read())
+    results = []
+    for backend in ('python', 'numpy'):
+        config = shipped_config()
+        config['preprocessing']['backend'] = backend
+        results.append(preprocess_text(text, config, name, str(tmp_path)))
+    assert results[0] == results[1]